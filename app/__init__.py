@@ -1,20 +1,16 @@
-import os
 import uuid
 
 from flask import Flask, render_template, url_for, g, request, current_app, jsonify
 from flask_login import LoginManager, current_user
-from os import path
 
 from werkzeug.utils import redirect
 
 from app.extensions import db, init_extensions
 from app.info import APP_NAME, APP_VERSION, GIT_COMMIT, DEPLOYED_AT
-from app.seed import seed_users
+from app.shared.hashing import password_hasher
 from app.shared.logging import configure_logging
 from config.config import Config
 
-DB_NAME = 'database.db'
-
 def create_app(config_class=Config):
     """Initialises the flask app with config, registers the blueprints and, initialises the login manager """
 
@@ -81,20 +77,44 @@ def create_app(config_class=Config):
 
     from app.models.user import User
 
-    with app.app_context():
-        if not path.exists('app/' + DB_NAME):
-            db.create_all()
-            current_app.logger.info('Database created')
-            if os.getenv('RENDER') == 'true':
-                seed_users()
+    # Bind the password hashing pool to this app
+    password_hasher.init_app(app)
+
+    # The schema is created and seeded by the flask db commands rather than on every start
+    from app.commands import database_cli
+    app.cli.add_command(database_cli)
+
+    # Rebuild the in-memory failed login counters from the current detection window when they are first used
+    from app.auth.counters import failure_counters
+    failure_counters.init_app(app)
+
+    # Bind the failed login write buffer to this app
+    from app.auth.recorder import failed_login_recorder
+    failed_login_recorder.init_app(app)
+
+    # Bind the background alert mailer to this app
+    from app.shared.mailer import alert_mailer
+    alert_mailer.init_app(app)
 
     # Initialise login manager
     login_manager = LoginManager()
     login_manager.login_view = 'auth.login'
     login_manager.init_app(app)
 
+    # Cache users between requests so authenticated pages do not query the user table every time
+    from app.auth.user_cache import user_cache
+    user_cache.init_app(app)
+
+    # Cache the server names offered by the application forms until a server changes
+    from app.server.choices import server_choices
+    server_choices.init_app(app)
+
+    # Serve the dashboard figures from a snapshot that is refreshed when the inventory changes
+    from app.views.stats import dashboard_stats
+    dashboard_stats.init_app(app)
+
     @login_manager.user_loader
     def load_user(id):
-        return db.session.get(User, int(id))
+        return user_cache.load(int(id))
 
     return app
\ No newline at end of file
@@ -2,4 +2,4 @@ from flask import Blueprint
 
 application = Blueprint('application', __name__)
 
-from app.application import routes
\ No newline at end of file
+from app.application import routes, commands
\ No newline at end of file
@@ -0,0 +1,27 @@
+import click
+
+from app.application import application
+from app.application.exporter import application_export
+from app.application.importer import ApplicationImporter
+from app.shared.bulk_export import export_to_file
+from app.shared.bulk_import import CSV_FORMAT, NDJSON_FORMAT, import_from_file
+
+
+@application.cli.command('import')
+@click.argument('source', type=click.File('rb'))
+@click.option('--format', 'import_format', type=click.Choice([CSV_FORMAT, NDJSON_FORMAT]),
+              help='Format of SOURCE. Defaults to the one implied by its extension')
+def import_applications_command(source, import_format):
+    """Imports applications from SOURCE, a CSV file with a header row or an NDJSON file with one application per line"""
+    import_from_file(ApplicationImporter(), source, import_format)
+
+
+@application.cli.command('export')
+@click.argument('output', type=click.File('wb'), default='-')
+@click.option('--format', 'export_format', type=click.Choice([CSV_FORMAT, NDJSON_FORMAT]),
+              help='Format of OUTPUT. Defaults to the one implied by its extension, or CSV')
+@click.option('--gzip/--no-gzip', 'compress', default=None,
+              help='Gzip OUTPUT. Defaults to compressing when its name ends with .gz')
+def export_applications_command(output, export_format, compress):
+    """Writes every application to OUTPUT, or to standard output if it is not given"""
+    export_to_file(*application_export(), output, export_format, compress)
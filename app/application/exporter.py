@@ -0,0 +1,11 @@
+from app.models.application import Application
+
+# Columns of an application export, in the order they are written. The server's name and specs follow the
+# application's own
+EXPORT_COLUMNS = [column.key for column in Application.__table__.columns] + ['server', 'server_cpu', 'server_memory',
+                                                                              'server_location']
+
+
+def application_export():
+    """Returns the columns of an application export and a stream of every application with its server's specs"""
+    return EXPORT_COLUMNS, Application.stream_applications_with_servers()
@@ -10,6 +10,7 @@ class ApplicationFormError(Enum):
     BITBUCKET_EXISTS = 'An application with this bitbucket already exists'
     INVALID_BITBUCKET_LENGTH = 'Bitbucket URL cannot exceed 200 characters'
     SERVER_NOT_SELECTED = 'Please select a server'
+    SERVER_DOES_NOT_EXIST = 'There is no server with this name'
     NAME_EXISTS = 'An application with this name already exists'
     INVALID_NAME_LENGTH = 'Name cannot exceed 150 characters'
     INVALID_NAME_FORMAT = 'Application name must only contain alphabetic characters and hyphens'
@@ -1,4 +1,3 @@
-import validators as valid_package
 from flask import g
 
 from flask_wtf import FlaskForm
@@ -9,9 +8,11 @@ from app.application.form_errors import ApplicationFormError
 from app.models.application import Application
 from app.shared.form_type_enum import FormType
 from app.shared.general_form_error_enum import GeneralFormError
+from app.shared.format_checks import is_valid_email, is_valid_url
+from app.shared.uniqueness import UniqueFieldsForm
 
 
-class ApplicationForm(FlaskForm):
+class ApplicationForm(UniqueFieldsForm, FlaskForm):
     """
     A class to represents the input fields for adding a new application
 
@@ -33,8 +34,8 @@ class ApplicationForm(FlaskForm):
         Any extra information other should know about the application
     production_pods: number
         The number of pods this application has up in production
-    server: dropdown
-        The server the application is deployed on
+    server_id: dropdown
+        Id of the server the application is deployed on
     """
 
     name = StringField('Application Name', [DataRequired(), validators.Length(min=2, max=150, message=ApplicationFormError.INVALID_NAME_LENGTH.value), validators.Regexp('^[a-zA-Z- ]+$', message=ApplicationFormError.INVALID_NAME_FORMAT.value)])
@@ -45,60 +46,42 @@ class ApplicationForm(FlaskForm):
     bitbucket = URLField('Bitbucket URL', [DataRequired(), validators.Length(max=200, message= ApplicationFormError.INVALID_BITBUCKET_LENGTH.value)])
     extra_info = TextAreaField('Extra information', [validators.Length(max=1000, message=ApplicationFormError.INVALID_EXTRA_INFO_LENGTH.value)])
     production_pods = IntegerField('Number of production pods', [NumberRange(min=0)])
-    server = SelectField('Server', [DataRequired()], coerce=str)
+    server_id = SelectField('Server', [DataRequired(message=ApplicationFormError.SERVER_NOT_SELECTED.value)], coerce=int)
 
-    def validate_name(self, field):
-        """Checks if there is an application with the same name already in the Application table"""
-        retrieved_application = Application.find_application_by_name(field.data)
-
-        if ((g.form_type == FormType.UPDATE.value and retrieved_application and  retrieved_application.id != g.application_id) or
-                (g.form_type == FormType.CREATE.value and retrieved_application)):
-            raise ValidationError(ApplicationFormError.NAME_EXISTS.value)
+    model = Application
+    unique_fields = {
+        'name': ApplicationFormError.NAME_EXISTS.value,
+        'url': ApplicationFormError.URL_EXISTS.value,
+        'bitbucket': ApplicationFormError.BITBUCKET_EXISTS.value,
+        'swagger': ApplicationFormError.SWAGGER_EXISTS.value,
+    }
 
+    def excluded_id(self):
+        return g.application_id if g.form_type == FormType.UPDATE.value else None
 
     def validate_team_email(self, field):
         """Checks if the email address is valid using the validators package"""
-        if not valid_package.email(field.data):
+        if not is_valid_email(field.data):
             raise ValidationError(GeneralFormError.INVALID_EMAIL.value)
 
-    def validate_server(self, field):
+    def validate_server_id(self, field):
         """Ensures the users has selected a server and is not submitted the placeholder field"""
-        if field.data == 'Please Select':
+        if field.data == 0:
             raise ValidationError(ApplicationFormError.SERVER_NOT_SELECTED.value)
 
     def validate_bitbucket(self, field):
-        """Validates if bitbucket url starts with https://bitbucket.org and does not contradict to an existing one in the Application table"""
-
-        retrieved_application = Application.find_application_by_bitbucket(field.data)
-
-        if ((g.form_type == FormType.UPDATE.value and retrieved_application and retrieved_application.id != g.application_id) or
-                (g.form_type == FormType.CREATE.value and retrieved_application)):
-            raise ValidationError(ApplicationFormError.BITBUCKET_EXISTS.value)
-
-        if not field.data.startswith('https://bitbucket.org') or not valid_package.url(field.data):
+        """Validates if bitbucket url starts with https://bitbucket.org"""
+        if not field.data.startswith('https://bitbucket.org') or not is_valid_url(field.data):
             raise ValidationError(ApplicationFormError.INVALID_BITBUCKET_FORMAT.value)
 
     def validate_swagger(self, field):
-        """Checks if a valid url was entered for swagger and does not contradict to an existing one in the Application table"""
-
-        retrieved_application = Application.find_application_by_swagger(field.data)
-
-        if ((g.form_type == FormType.UPDATE.value and retrieved_application and retrieved_application.id != g.application_id) or
-                (g.form_type == FormType.CREATE.value and retrieved_application)):
-            raise ValidationError(ApplicationFormError.SWAGGER_EXISTS.value)
-
-        if not valid_package.url(field.data):
+        """Checks if a valid url was entered for swagger"""
+        if not is_valid_url(field.data):
             raise ValidationError(GeneralFormError.INVALID_URL.value)
 
     def validate_url(self, field):
-        """Checks if a valid url was entered for the application url and does not contradict to an existing one in the Application table"""
-        retrieved_application = Application.find_application_by_url(field.data)
-
-        if ((g.form_type == FormType.UPDATE.value and retrieved_application and retrieved_application.id != g.application_id) or
-                (g.form_type == FormType.CREATE.value and retrieved_application)):
-            raise ValidationError(ApplicationFormError.URL_EXISTS.value)
-
-        if not valid_package.url(field.data):
+        """Checks if a valid url was entered for the application url"""
+        if not is_valid_url(field.data):
             raise ValidationError(GeneralFormError.INVALID_URL.value)
 
     def validate_production_pods(self, field):
@@ -107,3 +90,18 @@ class ApplicationForm(FlaskForm):
             isinstance(field.data, int) and field.data >= 0
         except (TypeError, ValueError):
             raise ValidationError(GeneralFormError.INTEGER_NOT_GREATER_THAN_OR_EQUAL_TO_ZERO.value)
+
+
+class ApplicationImportForm(ApplicationForm):
+    """
+    A class that validates a row of a bulk application import with the same rules as the application form. The server
+    is given by name rather than id, and names, urls and servers are checked against existing rows for a whole chunk of rows at once
+    by the importer, rather than with queries per row
+    """
+
+    server_id = None
+    server = StringField('Server', [DataRequired()])
+
+    def validate_unique(self):
+        """Unique fields are checked by the importer for the whole chunk"""
+        return True
@@ -0,0 +1,45 @@
+from sqlalchemy import select
+
+from app.application.form_errors import ApplicationFormError
+from app.application.forms import ApplicationImportForm
+from app.extensions import db
+from app.models.application import Application
+from app.models.server import Server
+from app.shared.bulk_import import BulkImporter
+
+
+class ApplicationImporter(BulkImporter):
+    """Imports applications in chunks, validating each row with the application form"""
+
+    form_class = ApplicationImportForm
+    model = Application
+    unique_fields = ApplicationImportForm.unique_fields
+
+    def __init__(self, chunk_size=None):
+        super().__init__(chunk_size)
+        # Ids of the servers named by the current chunk, found by lookup and used by to_row
+        self._server_ids = {}
+
+    def lookup(self, forms):
+        """Also finds the ids of the servers the chunk's applications are deployed on, by name"""
+        existing = super().lookup(forms)
+        names = {form.server.data for form in forms}
+        existing['server'] = dict(db.session.execute(select(Server.name, Server.id)
+                                                     .where(Server.name.in_(names))).all())
+        self._server_ids = existing['server']
+        return existing
+
+    def check(self, form, existing):
+        errors = super().check(form, existing)
+        if form.server.data not in existing['server']:
+            errors['server'] = [ApplicationFormError.SERVER_DOES_NOT_EXIST.value]
+        return errors
+
+    def to_row(self, form):
+        return {'name': form.name.data, 'team_name': form.team_name.data, 'team_email': form.team_email.data,
+                'url': form.url.data, 'swagger': form.swagger.data, 'bitbucket': form.bitbucket.data,
+                'extra_info': form.extra_info.data, 'production_pods': form.production_pods.data,
+                'server_id': self._server_ids[form.server.data]}
+
+    def insert(self, rows):
+        return Application.insert_applications(rows)
@@ -1,12 +1,34 @@
 from flask import render_template, request, flash, redirect, url_for, g
 from flask_login import login_required, current_user
+from sqlalchemy import select
 
 from app.application import application
 from app.application.forms import ApplicationForm
 from app.application.form_errors import ApplicationFormError
+from app.application.exporter import application_export
+from app.application.importer import ApplicationImporter
 from app.models.application import Application
 from app.models.server import Server
+from app.server.choices import server_choices
+from app.shared.bulk_export import export_response
+from app.shared.bulk_import import import_from_request
+from app.shared.datatables import DataTableColumn, datatables_response
 from app.shared.form_type_enum import FormType
+from app.shared.pagination import parse_page_size
+from app.shared.streaming import stream_template_response
+
+# Columns of the application grid in DataTables server-side mode. Only indexed columns are searchable
+DATATABLE_COLUMNS = [
+    DataTableColumn('name', Application.name),
+    DataTableColumn('team_name', Application.team_name),
+    DataTableColumn('server', Server.name.label('server')),
+    DataTableColumn('production_pods', Application.production_pods, searchable=False),
+    DataTableColumn('team_email', Application.team_email, searchable=False, orderable=False),
+    DataTableColumn('url', Application.url),
+    DataTableColumn('swagger', Application.swagger, searchable=False, orderable=False),
+    DataTableColumn('bitbucket', Application.bitbucket),
+    DataTableColumn('extra_info', Application.extra_info, searchable=False, orderable=False),
+]
 
 
 @application.route('/create', methods=['GET', 'POST'])
@@ -17,16 +39,17 @@ def create():
     form = ApplicationForm()
     g.form_type = FormType.CREATE.value
 
-    # Populating server dropdown with values from the server table
-    servers = Server.fetch_server_with_entity(Server.name)
-    form.server.choices = [(s.name, s.name) for s in servers]
-    form.server.choices.insert(0, ('Please Select', 'Please Select'))
+    # Populating server dropdown with the cached servers
+    form.server_id.choices = server_choices.choices()
+    form.server_id.choices.insert(0, (0, 'Please Select'))
 
     if request.method == 'POST' and form.validate_on_submit():
         #If the form is valid add application to database
-        Application.create_application(form.name.data, form.team_name.data, form.team_email.data, form.url.data,
-                                        form.swagger.data, form.bitbucket.data, form.production_pods.data,
-                                        form.extra_info.data, form.server.data)
+        conflict = Application.create_application(form.name.data, form.team_name.data, form.team_email.data,
+                                                   form.url.data, form.swagger.data, form.bitbucket.data,
+                                                   form.production_pods.data, form.extra_info.data, form.server_id.data)
+        if conflict:
+            form.add_unique_error(conflict)
 
     return render_template('application/add-application.html', user=current_user, form=form, application_form_error = ApplicationFormError)
 
@@ -43,13 +66,15 @@ def update():
 
     retrieved_application = Application.find_application_by_id(application_id)
     form = ApplicationForm(obj = retrieved_application)
-    form.server.choices = [(s.name, s.name) for s in Server.query.with_entities(Server.name)]
+    form.server_id.choices = server_choices.choices()
 
     if request.method == 'POST' and form.validate_on_submit():
         updated_application = form.data
         updated_application.pop('csrf_token', None)
         if retrieved_application:
-            Application.update_application(application_id, updated_application)
+            conflict = Application.update_application(application_id, updated_application)
+            if conflict:
+                form.add_unique_error(conflict)
         else:
             message = f'Application {retrieved_application.name} cannot be updated as they do not exist'
             flash(message, category='error',)
@@ -79,6 +104,69 @@ def delete():
 @application.route('/all-applications')
 @login_required
 def all_applications():
-    """Renders the html for the grid to view all applications"""
-    applications = Application.fetch_all_applications()
-    return render_template('application/grid.html', user=current_user, applications=applications)
\ No newline at end of file
+    """Renders the html for one page of the application grid. Pages are fetched with keyset pagination and can be
+    filtered and sorted using the query parameters name, team_name, server, sort, direction and page_size.
+    Passing view=all streams every matching application instead and view=live hands paging to DataTables"""
+    filters = {
+        'name': request.args.get('name', '').strip(),
+        'team_name': request.args.get('team_name', '').strip(),
+        'server': request.args.get('server', '').strip(),
+    }
+    sort = request.args.get('sort', 'id')
+    if sort not in Application.SORTABLE_COLUMNS:
+        sort = 'id'
+    direction = 'desc' if request.args.get('direction') == 'desc' else 'asc'
+    page_size = parse_page_size(request.args.get('page_size'))
+
+    # view=live renders an empty grid that DataTables fills from the data endpoint
+    if request.args.get('view') == 'live':
+        return render_template('application/grid.html', user=current_user, applications=[], next_cursor=None,
+                               filters=filters, sort=sort, direction=direction, page_size=page_size,
+                               sortable_columns=Application.SORTABLE_COLUMNS, view='live')
+
+    # view=all streams every matching application instead of a single page
+    if request.args.get('view') == 'all':
+        applications = Application.stream_applications(**filters, sort=sort, descending=direction == 'desc')
+        return stream_template_response('application/grid.html', user=current_user, applications=applications,
+                                        next_cursor=None, filters=filters, sort=sort, direction=direction,
+                                        page_size=page_size, sortable_columns=Application.SORTABLE_COLUMNS,
+                                        view='all')
+
+    page = Application.fetch_applications_page(**filters, sort=sort, descending=direction == 'desc',
+                                               cursor=request.args.get('cursor'), page_size=page_size)
+
+    return render_template('application/grid.html', user=current_user, applications=page.items,
+                           next_cursor=page.next_cursor, filters=filters, sort=sort, direction=direction,
+                           page_size=page_size, sortable_columns=Application.SORTABLE_COLUMNS, view='page')
+
+@application.route('/data')
+@login_required
+def data():
+    """Returns a page of applications as JSON using the DataTables server-side processing protocol"""
+    statement = (select(Application.id, *(column.column for column in DATATABLE_COLUMNS))
+                 .outerjoin(Server, Application.server_id == Server.id))
+
+    def serialize(row):
+        serialized = {column.name: getattr(row, column.name) for column in DATATABLE_COLUMNS}
+        serialized['edit_url'] = url_for('application.update', application_id=row.id)
+        if current_user.is_admin:
+            serialized['delete_url'] = url_for('application.delete', application_id=row.id)
+        return serialized
+
+    return datatables_response(request.args, statement, DATATABLE_COLUMNS, Application.id, serialize)
+
+
+@application.route('/import', methods=['POST'])
+@login_required
+def bulk_import():
+    """Imports applications from an uploaded CSV or NDJSON file, or a request body in either format. Returns a JSON report of
+    how many rows were created and the errors of every row that was not"""
+    return import_from_request(ApplicationImporter())
+
+
+@application.route('/export')
+@login_required
+def export():
+    """Downloads every application as a gzipped CSV file, or NDJSON with format=ndjson. Rows are streamed from the database
+    to the client as they are read"""
+    return export_response('applications', *application_export())
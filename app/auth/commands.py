@@ -0,0 +1,21 @@
+import click
+from flask import current_app
+
+from app.auth import auth
+from app.shared.breached_passwords import build_index
+
+
+@auth.cli.command('build-breached-password-index')
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.argument('output', type=click.Path(dir_okay=False), required=False)
+def build_breached_password_index_command(source, output):
+    """Builds the breached password index from SOURCE, a list of SHA-1 hashes with one hash per line such as the Have I
+    Been Pwned download. OUTPUT defaults to the BREACHED_PASSWORD_INDEX setting"""
+    output = output or current_app.config.get('BREACHED_PASSWORD_INDEX')
+    if not output:
+        raise click.UsageError('Pass OUTPUT or set BREACHED_PASSWORD_INDEX')
+    try:
+        total = build_index(source, output)
+    except ValueError as err:
+        raise click.ClickException(str(err))
+    click.echo(f'Wrote {total} breached password hashes to {output}')
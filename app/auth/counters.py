@@ -0,0 +1,182 @@
+import threading
+import time
+from datetime import timezone
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import db
+from app.models.failed_login import FailedLogin, utc_now
+
+# Number of buckets the detection window is split into. More buckets make the window slide more smoothly
+GLOBAL_BUCKETS = 60
+KEY_BUCKETS = 10
+# How many failures are recorded between sweeps of ip addresses and emails with no failures left in the window
+SWEEP_EVERY = 1000
+
+
+class SlidingWindowCounter:
+    """
+    A class that counts events over a sliding time window using a ring buffer of fixed width buckets.
+
+    Recording an event and reading the count are O(1): the running total is kept up to date as buckets fall out of
+    the window, and at most one full turn of the ring is cleared when the counter has been idle.
+
+    Attributes
+    -------------------
+    window: float
+        Length of the window in seconds
+    buckets: int
+        Number of buckets the window is split into
+    """
+
+    __slots__ = ('window', 'buckets', '_width', '_counts', '_head', '_total')
+
+    def __init__(self, window, buckets):
+        self.window = window
+        self.buckets = buckets
+        self._width = window / buckets
+        self._counts = [0] * buckets
+        self._head = 0
+        self._total = 0
+
+    def _advance(self, bucket):
+        """Moves the head of the ring forward to the given bucket, dropping buckets that have left the window"""
+        if bucket <= self._head:
+            return
+        for step in range(1, min(bucket - self._head, self.buckets) + 1):
+            slot = (self._head + step) % self.buckets
+            self._total -= self._counts[slot]
+            self._counts[slot] = 0
+        self._head = bucket
+
+    def add(self, now, amount=1):
+        """Records events at the given unix time. Events older than the window are ignored"""
+        bucket = int(now // self._width)
+        self._advance(bucket)
+        if self._head - bucket >= self.buckets:
+            return
+        self._counts[bucket % self.buckets] += amount
+        self._total += amount
+
+    def count(self, now):
+        """Returns the number of events recorded in the window ending at the given unix time"""
+        self._advance(int(now // self._width))
+        return self._total
+
+
+class FailureCounters:
+    """
+    A class that keeps per ip address, per email and global counts of failed logins in memory so credential stuffing
+    thresholds can be checked without reading the failed login table.
+
+    The window and thresholds are shared with FailedLogin. Counters are rebuilt from the failed login table the first
+    time they are used after the application starts. Each process keeps its own counters, so with several workers each
+    one sees the failures it handled itself plus the history that existed when its counters were built.
+    """
+
+    def __init__(self, window=FailedLogin.WINDOW):
+        self._window = window.total_seconds()
+        self._lock = threading.Lock()
+        self._by_ip = {}
+        self._by_email = {}
+        self._global = SlidingWindowCounter(self._window, GLOBAL_BUCKETS)
+        self._since_sweep = 0
+        self._built = False
+        self._build_lock = threading.Lock()
+
+    def init_app(self, app):
+        """Clears the counters so they are rebuilt from the failed logins in the current window the first time they are
+        used, rather than while the application starts"""
+        self.reset()
+        self._built = False
+
+    def _ensure_built(self):
+        """Rebuilds the counters if they have not been built since the application started"""
+        if not self._built:
+            with self._build_lock:
+                if not self._built:
+                    self.rebuild()
+
+    def reset(self):
+        """Clears every counter"""
+        with self._lock:
+            self._by_ip.clear()
+            self._by_email.clear()
+            self._global = SlidingWindowCounter(self._window, GLOBAL_BUCKETS)
+            self._since_sweep = 0
+
+    def rebuild(self):
+        """Replaces the counters with the failed logins stored in the database for the current window. If they cannot
+        be read the counters keep what they have counted and are rebuilt again the next time they are used"""
+        since = utc_now() - FailedLogin.WINDOW
+        try:
+            rows = db.session.execute(
+                select(FailedLogin.email, FailedLogin.ip, FailedLogin.created_at).where(FailedLogin.created_at >= since)
+            ).all()
+            self.reset()
+            for email, ip, created_at in rows:
+                self._add(email, ip, created_at.replace(tzinfo=timezone.utc).timestamp())
+            self._built = True
+        except SQLAlchemyError as err:
+            current_app.logger.error(
+                'An error occurred whilst rebuilding the failed login counters',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+
+    def _counter(self, counters, key):
+        """Returns the counter for a key, creating it on first use"""
+        counter = counters.get(key)
+        if counter is None:
+            counter = counters[key] = SlidingWindowCounter(self._window, KEY_BUCKETS)
+        return counter
+
+    def _sweep(self, now):
+        """Drops ip addresses and emails with no failures left in the window so memory stays bounded"""
+        for counters in (self._by_ip, self._by_email):
+            for key in [key for key, counter in counters.items() if counter.count(now) == 0]:
+                del counters[key]
+        self._since_sweep = 0
+
+    def record(self, email, ip, now=None):
+        """Records a failed login for an email and ip address"""
+        self._ensure_built()
+        self._add(email, ip, time.time() if now is None else now)
+
+    def _add(self, email, ip, now):
+        """Adds a failed login to the counters"""
+        with self._lock:
+            self._global.add(now)
+            if ip:
+                self._counter(self._by_ip, ip).add(now)
+            if email:
+                self._counter(self._by_email, email).add(now)
+            self._since_sweep += 1
+            if self._since_sweep >= SWEEP_EVERY:
+                self._sweep(now)
+
+    def failures_for_ip(self, ip):
+        """Returns the number of failed logins from an ip address in the window"""
+        self._ensure_built()
+        with self._lock:
+            counter = self._by_ip.get(ip)
+            return counter.count(time.time()) if counter else 0
+
+    def failures_for_email(self, email):
+        """Returns the number of failed logins for an email in the window"""
+        self._ensure_built()
+        with self._lock:
+            counter = self._by_email.get(email)
+            return counter.count(time.time()) if counter else 0
+
+    def global_failures(self):
+        """Returns the number of failed logins across the whole system in the window"""
+        self._ensure_built()
+        with self._lock:
+            return self._global.count(time.time())
+
+
+failure_counters = FailureCounters()
@@ -15,4 +15,5 @@ class RegistrationFormError(Enum):
 
 class LoginFormErrors(Enum):
     INCORRECT_EMAIL_OR_PASSWORD = 'Incorrect email or password'
-    INCORRECT_PASSWORD = 'Incorrect Password'
\ No newline at end of file
+    INCORRECT_PASSWORD = 'Incorrect Password'
+    TOO_MANY_ATTEMPTS = 'Too many failed login attempts. Please try again in {} seconds'
\ No newline at end of file
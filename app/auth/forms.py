@@ -1,17 +1,15 @@
-import time
-
-import validators as valid_package
-
+from flask import request
 from flask_wtf import FlaskForm
-from werkzeug.security import check_password_hash
 from wtforms import validators, StringField, EmailField, PasswordField, RadioField
 from wtforms.validators import DataRequired, ValidationError
 
 from app import db
 from app.auth.form_errors import LoginFormErrors, RegistrationFormError
-from app.auth.helpers import log_login_failure
+from app.auth.helpers import log_login_failure, apply_adaptive_friction, find_login_user
 from app.models.user import User
 from app.shared.general_form_error_enum import GeneralFormError
+from app.shared.format_checks import is_valid_email
+from app.shared.hashing import password_hasher
 from app.shared.shared import breached_password_validator
 
 
@@ -43,7 +41,7 @@ class RegistrationForm(FlaskForm):
     password = PasswordField('Password', [DataRequired(),
                                           validators.Regexp(r'^(?=.*[A-Z])(?=.*\d)(?=.*[!@#$%^&*_+])[A-Za-z\d!@#$%^&*_+]{7,20}$', message=RegistrationFormError.PASSWORD_DOES_NOT_MEET_REQUIREMENTS.value),
                                           validators.Length(min=7, max=20, message=RegistrationFormError.INVALID_PASSWORD_LENGTH.value), validators.EqualTo('confirm_password', message=RegistrationFormError.PASSWORDS_DO_NOT_MATCH.value), breached_password_validator])
-    confirm_password = PasswordField('Confirm Password', [DataRequired(), validators.Length(min=7, max=20, message=RegistrationFormError.INVALID_PASSWORD_LENGTH.value), validators.EqualTo('password', message=RegistrationFormError.PASSWORDS_DO_NOT_MATCH.value), breached_password_validator])
+    confirm_password = PasswordField('Confirm Password', [DataRequired(), validators.Length(min=7, max=20, message=RegistrationFormError.INVALID_PASSWORD_LENGTH.value), validators.EqualTo('password', message=RegistrationFormError.PASSWORDS_DO_NOT_MATCH.value)])
 
 
     def validate_email(self, field):
@@ -53,7 +51,7 @@ class RegistrationForm(FlaskForm):
         if user:
             raise ValidationError(RegistrationFormError.EMAIL_EXISTS.value)
 
-        if not valid_package.email(field.data):
+        if not is_valid_email(field.data):
             raise ValidationError(GeneralFormError.INVALID_EMAIL.value)
 
 class LoginForm(FlaskForm):
@@ -73,20 +71,24 @@ class LoginForm(FlaskForm):
     def validate_login_password(self, field):
         """Checks if the password entered in correct for the corresponding email address in the database"""
 
-        user = User.find_user_by_email(self.login_email.data)
+        user = find_login_user(self.login_email.data)
 
         if user is None:
             raise ValidationError(LoginFormErrors.INCORRECT_EMAIL_OR_PASSWORD.value)
 
-        if user.failed_attempts > 0:
-            delay = min(2 ** user.failed_attempts, 8)
-            time.sleep(delay)
-
-        if check_password_hash(user.password, field.data):
-            user.failed_attempts = 0
-            db.session.commit()
-        elif user and not check_password_hash(user.password, field.data):
+        if password_hasher.verify(user.password, field.data):
+            # Only writes to the user when something has changed, so a normal login is a single read
+            if user.failed_attempts or user.login_not_before:
+                user.failed_attempts = 0
+                user.login_not_before = None
+            # Upgrades the stored hash when the configured hash parameters have changed since it was created
+            if password_hasher.needs_rehash(user.password):
+                user.password = password_hasher.hash(field.data)
+            if db.session.dirty:
+                db.session.commit()
+        else:
             user.failed_attempts += 1
             log_login_failure(self.login_email.data, LoginFormErrors.INCORRECT_PASSWORD.value)
+            apply_adaptive_friction(user, self.login_email.data, request.remote_addr)
             db.session.commit()
             raise ValidationError(LoginFormErrors.INCORRECT_EMAIL_OR_PASSWORD.value)
\ No newline at end of file
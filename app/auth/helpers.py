@@ -1,20 +1,35 @@
-import time
+import math
+from datetime import timedelta
 
-from flask import current_app, request
+from flask import current_app, request, g
 
-from app.models.failed_login import FailedLogin
-from app.shared.shared import send_email
+from app.auth.counters import failure_counters
+from app.auth.recorder import failed_login_recorder
+from app.models.failed_login import FailedLogin, utc_now
+from app.models.user import User
+from app.shared.mailer import alert_mailer
+
+
+def find_login_user(email):
+    """Finds the user for an email address, looking them up at most once per request however many times the login
+    route and form ask for them"""
+    users = g.setdefault('login_users', {})
+    if email not in users:
+        users[email] = User.find_user_by_email(email)
+    return users[email]
 
 
 def check_and_alert_stuffing(ip, email):
-    """Monitors recent failed login attempts anf alerts administrators when thresholds are exceeded"""
-    ip_failures = FailedLogin.recent_failures_for_ip(ip)
-    account_failures = FailedLogin.recent_failures_for_email(email)
-    global_failures = FailedLogin.recent_global_failures()
+    """Monitors recent failed login attempts anf alerts administrators when thresholds are exceeded. Alerts are queued
+    and sent in the background, and repeated alerts for the same ip address or account are coalesced into a digest"""
+    ip_failures = failure_counters.failures_for_ip(ip)
+    account_failures = failure_counters.failures_for_email(email)
+    global_failures = failure_counters.global_failures()
 
     if ip_failures >= FailedLogin.IP_FAIL_THRESHOLD:
 
-        send_email(
+        alert_mailer.alert(
+            'credential_stuffing', ip,
             subject='Credential Stuffing Alert',
             recipients=['security-team@yourcompany.com'],
             body=f'High number of failures from IP {ip}: {ip_failures} in 5 minutes.'
@@ -22,7 +37,8 @@ def check_and_alert_stuffing(ip, email):
         current_app.logger.warning(f'Credential stuffing suspected from IP {ip}')
 
     elif account_failures >= FailedLogin.ACCOUNT_FAIL_THRESHOLD:
-        send_email(
+        alert_mailer.alert(
+            'brute_force', email,
             subject='Brute Force Alert',
             recipients=['security-team@yourcompany.com'],
             body=f'Account {email} had {account_failures} failed logins in 5 minutes.'
@@ -30,7 +46,8 @@ def check_and_alert_stuffing(ip, email):
         current_app.logger.warning(f'Brute force suspected on account {email}')
 
     elif global_failures >= FailedLogin.GLOBAL_FAIL_THRESHOLD:
-        send_email(
+        alert_mailer.alert(
+            'global_attack', None,
             subject='Global Attack Alert',
             recipients=['security-team@yourcompany.com' ],
             body=f'System-wide failures: {global_failures} in 5 minutes.'
@@ -39,24 +56,42 @@ def check_and_alert_stuffing(ip, email):
 
 
 def apply_adaptive_friction(user, email, ip):
-    """Delays logins after unsuccessful attempts"""
+    """Delays the next login for a user after an unsuccessful attempt. Instead of holding the request open, the delay
+    is stored on the user as the time before which further attempts are refused. Returns the delay in seconds"""
 
     # Base exponential backoff
     base_delay = min(2 ** user.failed_attempts, 8)
 
     # Add extra delay if suspicious
-    if FailedLogin.recent_failures_for_ip(ip) >= FailedLogin.IP_FAIL_THRESHOLD:
+    if failure_counters.failures_for_ip(ip) >= FailedLogin.IP_FAIL_THRESHOLD:
         base_delay += 5
-    if FailedLogin.recent_failures_for_email(email) >= FailedLogin.ACCOUNT_FAIL_THRESHOLD:
+    if failure_counters.failures_for_email(email) >= FailedLogin.ACCOUNT_FAIL_THRESHOLD:
         base_delay += 5
-    if FailedLogin.recent_global_failures() >= FailedLogin.GLOBAL_FAIL_THRESHOLD:
+    if failure_counters.global_failures() >= FailedLogin.GLOBAL_FAIL_THRESHOLD:
         base_delay += 10
 
-    time.sleep(base_delay)
+    user.login_not_before = utc_now() + timedelta(seconds=base_delay)
+    return base_delay
+
+
+def login_retry_after(user):
+    """Returns the number of whole seconds until a user may attempt to login again, or 0 if they may login now"""
+    if user is None or user.login_not_before is None:
+        return 0
+    remaining = (user.login_not_before - utc_now()).total_seconds()
+    return math.ceil(remaining) if remaining > 0 else 0
+
+
+def record_login_failure(email):
+    """Records a failed login for the current request in the in-memory counters and buffers it to be written to the
+    failed login table"""
+    failed_login_recorder.record(email, request.remote_addr, request.user_agent.string)
+    failure_counters.record(email, request.remote_addr)
+
 
 def log_login_failure(email, reason):
     """Logs login failures and records them in failed login table"""
-    FailedLogin.record_failed_login(email, request.remote_addr, request.user_agent.string)
+    record_login_failure(email)
     check_and_alert_stuffing(request.remote_addr, email)
     current_app.logger.warning(f'Login failure for email: {email}. Reason: {reason}')
 
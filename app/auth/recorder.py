@@ -0,0 +1,102 @@
+import atexit
+import os
+import threading
+
+from app.models.failed_login import FailedLogin, utc_now
+
+# Number of failed logins buffered before they are written in one batch
+DEFAULT_FAILED_LOGIN_BATCH_SIZE = 200
+# Seconds a failed login may wait in the buffer before it is written
+DEFAULT_FAILED_LOGIN_FLUSH_INTERVAL = 1.0
+
+FAILED_LOGIN_BATCH_SIZE_CONFIG = 'FAILED_LOGIN_BATCH_SIZE'
+FAILED_LOGIN_FLUSH_INTERVAL_CONFIG = 'FAILED_LOGIN_FLUSH_INTERVAL'
+
+
+class FailedLoginRecorder:
+    """
+    A class that buffers failed logins in memory and writes them to the failed login table in batches, so a wave of
+    failed logins costs one transaction and one executemany per batch rather than a commit per attempt.
+
+    A batch is written when FAILED_LOGIN_BATCH_SIZE rows are buffered or FAILED_LOGIN_FLUSH_INTERVAL seconds after the
+    first row was buffered, whichever comes first. Those two settings bound how many failed logins can be lost if the
+    process crashes. A batch size of 1 writes every failed login as it is recorded. Buffered rows keep the time they
+    were recorded, and detection does not wait for them to be written as the in-memory failure counters are updated
+    when a failure is recorded.
+    """
+
+    def __init__(self):
+        self._app = None
+        self._reset()
+
+    def _reset(self):
+        """Creates the state owned by the current process"""
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._rows = []
+        self._writing = 0
+        self._timer = None
+
+    def _check_process(self):
+        """Starts from an empty buffer in a forked process, as the buffered rows and timer belong to the parent"""
+        if self._pid != os.getpid():
+            self._reset()
+
+    def init_app(self, app):
+        """Binds the recorder to an application, writing any rows buffered for a previous application first"""
+        app.config.setdefault(FAILED_LOGIN_BATCH_SIZE_CONFIG, DEFAULT_FAILED_LOGIN_BATCH_SIZE)
+        app.config.setdefault(FAILED_LOGIN_FLUSH_INTERVAL_CONFIG, DEFAULT_FAILED_LOGIN_FLUSH_INTERVAL)
+        if self._app is not None:
+            self.flush()
+        self._app = app
+
+    @property
+    def pending(self):
+        """Returns the number of failed logins that have not been written yet"""
+        with self._lock:
+            return len(self._rows) + self._writing
+
+    def record(self, email, ip, user_agent):
+        """Buffers a failed login, writing the buffer if it is full"""
+        self._check_process()
+        row = {'email': email, 'ip': ip, 'user_agent': user_agent, 'created_at': utc_now()}
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= self._app.config[FAILED_LOGIN_BATCH_SIZE_CONFIG]
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self._app.config[FAILED_LOGIN_FLUSH_INTERVAL_CONFIG], self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Writes every buffered failed login in a single batch"""
+        self._check_process()
+        with self._lock:
+            rows, self._rows = self._rows, []
+            self._writing += len(rows)
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not rows:
+            return
+
+        # Batches are written one at a time so rows from the same process are committed in the order they arrived
+        try:
+            with self._write_lock, self._app.app_context():
+                FailedLogin.insert_failed_logins(rows)
+        finally:
+            with self._lock:
+                self._writing -= len(rows)
+
+
+def _flush_at_exit():
+    """Writes failed logins still in the buffer when the process exits"""
+    if failed_login_recorder._app is not None:
+        failed_login_recorder.flush()
+
+
+failed_login_recorder = FailedLoginRecorder()
+atexit.register(_flush_at_exit)
@@ -1,9 +1,9 @@
-from flask import render_template, request, flash, redirect, url_for, session, current_app
+from flask import render_template, request, flash, redirect, url_for, session, current_app, make_response
 from flask_login import login_user, login_required, logout_user, current_user
 
 from app.auth.form_errors import LoginFormErrors
 from app.auth.forms import RegistrationForm, LoginForm
-from app.models.failed_login import FailedLogin
+from app.auth.helpers import record_login_failure, login_retry_after, find_login_user
 from app.models.user import User
 from app.auth import auth
 
@@ -17,7 +17,15 @@ def login():
 
     form = LoginForm()
     if request.method == 'POST':
-        user = User.find_user_by_email(form.login_email.data)
+        user = find_login_user(form.login_email.data)
+        retry_after = login_retry_after(user)
+        if retry_after:
+            # Friction is enforced by refusing the attempt rather than holding the worker until the delay has passed
+            current_app.logger.warning(f'Login throttled for email: {user.email}. Retry after {retry_after} seconds')
+            flash(LoginFormErrors.TOO_MANY_ATTEMPTS.value.format(retry_after), category='error')
+            response = make_response(render_template('auth/login.html', user=current_user, form=form), 429)
+            response.headers['Retry-After'] = str(retry_after)
+            return response
         if user:
             if form.validate_on_submit():
                 session.clear()
@@ -28,7 +36,7 @@ def login():
                 flash('Logged in successfully.', category='success')
                 return redirect(url_for('views.dashboard'))
         else:
-            FailedLogin.record_failed_login(form.login_email.data, request.remote_addr, request.user_agent.string)
+            record_login_failure(form.login_email.data)
             flash(LoginFormErrors.INCORRECT_EMAIL_OR_PASSWORD.value, category='error')
 
     return render_template('auth/login.html', user=current_user, form=form)
@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.extensions import db
+from app.models.user import User
+
+# Seconds a cached user is trusted for. Changes made by other processes are picked up after at most this long
+DEFAULT_USER_CACHE_TTL = 60
+# Number of users kept in the cache before the least recently used are evicted
+DEFAULT_USER_CACHE_SIZE = 1024
+
+USER_CACHE_TTL_CONFIG = 'USER_CACHE_TTL'
+USER_CACHE_SIZE_CONFIG = 'USER_CACHE_SIZE'
+# Session info keys holding the ids of the users changed by the current transaction, and marking that a bulk statement
+# changed users whose ids are not known
+CHANGED_USER_IDS = 'changed_user_ids'
+USERS_CHANGED = 'users_changed'
+
+
+class UserCache:
+    """
+    A class that keeps recently loaded users in memory so the Flask-Login user loader does not query the user table on
+    every authenticated request.
+
+    Users are cached as detached copies and merged into the request's session without a query. Entries expire after
+    USER_CACHE_TTL seconds and the least recently used are evicted past USER_CACHE_SIZE. Users changed through the ORM
+    in this process are removed from the cache once the change commits. The cache is version stamped, so a user read
+    from the database before that commit is not cached after it.
+    """
+
+    def __init__(self):
+        self._app = None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = 0
+
+    def init_app(self, app):
+        """Binds the cache to an application and clears it"""
+        app.config.setdefault(USER_CACHE_TTL_CONFIG, DEFAULT_USER_CACHE_TTL)
+        app.config.setdefault(USER_CACHE_SIZE_CONFIG, DEFAULT_USER_CACHE_SIZE)
+        self._app = app
+        self.clear()
+
+    def clear(self):
+        """Removes every cached user"""
+        with self._lock:
+            self._entries.clear()
+            self._version += 1
+
+    def invalidate(self, user_id):
+        """Removes a user from the cache"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._version += 1
+
+    def _get(self, user_id):
+        """Returns the cached copy of a user if it has not expired, and the version of the cache"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                return entry[1], self._version
+            self._entries.pop(user_id, None)
+            return None, self._version
+
+    def _put(self, user_id, user, version):
+        """Caches a detached copy of a user unless a user has changed since it was read"""
+        snapshot = User(**{attribute.key: getattr(user, attribute.key) for attribute in User.__mapper__.column_attrs})
+        make_transient_to_detached(snapshot)
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[user_id] = (time.monotonic() + self._app.config[USER_CACHE_TTL_CONFIG], snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self._app.config[USER_CACHE_SIZE_CONFIG]:
+                self._entries.popitem(last=False)
+
+    def load(self, user_id):
+        """Returns a user attached to the current session, from the cache when possible"""
+        if not self._app.config[USER_CACHE_TTL_CONFIG]:
+            return db.session.get(User, user_id)
+
+        cached, version = self._get(user_id)
+        if cached is not None:
+            return db.session.merge(cached, load=False)
+
+        user = db.session.get(User, user_id)
+        if user is not None:
+            self._put(user_id, user, version)
+        return user
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(Session, 'after_flush')
+def mark_flushed_user_changes(session, flush_context):
+    """Records the users the unit of work has changed or deleted"""
+    changed = {instance.id for instance in (*session.dirty, *session.deleted) if isinstance(instance, User)}
+    if changed:
+        session.info.setdefault(CHANGED_USER_IDS, set()).update(changed)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def mark_executed_user_changes(orm_execute_state):
+    """Marks the transaction when a bulk update or delete statement targets the user table"""
+    if ((orm_execute_state.is_update or orm_execute_state.is_delete)
+            and orm_execute_state.bind_mapper is User.__mapper__):
+        orm_execute_state.session.info[USERS_CHANGED] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_cached_users(session):
+    """Removes the users a transaction changed from the cache once it has committed. Doing it at flush would let a
+    load between the flush and the commit cache the old row again"""
+    if session.info.pop(USERS_CHANGED, False):
+        user_cache.clear()
+    for user_id in session.info.pop(CHANGED_USER_IDS, ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_user_changes(session):
+    """Forgets the user changes of a transaction that was rolled back"""
+    session.info.pop(USERS_CHANGED, None)
+    session.info.pop(CHANGED_USER_IDS, None)
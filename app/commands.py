@@ -0,0 +1,40 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import inspect
+
+from app.extensions import db
+from app.seed import seed_users
+from app.upgrade import upgrade_database
+
+database_cli = AppGroup('db', help='Creates and seeds the database.')
+
+
+@database_cli.command('create')
+@click.option('--demo-data/--no-demo-data', default=None,
+              help='Add demo servers, applications and failed logins to new tables. Defaults to SEED_DEMO_DATA')
+def create_database_command(demo_data):
+    """Creates any tables that do not exist yet. Existing tables and their data are left alone"""
+    if demo_data is not None:
+        current_app.config['SEED_DEMO_DATA'] = demo_data
+    existing = set(inspect(db.engine).get_table_names())
+    db.create_all()
+    created = sorted(set(db.metadata.tables) - existing)
+    current_app.logger.info(f'Database created tables={",".join(created)}')
+    click.echo(f'Created {len(created)} tables' + (f': {", ".join(created)}' if created else ''))
+
+
+@database_cli.command('seed-users')
+def seed_users_command():
+    """Adds the admin and regular users from ADMIN_EMAIL, ADMIN_PASSWORD, REGULAR_EMAIL and REGULAR_PASSWORD if they
+    do not exist yet"""
+    click.echo(f'Added {seed_users()} users')
+
+
+@database_cli.command('upgrade')
+def upgrade_database_command():
+    """Updates tables created by an earlier version in place, keeping their data. Moves applications from server names
+    to server ids, adds new columns such as the login friction time and server rollups, and creates missing indexes.
+    Run it once after upgrading"""
+    applied = upgrade_database()
+    click.echo(f'Applied {len(applied)} changes' + (f': {", ".join(applied)}' if applied else ''))
@@ -1,24 +1,42 @@
-from flask_mail import Mail
 from flask_sqlalchemy import SQLAlchemy
 from flask_session import Session
 
+from app.shared.postgres import postgres_engine_options
+from app.shared.sessions import CACHED_SQLITE_SESSION_TYPE, CachedSQLiteSessionInterface
+from app.shared.sqlite import sqlite_engine_options, configure_sqlite_engine
+
 db = SQLAlchemy()
 session_ext = Session()
-mail = Mail()
 
 def init_extensions(app):
     """
         Initialise all Flask extensions cleanly.
         Avoids circular imports and hides internal config logic.
     """
-    # Initialize SQLAlchemy
+    # Initialize SQLAlchemy, applying the pool settings for PostgreSQL or the engine profile for a SQLite file
+    postgres_engine_options(app)
+    sqlite_engine_options(app)
     db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            configure_sqlite_engine(app, engine)
 
     # Inject SQLAlchemy instance for Flask-Session *before* initializing it
     app.config["SESSION_SQLALCHEMY"] = db
 
-    # Initialise Flask-Session
-    session_ext.init_app(app)
+    # Initialise Flask-Session, or the cached SQLite session store which Flask-Session does not provide
+    if app.config.get('SESSION_TYPE') == CACHED_SQLITE_SESSION_TYPE:
+        app.session_interface = CachedSQLiteSessionInterface.from_app(app)
+    else:
+        session_ext.init_app(app)
+
 
-    ## Initialise Flask-Mail
-    mail.init_app(app)
\ No newline at end of file
+def get_mail(app):
+    """Returns the Flask-Mail state for an application. Flask-Mail is imported and initialised the first time mail is
+    sent, as most processes never send any"""
+    state = app.extensions.get('mail')
+    if state is None:
+        from flask_mail import Mail
+        Mail(app)
+        state = app.extensions['mail']
+    return state
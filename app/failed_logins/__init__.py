@@ -1,6 +1,5 @@
 from flask import Blueprint
 
-failed_logins = Blueprint('failed_logins', __name__)
-
-from app.failed_logins import routes
+failed_logins = Blueprint('failed_logins', __name__, cli_group='failed-logins')
 
+from app.failed_logins import routes, retention
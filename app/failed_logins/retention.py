@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+import click
+from flask import current_app
+
+from app.failed_logins import failed_logins
+from app.models.failed_login import FailedLogin, utc_now
+from app.models.failed_login_rollup import FailedLoginRollup
+
+# Days raw failed logins are kept for before they are pruned. Hourly rollups are kept indefinitely
+DEFAULT_FAILED_LOGIN_RETENTION_DAYS = 30
+# Number of raw failed logins deleted per transaction when pruning
+DEFAULT_FAILED_LOGIN_PRUNE_BATCH_SIZE = 1000
+
+
+def start_of_hour(moment):
+    """Truncates a datetime to the start of its hour"""
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def apply_retention(retention=None, batch_size=None):
+    """Rolls every complete hour of failed logins up into hourly counts, then prunes the raw failed logins that are
+    older than the retention period and have been rolled up. Returns the time rollups cover until and the number of
+    raw failed logins deleted"""
+    if retention is None:
+        retention = timedelta(days=current_app.config.get('FAILED_LOGIN_RETENTION_DAYS',
+                                                          DEFAULT_FAILED_LOGIN_RETENTION_DAYS))
+    if batch_size is None:
+        batch_size = current_app.config.get('FAILED_LOGIN_PRUNE_BATCH_SIZE', DEFAULT_FAILED_LOGIN_PRUNE_BATCH_SIZE)
+
+    # The detection window is left alone so failed logins still waiting in a worker's write buffer are not missed
+    rolled_up_until = FailedLoginRollup.roll_up_failed_logins(start_of_hour(utc_now() - FailedLogin.WINDOW))
+    if rolled_up_until is None:
+        return None, 0
+
+    # Only raw rows that are counted in the rollups are pruned
+    prune_before = min(rolled_up_until, utc_now() - retention)
+    deleted = FailedLogin.prune_failed_logins(prune_before, batch_size)
+    current_app.logger.info(f'failed_login_retention rolled_up_until={rolled_up_until} deleted={deleted}')
+    return rolled_up_until, deleted
+
+
+@failed_logins.cli.command('retain')
+@click.option('--days', type=int, default=None, help='Days of raw failed logins to keep')
+@click.option('--batch-size', type=int, default=None, help='Rows deleted per transaction')
+def retain_command(days, batch_size):
+    """Rolls up failed logins into hourly counts and prunes raw failed logins past the retention period"""
+    retention = timedelta(days=days) if days is not None else None
+    rolled_up_until, deleted = apply_retention(retention, batch_size)
+    if rolled_up_until is None:
+        raise click.ClickException('Unable to roll up failed logins. Nothing was pruned')
+    click.echo(f'Rolled up failed logins until {rolled_up_until} and pruned {deleted} rows')
@@ -1,21 +1,125 @@
-from flask import render_template, current_app
+from datetime import timedelta, datetime
+
+from flask import render_template, current_app, request, jsonify, flash
 from flask_login import login_required, current_user
+from sqlalchemy import select
 
 from app.failed_logins import failed_logins
-from app.models.failed_login import FailedLogin
+from app.models.failed_login import FailedLogin, utc_now
+from app.models.failed_login_rollup import FailedLoginRollup
+from app.shared.datatables import DataTableColumn, datatables_response
+from app.shared.pagination import parse_page_size
+from app.shared.streaming import stream_template_response
+
+# Columns of the failed login grid in DataTables server-side mode. Only indexed columns are searchable
+DATATABLE_COLUMNS = [
+    DataTableColumn('email', FailedLogin.email),
+    DataTableColumn('ip', FailedLogin.ip),
+    DataTableColumn('user_agent', FailedLogin.user_agent, searchable=False, orderable=False),
+    DataTableColumn('created_at', FailedLogin.created_at, searchable=False),
+]
+
+# Time range shown when the explorer is opened without one
+DEFAULT_WINDOW = timedelta(hours=1)
+# Time range shown when the history is opened without one
+DEFAULT_HISTORY_WINDOW = timedelta(days=7)
+# Format used by datetime-local inputs
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+def parse_explorer_filters(args):
+    """Reads the time range, email and ip filters from the query string. Times are UTC and the range defaults to the
+    last hour, so the cost of a page does not depend on how much history has built up. Returns the filters and whether
+    the time range that was entered was valid"""
+    valid = True
+    try:
+        until = datetime.fromisoformat(args['until']) if args.get('until') else None
+        since = datetime.fromisoformat(args['since']) if args.get('since') else None
+    except ValueError:
+        valid = False
+        until, since = None, None
+
+    return {
+        'since': since or (until or utc_now()) - DEFAULT_WINDOW,
+        'until': until,
+        'email': args.get('email', '').strip(),
+        'ip': args.get('ip', '').strip(),
+    }, valid
+
+
+def explorer_query_args(filters):
+    """Converts the explorer filters back into query string arguments for links"""
+    return {
+        'since': filters['since'].strftime(TIME_FORMAT),
+        'until': filters['until'].strftime(TIME_FORMAT) if filters['until'] else '',
+        'email': filters['email'],
+        'ip': filters['ip'],
+    }
 
 
 @failed_logins.route('/all-failed-logins')
 @login_required
 def all_failed_logins():
-    """Renders the html for the grid to view all failed logins"""
+    """Renders the failed login explorer. It shows one keyset paginated page of failed logins in a time range, which
+    defaults to the last hour, and can be filtered by email and ip address. Passing view=live hands paging to DataTables,
+    view=all streams every failed login in the range and view=history shows hourly counts from the rollups"""
 
     #Checks if the current user
     if not current_user.is_admin:
         current_app.logger.warning(
             f'Access_denied user:{current_user.email} cannot view /all-failed-logins resource'
         )
-        render_template('error/cannot-view-this-resource.html', user=current_user)
+        return render_template('error/cannot-view-this-resource.html', user=current_user), 403
+
+    filters, valid = parse_explorer_filters(request.args)
+    if not valid:
+        flash('Please enter a valid time range', category='error')
+    query_args = explorer_query_args(filters)
+    page_size = parse_page_size(request.args.get('page_size'))
+    view = request.args.get('view', 'window')
+
+    if view == 'history':
+        since = filters['since'] if request.args.get('since') else (filters['until'] or utc_now()) - DEFAULT_HISTORY_WINDOW
+        query_args['since'] = since.strftime(TIME_FORMAT)
+        return render_template('failed_login/history.html', user=current_user, query_args=query_args,
+                               hourly_totals=FailedLoginRollup.hourly_totals(since, filters['until']),
+                               top_ips=FailedLoginRollup.top_values('ip', since, filters['until']),
+                               top_emails=FailedLoginRollup.top_values('email', since, filters['until']),
+                               top_user_agents=FailedLoginRollup.top_values('user_agent', since, filters['until']),
+                               view='history')
+
+    if view == 'all':
+        failed_login = FailedLogin.stream_failed_logins(**filters)
+        return stream_template_response('failed_login/grid.html', user=current_user, failed_login=failed_login,
+                                        next_cursor=None, query_args=query_args, page_size=page_size, view='all')
+
+    if view == 'live':
+        return render_template('failed_login/grid.html', user=current_user, failed_login=[], next_cursor=None,
+                               query_args=query_args, page_size=page_size, view='live')
+
+    page = FailedLogin.fetch_failed_logins_page(**filters, cursor=request.args.get('cursor'), page_size=page_size)
+    return render_template('failed_login/grid.html', user=current_user, failed_login=page.items,
+                           next_cursor=page.next_cursor, query_args=query_args, page_size=page_size, view='window')
+
+
+@failed_logins.route('/data')
+@login_required
+def data():
+    """Returns a page of failed logins in the requested time range as JSON using the DataTables server-side
+    processing protocol"""
+    if not current_user.is_admin:
+        current_app.logger.warning(
+            f'Access_denied user:{current_user.email} cannot view /failed-logins/data resource'
+        )
+        return jsonify({'error': 'You do not have enough privileges to view this resource'}), 403
+
+    filters, _ = parse_explorer_filters(request.args)
+    statement = FailedLogin.apply_window_filters(
+        select(FailedLogin.id, *(column.column for column in DATATABLE_COLUMNS)), **filters)
+
+    def serialize(row):
+        serialized = {column.name: getattr(row, column.name) for column in DATATABLE_COLUMNS}
+        serialized['created_at'] = str(row.created_at)
+        return serialized
 
-    failed_login = FailedLogin.fetch_all_failed_logins()
-    return render_template('failed_login/grid.html', user=current_user, failed_login=failed_login)
\ No newline at end of file
+    return datatables_response(request.args, statement, DATATABLE_COLUMNS, FailedLogin.id, serialize)
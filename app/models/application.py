@@ -1,8 +1,14 @@
+from collections import Counter
+
 from flask import flash, current_app
-from sqlalchemy import event
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from app import db
+from app.models.server import Server
+from app.shared.pagination import DEFAULT_PAGE_SIZE, Page, keyset_page, sort_order
+from app.shared.streaming import stream_rows
+from app.shared.uniqueness import violated_unique_column
 
 class Application(db.Model):
     """
@@ -28,20 +34,42 @@ class Application(db.Model):
             Any extra information about the application
         production_pods: Integer
             the number of pods this application has up in production
-        server: VARCHAR(50)
+        server_id: Integer
+            Id of the server the application is deployed on
+        server:
             The server the application is deployed on
         """
 
     id = db.Column(db.Integer, primary_key = True)
     name = db.Column(db.String(150), unique = True, nullable=False)
-    team_name = db.Column(db.String(150), nullable=False)
+    team_name = db.Column(db.String(150), nullable=False, index=True)
     team_email = db.Column(db.String(150),nullable=False)
     url = db.Column(db.String(200), unique=True, nullable=False)
     swagger = db.Column(db.String(200))
     bitbucket = db.Column(db.String(200), unique = True, nullable=False)
-    extra_info = db.Column(db.Text(1000))
+    extra_info = db.Column(db.String(1000))
     production_pods = db.Column(db.Integer, nullable=False)
-    server = db.Column(db.String(50), db.ForeignKey('server.name'))
+    server_id = db.Column(db.Integer, db.ForeignKey('server.id'), index=True)
+    server = db.relationship('Server', back_populates='applications')
+
+    __table_args__ = (
+        # Swagger urls are unique, but most applications have none, so applications without one are left out of the
+        # index. Lookups must also exclude empty values for the database to use it
+        db.Index('uq_application_swagger', 'swagger', unique=True,
+                 postgresql_where=db.text("swagger IS NOT NULL AND swagger <> ''"),
+                 sqlite_where=db.text("swagger IS NOT NULL AND swagger <> ''")),
+        # The grid filters match a prefix of the name or team name. PostgreSQL only uses a b-tree for LIKE 'prefix%'
+        # under the C collation, so these pattern indexes serve the filters whatever the database's collation is
+        db.Index('ix_application_name_pattern', 'name', postgresql_ops={'name': 'varchar_pattern_ops'})
+        .ddl_if(dialect='postgresql'),
+        db.Index('ix_application_team_name_pattern', 'team_name', postgresql_ops={'team_name': 'varchar_pattern_ops'})
+        .ddl_if(dialect='postgresql'),
+    )
+
+    # Columns the application grid can be sorted by. Each one is indexed so keyset pagination is an index seek. Server
+    # sorts by the joined server's name, read through the unique server name index and each server's applications
+    # through the server_id index. Applications without a server have no server name and sort after the rest
+    SORTABLE_COLUMNS = ('id', 'name', 'team_name', 'server')
 
     @staticmethod
     def find_application_by_id(id):
@@ -128,13 +156,115 @@ class Application(db.Model):
                 })
 
     @staticmethod
-    def create_application(name, team_name, team_email, url, swagger, bitbucket, production_pods, extra_info, server):
-        """Creates a new application and adds it to the database"""
+    def apply_grid_filters(query, name=None, team_name=None, server=None):
+        """Applies the application grid filters to a query or select statement. The server is given by name, which is
+        looked up once in the unique index on server names before the server id index is searched"""
+        if name:
+            query = query.filter(Application.name.startswith(name, autoescape=True))
+        if team_name:
+            query = query.filter(Application.team_name.startswith(team_name, autoescape=True))
+        if server:
+            server_id = select(Server.id).where(Server.name == server).scalar_subquery()
+            query = query.filter(Application.server_id == server_id)
+        return query
+
+    @staticmethod
+    def grid_sort_columns(sort):
+        """Returns the columns to order the application grid by. Id is always last so every row has a unique position"""
+        if sort not in Application.SORTABLE_COLUMNS or sort == 'id':
+            return [Application.id]
+        if sort == 'server':
+            return [Server.name.label('server'), Application.id]
+        return [getattr(Application, sort), Application.id]
+
+    @staticmethod
+    def grid_columns():
+        """Returns the columns of an application grid row, which are the application's own and its server's name"""
+        return [*Application.__table__.columns, Server.name.label('server')]
+
+    @staticmethod
+    def stream_applications(name=None, team_name=None, server=None, sort='id', descending=False):
+        """Yields every application matching the grid filters as lightweight rows, fetched from the database in chunks"""
+        statement = Application.apply_grid_filters(
+            select(*Application.grid_columns()).outerjoin(Server, Application.server_id == Server.id),
+            name, team_name, server)
+        order_by = sort_order(Application.grid_sort_columns(sort), descending, nullable=sort == 'server')
+        try:
+            yield from stream_rows(db.session, statement.order_by(*order_by))
+        except SQLAlchemyError as err:
+            current_app.logger.error(
+                'An error occurred whilst streaming rows from the application table',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+
+    @staticmethod
+    def find_application_names_by_server(server_id):
+        """Finds the names of the applications deployed on a server using the server's id"""
+        try:
+            return list(db.session.scalars(select(Application.name).where(Application.server_id == server_id)
+                                           .order_by(Application.name)))
+        except SQLAlchemyError as err:
+            current_app.logger.error(
+                f'An error occurred whilst finding the applications deployed on server with id: {server_id}',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+            return []
+
+    @staticmethod
+    def stream_applications_with_servers():
+        """Yields every application with the cpu, memory and location of its server, joined by the database and
+        fetched in chunks. A database error is logged and raised"""
+        statement = (select(*Application.grid_columns(), Server.cpu.label('server_cpu'),
+                            Server.memory.label('server_memory'), Server.location.label('server_location'))
+                     .outerjoin(Server, Application.server_id == Server.id)
+                     .order_by(Application.id))
+        try:
+            yield from stream_rows(db.session, statement)
+        except SQLAlchemyError as err:
+            current_app.logger.error(
+                'An error occurred whilst streaming rows from the application table joined to the server table',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+            # Re-raised so exports are cut off rather than ending as if every row was sent
+            raise
+
+    @staticmethod
+    def fetch_applications_page(name=None, team_name=None, server=None, sort='id', descending=False, cursor=None,
+                                page_size=DEFAULT_PAGE_SIZE):
+        """Fetches a single keyset paginated page of applications, filtered and sorted on indexed columns.
+        Name and team name are prefix matches, server is an exact match"""
+        try:
+            query = Application.apply_grid_filters(
+                db.session.query(*Application.grid_columns()).outerjoin(Server, Application.server_id == Server.id),
+                name, team_name, server)
+            sort_columns = Application.grid_sort_columns(sort)
+            return keyset_page(query, sort_columns, cursor=cursor, descending=descending, page_size=page_size,
+                               nullable=sort == 'server')
+        except SQLAlchemyError as err:
+            current_app.logger.error(
+                'An error occurred whilst fetching a page of the application table',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+            return Page([], None)
+
+    @staticmethod
+    def create_application(name, team_name, team_email, url, swagger, bitbucket, production_pods, extra_info, server_id):
+        """Creates a new application and adds it to the database.
+        Returns the unique column that failed if another application saved the same value first"""
         try:
             new_application = Application(name=name, team_email=team_email, team_name=team_name, url=url, swagger=swagger,
                                           bitbucket=bitbucket,production_pods=production_pods, extra_info=extra_info,
-                                          server=server)
+                                          server_id=server_id)
             db.session.add(new_application)
+            Server.adjust_rollups([rollup_change(server_id, 1, production_pods)])
             db.session.commit()
         except SQLAlchemyError as err:
             db.session.rollback()
@@ -144,16 +274,49 @@ class Application(db.Model):
                     "error": str(err),
                     "error_type": type(err).__name__,
                 })
+            # A unique value taken by a concurrent save is shown on the form rather than flashed
+            conflict = violated_unique_column(err, Application) if isinstance(err, IntegrityError) else None
+            if conflict:
+                return conflict
             flash('Unable to create application', category='error')
         else:
             current_app.logger.info(f'Application {name} added successfully')
             flash('Application added successfully', category='success')
 
+    @staticmethod
+    def insert_applications(rows):
+        """Adds a batch of applications to the table in one transaction using a single executemany. Each row is a dict
+        of the application's columns. Returns True if the batch was saved"""
+        try:
+            db.session.execute(insert(Application), rows)
+            applications, production_pods = Counter(), Counter()
+            for row in rows:
+                applications[row['server_id']] += 1
+                production_pods[row['server_id']] += row['production_pods']
+            Server.adjust_rollups([rollup_change(server_id, count, production_pods[server_id])
+                                   for server_id, count in applications.items()])
+            db.session.commit()
+        except SQLAlchemyError as err:
+            db.session.rollback()
+            current_app.logger.error(
+                f'Unable to save a batch of {len(rows)} applications',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+            return False
+        return True
+
     @staticmethod
     def update_application(application_id, updated_application):
-        """Updates an existing application in the database"""
+        """Updates an existing application in the database.
+        Returns the unique column that failed if another application saved the same value first"""
         try:
+            # The application is taken off its old server and added to its new one by updates that read the row
+            # themselves, so concurrent updates of the application move its pods one at a time
+            db.session.execute(application_rollup_statement(application_id, -1))
             db.session.query(Application).filter_by(id=application_id).update(updated_application)
+            db.session.execute(application_rollup_statement(application_id, 1))
             db.session.commit()
         except SQLAlchemyError as err:
             db.session.rollback()
@@ -163,6 +326,10 @@ class Application(db.Model):
                     "error": str(err),
                     "error_type": type(err).__name__,
                 })
+            # A unique value taken by a concurrent save is shown on the form rather than flashed
+            conflict = violated_unique_column(err, Application) if isinstance(err, IntegrityError) else None
+            if conflict:
+                return conflict
             flash('Unable to update application', category='error')
         else:
             current_app.logger.info(f"Application: {updated_application['name']} successfully updated")
@@ -173,6 +340,8 @@ class Application(db.Model):
     def delete_application(application):
         """Deletes an application from the database"""
         try:
+            # Runs before the delete is flushed, as it reads the server and pods from the row being deleted
+            db.session.execute(application_rollup_statement(application.id, -1))
             db.session.delete(application)
             db.session.commit()
         except SQLAlchemyError as err:
@@ -189,66 +358,114 @@ class Application(db.Model):
             flash('Application deleted successfully', category='success')
 
 
+    @staticmethod
+    def rebuild_server_rollups():
+        """Recounts the applications and production pods of every server from the application table. Returns True if
+        the counts were saved"""
+        try:
+            db.session.execute(server_rollups_statement())
+            db.session.commit()
+        except SQLAlchemyError as err:
+            db.session.rollback()
+            current_app.logger.error(
+                'Unable to rebuild the application counts of the server table',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+            return False
+        return True
+
+
+def rollup_change(server_id, applications, production_pods):
+    """Returns a change to the application count and production pod total of a server, for Server.adjust_rollups"""
+    return {'server_id': server_id, 'applications': applications, 'production_pods': production_pods}
+
+
+def application_rollup_statement(application_id, sign):
+    """Returns an update that adds an application to (sign 1) or takes it off (sign -1) the application count and
+    production pod total of its server. The server and pods are read from the application row by the update itself,
+    which SQLite runs under the transaction's write lock and PostgreSQL runs after locking the row"""
+    deployed_on = (select(Application.server_id).where(Application.id == application_id).with_for_update()
+                   .scalar_subquery())
+    production_pods = select(Application.production_pods).where(Application.id == application_id).scalar_subquery()
+    table = Server.__table__
+    return (update(table).where(table.c.id == deployed_on)
+            .values(application_count=table.c.application_count + sign,
+                    total_production_pods=table.c.total_production_pods + sign * production_pods))
+
+
+def server_rollups_statement():
+    """Returns an update that sets the application count and production pod total of every server from the
+    application table"""
+    deployed = select(func.count()).where(Application.server_id == Server.id).scalar_subquery()
+    production_pods = (select(func.coalesce(func.sum(Application.production_pods), 0))
+                       .where(Application.server_id == Server.id).scalar_subquery())
+    return update(Server.__table__).values(application_count=deployed, total_production_pods=production_pods)
+
+# Demo data added when the application table is created and SEED_DEMO_DATA is set. Servers are given by name and
+# replaced with their ids when the rows are inserted
+DEMO_APPLICATIONS = [
+    {'name': 'Example App One', 'team_name': 'Team One', 'team_email': 'team.one@gmail.com',
+     'url': 'https://exampleappone.com', 'swagger': 'https://exampleappone.com/swagger/ui',
+     'bitbucket': 'https://bitbucket.org/repos/exampleappone',
+     'extra_info': 'This is a Java application that uses the springboot framework.', 'production_pods': 1,
+     'server': 'ab-0001'},
+    {'name': 'Example App Two', 'team_name': 'Team Two', 'team_email': 'team.two@gmail.com',
+     'url': 'https://exampleapptwo.com', 'swagger': 'https://exampleapptwo.com/swagger/ui',
+     'bitbucket': 'https://bitbucket.org/repos/exampleapptwo', 'extra_info': '', 'production_pods': 2,
+     'server': 'ab-0001'},
+    {'name': 'Example App Three', 'team_name': 'Team Three', 'team_email': 'team.three@gmail.com',
+     'url': 'https://exampleappthree.com', 'swagger': 'https://exampleappthree.com/swagger/ui',
+     'bitbucket': 'https://bitbucket.org/repos/exampleappthree', 'extra_info': '', 'production_pods': 3,
+     'server': 'ab-0003'},
+    {'name': 'Example App Four', 'team_name': 'Team Four', 'team_email': 'team.four@gmail.com',
+     'url': 'https://exampleappfour.com', 'swagger': 'https://exampleappfour.com/swagger/ui',
+     'bitbucket': 'https://bitbucket.org/repos/exampleappfour', 'extra_info': '', 'production_pods': 2,
+     'server': 'ab-0004'},
+    {'name': 'Example App Five', 'team_name': 'Team Five', 'team_email': 'team.five@gmail.com',
+     'url': 'https://exampleappfive.com', 'swagger': 'https://exampleappfive.com/swagger/ui',
+     'bitbucket': 'https://bitbucket.org/repos/exampleappfive', 'extra_info': '', 'production_pods': 1,
+     'server': 'ab-0001'},
+    {'name': 'Example App Six', 'team_name': 'Team Six', 'team_email': 'team.six@gmail.com',
+     'url': 'https://exampleappsix.com', 'swagger': 'https://exampleappsix.com/swagger/ui',
+     'bitbucket': 'https://bitbucket.org/repos/exampleappsix', 'extra_info': '', 'production_pods': 3,
+     'server': 'ab-0009'},
+    {'name': 'Example App Seven', 'team_name': 'Team Seven', 'team_email': 'team.seven@gmail.com',
+     'url': 'https://exampleappseven.com', 'swagger': '', 'bitbucket': 'https://bitbucket.org/repos/exampleappseven',
+     'extra_info': 'This is an Angular application which uses Ngrx for state management', 'production_pods': 1,
+     'server': 'ab-0010'},
+    {'name': 'Example App Eight', 'team_name': 'Team Eight', 'team_email': 'team.eight@gmail.com',
+     'url': 'https://exampleappeight.com', 'swagger': 'https://exampleappeight.com/swagger/ui',
+     'bitbucket': 'https://bitbucket.org/repos/exampleappeight', 'extra_info': '', 'production_pods': 1,
+     'server': 'ab-0005'},
+    {'name': 'Example App Nine', 'team_name': 'Team Nine', 'team_email': 'team.nine@gmail.com',
+     'url': 'https://exampleappnine.com', 'swagger': '', 'bitbucket': 'https://bitbucket.org/repos/exampleappnine',
+     'extra_info': 'This is a React application that is used to manage loans', 'production_pods': 2,
+     'server': 'ab-0007'},
+    {'name': 'Example App Ten', 'team_name': 'Team Ten', 'team_email': 'team.ten@gmail.com',
+     'url': 'https://exampleappten.com', 'swagger': 'https://exampleappten.com/swagger/ui',
+     'bitbucket': 'https://bitbucket.org/repos/exampleappten', 'extra_info': '', 'production_pods': 1,
+     'server': 'ab-0002'},
+]
+
+
 @event.listens_for(Application.__table__, 'after_create')
-def create_applications(*args, **kwargs):
-    """Inserting 10 rows of data into the application table after database creation"""
+def create_applications(target, connection, **kwargs):
+    """Inserts the demo rows in one statement after the table is created, when SEED_DEMO_DATA is set"""
+    if not current_app.config.get('SEED_DEMO_DATA'):
+        return
     try:
-        db.session.add(Application(name='Example App One', team_name='Team One',
-                                   team_email='team.one@gmail.com', url='https://exampleappone.com',
-                                   swagger='https://exampleappone.com/swagger/ui',
-                                   bitbucket='https://bitbucket.org/repos/exampleappone', extra_info='This is a Java application that uses the springboot framework.',
-                                   production_pods=1, server='ab-0001'))
-        db.session.add(Application(name='Example App Two', team_name='Team Two',
-                                   team_email='team.two@gmail.com', url='https://exampleapptwo.com',
-                                   swagger='https://exampleapptwo.com/swagger/ui',
-                                   bitbucket='https://bitbucket.org/repos/exampleapptwo', extra_info='',
-                                   production_pods=2, server='ab-0001'))
-        db.session.add(Application(name='Example App Three', team_name='Team Three',
-                                   team_email='team.three@gmail.com', url='https://exampleappthree.com',
-                                   swagger='https://exampleappthree.com/swagger/ui',
-                                   bitbucket='https://bitbucket.org/repos/exampleappthree', extra_info='',
-                                   production_pods=3, server='ab-0003'))
-        db.session.add(Application(name='Example App Four', team_name='Team Four',
-                                   team_email='team.four@gmail.com', url='https://exampleappfour.com',
-                                   swagger='https://exampleappfour.com/swagger/ui',
-                                   bitbucket='https://bitbucket.org/repos/exampleappfour', extra_info='',
-                                   production_pods=2, server='ab-0004'))
-        db.session.add(Application(name='Example App Five', team_name='Team Five',
-                                   team_email='team.five@gmail.com', url='https://exampleappfive.com',
-                                   swagger='https://exampleappfive.com/swagger/ui',
-                                   bitbucket='https://bitbucket.org/repos/exampleappfive', extra_info='',
-                                   production_pods=1, server='ab-0001'))
-        db.session.add(Application(name='Example App Six', team_name='Team Six',
-                                   team_email='team.six@gmail.com', url='https://exampleappsix.com',
-                                   swagger='https://exampleappsix.com/swagger/ui',
-                                   bitbucket='https://bitbucket.org/repos/exampleappsix', extra_info='',
-                                   production_pods=3, server='ab-0009'))
-        db.session.add(Application(name='Example App Seven', team_name='Team Seven',
-                                   team_email='team.seven@gmail.com', url='https://exampleappseven.com',
-                                   swagger='',
-                                   bitbucket='https://bitbucket.org/repos/exampleappseven', extra_info='This is an Angular application which uses Ngrx for state management',
-                                   production_pods=1, server='ab-0010'))
-        db.session.add(Application(name='Example App Eight', team_name='Team Eight',
-                                   team_email='team.eight@gmail.com', url='https://exampleappeight.com',
-                                   swagger='https://exampleappeight.com/swagger/ui',
-                                   bitbucket='https://bitbucket.org/repos/exampleappeight', extra_info='',
-                                   production_pods=1, server='ab-0005'))
-        db.session.add(Application(name='Example App Nine', team_name='Team Nine',
-                                   team_email='team.nine@gmail.com', url='https://exampleappnine.com',
-                                   swagger='',
-                                   bitbucket='https://bitbucket.org/repos/exampleappnine', extra_info='This is a React application that is used to manage loans',
-                                   production_pods=2, server='ab-0007'))
-        db.session.add(Application(name='Example App Ten', team_name='Team Ten',
-                                   team_email='team.ten@gmail.com', url='https://exampleappten.com',
-                                   swagger='https://exampleappten.com/swagger/ui',
-                                   bitbucket='https://bitbucket.org/repos/exampleappten', extra_info='',
-                                   production_pods=1, server='ab-0002'))
-        db.session.commit()
+        # Uses the connection creating the table, as other connections cannot see it until create_all commits
+        server_ids = dict(connection.execute(select(Server.name, Server.id)).all())
+        rows = [{**{key: value for key, value in application.items() if key != 'server'},
+                 'server_id': server_ids.get(application['server'])} for application in DEMO_APPLICATIONS]
+        connection.execute(insert(Application), rows)
+        connection.execute(server_rollups_statement())
     except SQLAlchemyError as err:
-        db.session.rollback()
         current_app.logger.error(
             'Unable to add dummy data to Application table on database creation',
             extra={
                 "error": str(err),
                 "error_type": type(err).__name__,
-            })
\ No newline at end of file
+            })
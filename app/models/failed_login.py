@@ -1,10 +1,18 @@
 from datetime import timedelta, datetime, timezone
 
 from flask import current_app
-from sqlalchemy import event
+from sqlalchemy import delete, event, insert, select
 from sqlalchemy.exc import SQLAlchemyError
 
 from app import db
+from app.shared.pagination import DEFAULT_PAGE_SIZE, Page, keyset_page
+from app.shared.streaming import stream_rows
+
+
+def utc_now():
+    """Returns the current time as a naive UTC datetime, matching how failed login timestamps are stored"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 
 class FailedLogin(db.Model):
     """
@@ -24,10 +32,24 @@ class FailedLogin(db.Model):
                 Time of failed login attempt
     """
     id = db.Column(db.Integer, primary_key=True)
-    email = db.Column(db.String(150), index=True)
-    ip = db.Column(db.String(45), index=True)
+    email = db.Column(db.String(150))
+    ip = db.Column(db.String(45))
     user_agent = db.Column(db.String(255))
-    created_at = db.Column(db.DateTime, index=True, nullable=False, server_default=db.func.now())
+    # Timestamps are naive UTC. They are set in Python so every row is stored in the same format, which keeps keyset
+    # comparisons on (created_at, id) exact
+    created_at = db.Column(db.DateTime, index=True, nullable=False, default=utc_now,
+                           server_default=db.func.now())
+
+    __table_args__ = (
+        # The detection window counts filter on an email or ip address and a time range, so both are answered from
+        # a single index range scan. These also serve lookups on the email or ip address alone
+        db.Index('ix_failed_login_email_created_at', 'email', 'created_at'),
+        db.Index('ix_failed_login_ip_created_at', 'ip', 'created_at'),
+        # Rows are inserted in time order, so on PostgreSQL a BRIN index covers the time range scans of the global
+        # window count, the rollup and retention at a fraction of the size and write cost of a b-tree
+        db.Index('ix_failed_login_created_at_brin', 'created_at', postgresql_using='brin')
+        .ddl_if(dialect='postgresql'),
+    )
 
     WINDOW = timedelta(minutes=5)
     ACCOUNT_FAIL_THRESHOLD = 5
@@ -50,10 +72,52 @@ class FailedLogin(db.Model):
                     "error_type": type(err).__name__,
                 })
 
+    @staticmethod
+    def insert_failed_logins(rows):
+        """Adds a batch of failed login entries to the table in one transaction using a single executemany.
+        Each row is a dict of email, ip, user_agent and created_at. Returns True if the batch was saved"""
+        try:
+            db.session.execute(insert(FailedLogin), rows)
+            db.session.commit()
+        except SQLAlchemyError as err:
+            db.session.rollback()
+            current_app.logger.error(
+                f'An error was encountered when saving a batch of {len(rows)} failed login attempts',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+            return False
+        return True
+
+    @staticmethod
+    def prune_failed_logins(before, batch_size):
+        """Deletes failed logins older than a time in batches, committing after each batch so the table is never
+        locked for long. Returns the number of rows deleted"""
+        deleted = 0
+        while True:
+            batch = select(FailedLogin.id).where(FailedLogin.created_at < before).limit(batch_size)
+            try:
+                result = db.session.execute(delete(FailedLogin).where(FailedLogin.id.in_(batch))
+                                            .execution_options(synchronize_session=False))
+                db.session.commit()
+            except SQLAlchemyError as err:
+                db.session.rollback()
+                current_app.logger.error(
+                    f'An error was encountered when pruning failed logins older than {before}',
+                    extra={
+                        "error": str(err),
+                        "error_type": type(err).__name__,
+                    })
+                return deleted
+            deleted += result.rowcount
+            if result.rowcount < batch_size:
+                return deleted
+
     @staticmethod
     def recent_failures_for_email(email):
         """Find failed login by email"""
-        since = datetime.now(timezone.utc) - FailedLogin.WINDOW
+        since = utc_now() - FailedLogin.WINDOW
         try:
             return FailedLogin.query.filter(FailedLogin.email == email,FailedLogin.created_at >= since).count()
         except SQLAlchemyError as err:
@@ -68,7 +132,7 @@ class FailedLogin(db.Model):
     @staticmethod
     def recent_failures_for_ip(ip):
         """Find failed login by ip address"""
-        since = datetime.now(timezone.utc) - FailedLogin.WINDOW
+        since = utc_now() - FailedLogin.WINDOW
         try:
             return FailedLogin.query.filter(FailedLogin.ip == ip, FailedLogin.created_at >= since).count()
         except SQLAlchemyError as err:
@@ -82,7 +146,7 @@ class FailedLogin(db.Model):
     @staticmethod
     def recent_global_failures():
         """Finds all recent login failures"""
-        since = datetime.now(timezone.utc) - FailedLogin.WINDOW
+        since = utc_now() - FailedLogin.WINDOW
         try:
             return FailedLogin.query.filter(FailedLogin.created_at >= since).count()
         except SQLAlchemyError as err:
@@ -108,36 +172,89 @@ class FailedLogin(db.Model):
                     "error_type": type(err).__name__,
                 })
 
+    @staticmethod
+    def apply_window_filters(query, since=None, until=None, email=None, ip=None):
+        """Restricts a query or select statement to a time range and optionally an exact email and ip address, so it
+        can be answered from the created_at, email and ip indexes"""
+        if since:
+            query = query.filter(FailedLogin.created_at >= since)
+        if until:
+            query = query.filter(FailedLogin.created_at < until)
+        if email:
+            query = query.filter(FailedLogin.email == email)
+        if ip:
+            query = query.filter(FailedLogin.ip == ip)
+        return query
+
+    @staticmethod
+    def fetch_failed_logins_page(since=None, until=None, email=None, ip=None, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        """Fetches a single page of failed logins in a time range, newest first, using keyset pagination on
+        (created_at, id)"""
+        try:
+            query = FailedLogin.apply_window_filters(FailedLogin.query, since, until, email, ip)
+            return keyset_page(query, [FailedLogin.created_at, FailedLogin.id], cursor=cursor, descending=True,
+                               page_size=page_size)
+        except SQLAlchemyError as err:
+            current_app.logger.error(
+                'An error occurred whilst fetching a page of the failed login table',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+            return Page([], None)
+
+    @staticmethod
+    def stream_failed_logins(since=None, until=None, email=None, ip=None):
+        """Yields every failed login in a time range, newest first, as lightweight rows fetched from the database in
+        chunks"""
+        statement = FailedLogin.apply_window_filters(select(*FailedLogin.__table__.columns), since, until, email, ip)
+        statement = statement.order_by(FailedLogin.created_at.desc(), FailedLogin.id.desc())
+        try:
+            yield from stream_rows(db.session, statement)
+        except SQLAlchemyError as err:
+            current_app.logger.error(
+                'An error occurred whilst streaming rows from the failed login table',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+
+
+# Demo data added when the failed login table is created and SEED_DEMO_DATA is set
+DEMO_FAILED_LOGINS = [
+    {'email': 'failed_loginone@gmail.com', 'ip': '192.84.17.203',
+     'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'},
+    {'email': 'failed_logintwo@gmail.com', 'ip': '203.45.67.89',
+     'user_agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15'},
+    {'email': 'failed_loginthree@yahoo.com', 'ip': '185.23.44.102',
+     'user_agent': 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:118.0) Gecko/20100101 Firefox/118.0'},
+    {'email': 'failed_loginfour@hotmail.com', 'ip': '77.92.14.56',
+     'user_agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1'},
+    {'email': 'failed_loginfive@outlook.com', 'ip': '62.101.33.210',
+     'user_agent': 'Mozilla/5.0 (Linux; Android 13; Pixel 6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Mobile Safari/537.36'},
+    {'email': 'failed_loginsix@gmail.com', 'ip': '91.204.11.77',
+     'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:118.0) Gecko/20100101 Firefox/118.0'},
+    {'email': 'failed_loginseven@protonmail.com', 'ip': '146.88.29.134', 'user_agent': 'curl/7.68.0'},
+    {'email': 'failed_logineight@gmail.com', 'ip': '213.55.98.45', 'user_agent': 'python-requests/2.31.0'},
+    {'email': 'failed_loginnine@yahoo.com', 'ip': '102.44.67.12',
+     'user_agent': 'Mozilla/5.0 (Windows NT 11.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/120.0.0.0 Safari/537.36'},
+    {'email': 'failed_loginten@hotmail.com', 'ip': '54.23.198.77',
+     'user_agent': 'Mozilla/5.0 (Linux; Android 12; Samsung Galaxy S21) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Mobile Safari/537.36'},
+]
+
+
 @event.listens_for(FailedLogin.__table__, 'after_create')
-def create_failed_logins(*args, **kwargs):
-    """Inserting 10 rows of data into the application table after database creation"""
+def create_failed_logins(target, connection, **kwargs):
+    """Inserts the demo rows in one statement after the table is created, when SEED_DEMO_DATA is set"""
+    if not current_app.config.get('SEED_DEMO_DATA'):
+        return
     try:
-        db.session.add(FailedLogin(email='failed_loginone@gmail.com', ip='192.84.17.203',
-                                   user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'))
-        db.session.add(FailedLogin(email='failed_logintwo@gmail.com', ip='203.45.67.89',
-                                   user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15'))
-        db.session.add(FailedLogin(email='failed_loginthree@yahoo.com', ip='185.23.44.102',
-                                   user_agent='Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:118.0) Gecko/20100101 Firefox/118.0'))
-        db.session.add(FailedLogin(email='failed_loginfour@hotmail.com', ip='77.92.14.56',
-                                   user_agent='Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1'))
-        db.session.add(FailedLogin(email='failed_loginfive@outlook.com', ip='62.101.33.210',
-                                   user_agent='Mozilla/5.0 (Linux; Android 13; Pixel 6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Mobile Safari/537.36'))
-        db.session.add(FailedLogin(email='failed_loginsix@gmail.com', ip='91.204.11.77',
-                                   user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:118.0) Gecko/20100101 Firefox/118.0'))
-        db.session.add(FailedLogin(email='failed_loginseven@protonmail.com', ip='146.88.29.134',
-                                   user_agent='curl/7.68.0'))
-        db.session.add(FailedLogin(email='failed_logineight@gmail.com', ip='213.55.98.45',
-                                   user_agent='python-requests/2.31.0'))
-        db.session.add(FailedLogin(email='failed_loginnine@yahoo.com', ip='102.44.67.12',
-                                   user_agent='Mozilla/5.0 (Windows NT 11.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/120.0.0.0 Safari/537.36'))
-        db.session.add(FailedLogin(email='failed_loginten@hotmail.com', ip='54.23.198.77',
-                                   user_agent='Mozilla/5.0 (Linux; Android 12; Samsung Galaxy S21) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Mobile Safari/537.36'))
-        db.session.commit()
+        # Uses the connection creating the table, as other connections cannot see it until create_all commits
+        connection.execute(insert(FailedLogin), DEMO_FAILED_LOGINS)
     except SQLAlchemyError as err:
-        db.session.rollback()
         current_app.logger.error(
             'Unable to add dummy data to Failed table on database creation',
             extra={
                 "error": str(err),
                 "error_type": type(err).__name__,
-            })
\ No newline at end of file
+            })
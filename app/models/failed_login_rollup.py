@@ -0,0 +1,139 @@
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy import func, insert, select, type_coerce
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.models.failed_login import FailedLogin
+
+
+def hour_of(column):
+    """Truncates a timestamp column to the start of its hour in the database"""
+    if db.engine.dialect.name == 'sqlite':
+        return type_coerce(func.strftime('%Y-%m-%d %H:00:00.000000', column), db.DateTime)
+    return func.date_trunc('hour', column)
+
+
+class FailedLoginRollup(db.Model):
+    """
+        A class to represent the relational database table used to store hourly counts of failed logins, which are kept
+        after the raw failed logins have been pruned
+
+        Columns
+        -------------------
+        id: Integer
+            Identifier for each record
+        hour: DATETIME
+            Start of the hour the failed logins happened in (UTC)
+        dimension: VARCHAR(10)
+            What the failed logins were grouped by. One of ip, email, user_agent or total
+        value: VARCHAR(255)
+            The ip address, email or user agent the failed logins came from. Empty for the total of the hour
+        failures: Integer
+            Number of failed logins for the value in the hour
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    hour = db.Column(db.DateTime, nullable=False, index=True)
+    dimension = db.Column(db.String(10), nullable=False)
+    value = db.Column(db.String(255), nullable=False)
+    failures = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('dimension', 'value', 'hour', name='uq_failed_login_rollup_dimension_value_hour'),
+    )
+
+    DIMENSIONS = ('ip', 'email', 'user_agent')
+    TOTAL = 'total'
+
+    @staticmethod
+    def rolled_up_until():
+        """Returns the end of the latest hour that has been rolled up, or None if nothing has been rolled up. Failed
+        logins before this time are already counted in the rollups"""
+        latest = db.session.scalar(select(func.max(FailedLoginRollup.hour)))
+        return latest + timedelta(hours=1) if latest else None
+
+    @staticmethod
+    def roll_up_failed_logins(until):
+        """Counts the failed logins in every complete hour before until that has not been rolled up yet, per ip
+        address, email and user agent as well as in total, and stores the counts in one transaction. until must be the
+        start of an hour. Returns the time failed logins are rolled up until, or None if the rollup failed"""
+        try:
+            since = FailedLoginRollup.rolled_up_until()
+            if since is not None and since >= until:
+                return since
+
+            hour = hour_of(FailedLogin.created_at)
+            rows = []
+            for dimension in FailedLoginRollup.DIMENSIONS:
+                column = getattr(FailedLogin, dimension)
+                statement = (select(hour.label('hour'), column.label('value'), func.count().label('failures'))
+                             .where(FailedLogin.created_at < until, column.is_not(None))
+                             .group_by(hour, column))
+                if since is not None:
+                    statement = statement.where(FailedLogin.created_at >= since)
+                rows.extend({'hour': row.hour, 'dimension': dimension, 'value': row.value, 'failures': row.failures}
+                            for row in db.session.execute(statement))
+
+            statement = (select(hour.label('hour'), func.count().label('failures'))
+                         .where(FailedLogin.created_at < until)
+                         .group_by(hour))
+            if since is not None:
+                statement = statement.where(FailedLogin.created_at >= since)
+            rows.extend({'hour': row.hour, 'dimension': FailedLoginRollup.TOTAL, 'value': '', 'failures': row.failures}
+                        for row in db.session.execute(statement))
+
+            if rows:
+                db.session.execute(insert(FailedLoginRollup), rows)
+                db.session.commit()
+            return FailedLoginRollup.rolled_up_until() or until
+        except SQLAlchemyError as err:
+            db.session.rollback()
+            current_app.logger.error(
+                'An error occurred whilst rolling up the failed login table',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+            return None
+
+    @staticmethod
+    def top_values(dimension, since, until=None, limit=10):
+        """Finds the ip addresses, emails or user agents with the most failed logins between two hours"""
+        statement = (select(FailedLoginRollup.value, func.sum(FailedLoginRollup.failures).label('failures'))
+                     .where(FailedLoginRollup.dimension == dimension, FailedLoginRollup.hour >= since)
+                     .group_by(FailedLoginRollup.value)
+                     .order_by(func.sum(FailedLoginRollup.failures).desc(), FailedLoginRollup.value)
+                     .limit(limit))
+        if until:
+            statement = statement.where(FailedLoginRollup.hour < until)
+        try:
+            return db.session.execute(statement).all()
+        except SQLAlchemyError as err:
+            current_app.logger.error(
+                f'An error occurred whilst fetching the top {dimension} values from the failed login rollups',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+            return []
+
+    @staticmethod
+    def hourly_totals(since, until=None):
+        """Finds the number of failed logins in each hour between two hours"""
+        statement = (select(FailedLoginRollup.hour, func.sum(FailedLoginRollup.failures).label('failures'))
+                     .where(FailedLoginRollup.dimension == FailedLoginRollup.TOTAL, FailedLoginRollup.hour >= since)
+                     .group_by(FailedLoginRollup.hour)
+                     .order_by(FailedLoginRollup.hour.desc()))
+        if until:
+            statement = statement.where(FailedLoginRollup.hour < until)
+        try:
+            return db.session.execute(statement).all()
+        except SQLAlchemyError as err:
+            current_app.logger.error(
+                'An error occurred whilst fetching hourly totals from the failed login rollups',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+            return []
@@ -1,8 +1,10 @@
 from flask import flash, current_app
-from sqlalchemy import event
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import bindparam, event, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from app import db
+from app.shared.streaming import stream_rows
+from app.shared.uniqueness import violated_unique_column
 
 class Server (db.Model):
     """
@@ -20,6 +22,10 @@ class Server (db.Model):
             The amount of memory the server has
         Location: VARCHAR(50)
             The location of the server
+        application_count: Integer
+            The number of applications deployed on the server, kept up to date as applications are saved
+        total_production_pods: Integer
+            The total production pods of the applications deployed on the server, kept up to date with the count
         applications:
             Convenient way to access all the applications related to a server
         """
@@ -27,8 +33,25 @@ class Server (db.Model):
     name = db.Column(db.String(50), unique= True, nullable=False)
     cpu = db.Column(db.Integer, nullable=False)
     memory = db.Column(db.Integer, nullable=False)
-    location = db.Column(db.String(50), nullable=False)
-    applications = db.relationship('Application')
+    location = db.Column(db.String(50), nullable=False, index=True)
+    application_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_production_pods = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Servers are only deleted once no applications are deployed on them, so deleting one never loads its applications
+    applications = db.relationship('Application', back_populates='server', passive_deletes=True)
+
+    @staticmethod
+    def adjust_rollups(changes):
+        """Adds to the application count and production pod total of servers in the current transaction, using a single
+        executemany. Each change is a dict of the server id, the applications and the production pods to add"""
+        if not changes:
+            return
+        # Runs against the table rather than the model so it is not mistaken for a change to the server names cached
+        # for the application forms
+        table = Server.__table__
+        statement = (update(table).where(table.c.id == bindparam('server_id'))
+                     .values(application_count=table.c.application_count + bindparam('applications'),
+                             total_production_pods=table.c.total_production_pods + bindparam('production_pods')))
+        db.session.execute(statement, changes)
 
     @staticmethod
     def fetch_server_with_entity(entity):
@@ -86,9 +109,26 @@ class Server (db.Model):
                     "error_type": type(err).__name__,
                 })
 
+    @staticmethod
+    def stream_all_servers():
+        """Yields every server as a lightweight row, fetched from the database in chunks. A database error is logged and
+        raised"""
+        try:
+            yield from stream_rows(db.session, select(*Server.__table__.columns).order_by(Server.id))
+        except SQLAlchemyError as err:
+            current_app.logger.error(
+                'An error occurred whilst streaming rows from the server table',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+            # Re-raised so exports and streamed grids are cut off rather than ending as if every row was sent
+            raise
+
     @staticmethod
     def create_server(name, cpu, memory, location):
-        """Creates a new server and adds it to the database"""
+        """Creates a new server and adds it to the database.
+        Returns the unique column that failed if another server saved the same value first"""
         try:
             new_server = Server(name=name, cpu=cpu, memory=memory, location=location)
             db.session.add(new_server)
@@ -101,14 +141,37 @@ class Server (db.Model):
                     "error": str(err),
                     "error_type": type(err).__name__,
                 })
+            # A unique value taken by a concurrent save is shown on the form rather than flashed
+            conflict = violated_unique_column(err, Server) if isinstance(err, IntegrityError) else None
+            if conflict:
+                return conflict
             flash('Unable to create server', category='error')
         else:
             current_app.logger.info(f'Server {name} added successfully',)
             flash('Server added successfully', category='success')
 
+    @staticmethod
+    def insert_servers(rows):
+        """Adds a batch of servers to the table in one transaction using a single executemany. Each row is a dict of
+        name, cpu, memory and location. Returns True if the batch was saved"""
+        try:
+            db.session.execute(insert(Server), rows)
+            db.session.commit()
+        except SQLAlchemyError as err:
+            db.session.rollback()
+            current_app.logger.error(
+                f'Unable to save a batch of {len(rows)} servers',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+            return False
+        return True
+
     @staticmethod
     def update_server(server_id, updated_server):
-        """Updates an existing server in the database"""
+        """Updates an existing server in the database.
+        Returns the unique column that failed if another server saved the same value first"""
         try:
             db.session.query(Server).filter_by(id=server_id).update(updated_server)
             db.session.commit()
@@ -120,6 +183,10 @@ class Server (db.Model):
                     "error": str(err),
                     "error_type": type(err).__name__,
                 })
+            # A unique value taken by a concurrent save is shown on the form rather than flashed
+            conflict = violated_unique_column(err, Server) if isinstance(err, IntegrityError) else None
+            if conflict:
+                return conflict
             flash('Unable to update server', category='error')
         else:
             current_app.logger.info(f"Server: {updated_server['name']} successfully updated",)
@@ -146,26 +213,33 @@ class Server (db.Model):
 
 
 
+# Demo data added when the server table is created and SEED_DEMO_DATA is set
+DEMO_SERVERS = [
+    {'name': 'ab-0001', 'cpu': 123, 'memory': 123, 'location': 'Walthamstow'},
+    {'name': 'ab-0002', 'cpu': 234, 'memory': 234, 'location': 'Harrow'},
+    {'name': 'ab-0003', 'cpu': 345, 'memory': 345, 'location': 'Walthamstow'},
+    {'name': 'ab-0004', 'cpu': 456, 'memory': 456, 'location': 'Walthamstow'},
+    {'name': 'ab-0005', 'cpu': 567, 'memory': 567, 'location': 'Harrow'},
+    {'name': 'ab-0006', 'cpu': 678, 'memory': 678, 'location': 'Walthamstow'},
+    {'name': 'ab-0007', 'cpu': 789, 'memory': 789, 'location': 'Walthamstow'},
+    {'name': 'ab-0008', 'cpu': 890, 'memory': 890, 'location': 'Harrow'},
+    {'name': 'ab-0009', 'cpu': 901, 'memory': 901, 'location': 'Walthamstow'},
+    {'name': 'ab-0010', 'cpu': 184, 'memory': 184, 'location': 'Walthamstow'},
+]
+
+
 @event.listens_for(Server.__table__, 'after_create')
-def create_servers(*args, **kwargs):
-    """Inserting 10 rows of data into server table on after database creation"""
+def create_servers(target, connection, **kwargs):
+    """Inserts the demo rows in one statement after the table is created, when SEED_DEMO_DATA is set"""
+    if not current_app.config.get('SEED_DEMO_DATA'):
+        return
     try:
-        db.session.add(Server(name='ab-0001', cpu=123, memory=123, location='Walthamstow'))
-        db.session.add(Server(name='ab-0002', cpu=234, memory=234, location='Harrow'))
-        db.session.add(Server(name='ab-0003', cpu=345, memory=345, location='Walthamstow'))
-        db.session.add(Server(name='ab-0004', cpu=456, memory=456, location='Walthamstow'))
-        db.session.add(Server(name='ab-0005', cpu=567, memory=567, location='Harrow'))
-        db.session.add(Server(name='ab-0006', cpu=678, memory=678, location='Walthamstow'))
-        db.session.add(Server(name='ab-0007', cpu=789, memory=789, location='Walthamstow'))
-        db.session.add(Server(name='ab-0008', cpu=890, memory=890, location='Harrow'))
-        db.session.add(Server(name='ab-0009', cpu=901, memory=901, location='Walthamstow'))
-        db.session.add(Server(name='ab-0010', cpu=184, memory=184, location='Walthamstow'))
-        db.session.commit()
+        # Uses the connection creating the table, as other connections cannot see it until create_all commits
+        connection.execute(insert(Server), DEMO_SERVERS)
     except SQLAlchemyError as err:
-        db.session.rollback()
         current_app.logger.error(
             'Unable to add dummy data to Server table on database creation',
             extra={
                 "error": str(err),
                 "error_type": type(err).__name__,
-            })
\ No newline at end of file
+            })
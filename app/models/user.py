@@ -1,8 +1,8 @@
 from flask import flash, current_app
 from sqlalchemy.exc import SQLAlchemyError
-from werkzeug.security import generate_password_hash
 
 from app import db
+from app.shared.hashing import password_hasher
 from flask_login import UserMixin
 
 class User(db.Model, UserMixin):
@@ -19,21 +19,24 @@ class User(db.Model, UserMixin):
         User's last name
     email: VARCHAR(150)
         User's email address
-    password: VARCHAR(20)
+    password: VARCHAR(255)
         Password for accessing the application
     is_admin: Boolean
         Stores if this user has an admin role. True = user has admin privileges
     failed_attempts: Integer
         Stores the number of failed login for user
+    login_not_before: DateTime
+        UTC time before which login attempts for this user are refused. Null when the user has no friction applied
     """
 
     id = db.Column(db.Integer, primary_key = True)
     email = db.Column(db.String(150), unique = True, nullable=False)
-    password = db.Column(db.String(20), nullable=False)
+    password = db.Column(db.String(255), nullable=False)
     first_name = db.Column(db.String(150), nullable=False)
     last_name = db.Column(db.String(150), nullable=False)
     is_admin = db.Column(db.Boolean, nullable=False)
     failed_attempts = db.Column(db.Integer, default=0, nullable=False)
+    login_not_before = db.Column(db.DateTime, nullable=True)
 
     @staticmethod
     def find_user_by_email(email):
@@ -54,7 +57,7 @@ class User(db.Model, UserMixin):
         """Add user to User table"""
         try:
             new_user = User(email=email, first_name=first_name, last_name=last_name,
-                            password=generate_password_hash(password, method='scrypt'), is_admin=is_admin)
+                            password=password_hasher.hash(password), is_admin=is_admin)
             db.session.add(new_user)
             db.session.commit()
         except SQLAlchemyError as err:
@@ -74,7 +77,7 @@ class User(db.Model, UserMixin):
         """Updates users password"""
         try:
             user = User.find_user_by_email(email)
-            user.password = generate_password_hash(password, method='scrypt')
+            user.password = password_hasher.hash(password)
             db.session.commit()
         except SQLAlchemyError as err:
             db.session.rollback()
@@ -1,12 +1,13 @@
 import os
 
-from werkzeug.security import generate_password_hash
-
 from app import db
+from app.shared.hashing import password_hasher
 from app.models.user import User
 
 
 def seed_users():
+    """Adds the admin and regular users from the environment if they do not exist yet. Returns the number added"""
+    added = 0
     users_to_seed = [
         {
             'email': os.environ.get('ADMIN_EMAIL'),
@@ -38,6 +39,8 @@ def seed_users():
             continue
 
         new_user = User(email=email, first_name=user_data['first_name'], last_name=user_data['last_name'],
-                        password=generate_password_hash(password, method='scrypt'), is_admin=user_data['is_admin'])
+                        password=password_hasher.hash(password), is_admin=user_data['is_admin'])
         db.session.add(new_user)
-        db.session.commit()
\ No newline at end of file
+        db.session.commit()
+        added += 1
+    return added
\ No newline at end of file
@@ -2,4 +2,4 @@ from flask import Blueprint
 
 server = Blueprint('server', __name__)
 
-from app.server import routes
\ No newline at end of file
+from app.server import routes, commands
\ No newline at end of file
@@ -0,0 +1,121 @@
+import bisect
+import threading
+import time
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.server import Server
+from app.shared.pagination import DEFAULT_PAGE_SIZE, Page, decode_cursor, encode_cursor
+
+# Seconds the cached server names are trusted for. Changes committed by other processes are picked up after at most
+# this long
+DEFAULT_SERVER_CHOICES_TTL = 60
+
+SERVER_CHOICES_TTL_CONFIG = 'SERVER_CHOICES_TTL'
+# Session info key marking that the current transaction has changed the server table
+SERVERS_CHANGED = 'servers_changed'
+
+
+class ServerChoicesCache:
+    """
+    A class that keeps the sorted names and ids of every server in memory so the application forms do not scan the
+    server table to build their dropdown on every request.
+
+    Any commit in this process that inserts, updates or deletes servers clears the cache. The cache is version stamped,
+    so names read from the database before such a commit are not cached after it. Entries also expire after
+    SERVER_CHOICES_TTL seconds to pick up changes made by other processes.
+    """
+
+    def __init__(self):
+        self._app = None
+        self._lock = threading.Lock()
+        self._servers = None
+        self._expires_at = 0
+        self._version = 0
+
+    def init_app(self, app):
+        """Binds the cache to an application and clears it"""
+        app.config.setdefault(SERVER_CHOICES_TTL_CONFIG, DEFAULT_SERVER_CHOICES_TTL)
+        self._app = app
+        self.invalidate()
+
+    def invalidate(self):
+        """Removes the cached servers"""
+        with self._lock:
+            self._servers = None
+            self._version += 1
+
+    def servers(self):
+        """Returns the names of every server in sorted order and their ids in the same order, from the cache when
+        possible"""
+        with self._lock:
+            if self._servers is not None and self._expires_at > time.monotonic():
+                return self._servers
+            version = self._version
+
+        rows = sorted(db.session.execute(select(Server.name, Server.id)).all())
+        servers = (tuple(row[0] for row in rows), tuple(row[1] for row in rows))
+        with self._lock:
+            if version == self._version:
+                self._servers = servers
+                self._expires_at = time.monotonic() + self._app.config[SERVER_CHOICES_TTL_CONFIG]
+        return servers
+
+    def names(self):
+        """Returns the name of every server in sorted order"""
+        return self.servers()[0]
+
+    def choices(self):
+        """Returns the servers as choices for a select field, valued by id and labelled by name"""
+        names, ids = self.servers()
+        return list(zip(ids, names))
+
+    def search(self, prefix='', cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        """Returns a page of the servers whose names start with a prefix, after the name in the cursor, as id and name
+        pairs. The names are sorted, so the page is found with a binary search rather than a scan"""
+        names, ids = self.servers()
+        after = decode_cursor(cursor, [Server.name])
+        # A cursor that does not hold a name is ignored, as comparing anything else with the names would fail
+        start = bisect.bisect_right(names, after[0]) if after and isinstance(after[0], str) else 0
+        start = max(start, bisect.bisect_left(names, prefix))
+        page = []
+        for name, server_id in zip(names[start:start + page_size + 1], ids[start:start + page_size + 1]):
+            if not name.startswith(prefix):
+                break
+            page.append((server_id, name))
+        if len(page) > page_size:
+            return Page(page[:page_size], encode_cursor(page[page_size - 1][1]))
+        return Page(page, None)
+
+
+server_choices = ServerChoicesCache()
+
+
+@event.listens_for(Session, 'after_flush')
+def mark_flushed_server_changes(session, flush_context):
+    """Marks the transaction when the unit of work has added, changed or deleted a server"""
+    if any(isinstance(instance, Server) for instance in (*session.new, *session.dirty, *session.deleted)):
+        session.info[SERVERS_CHANGED] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def mark_executed_server_changes(orm_execute_state):
+    """Marks the transaction when a bulk insert, update or delete statement targets the server table"""
+    if ((orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete)
+            and orm_execute_state.bind_mapper is Server.__mapper__):
+        orm_execute_state.session.info[SERVERS_CHANGED] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_server_choices(session):
+    """Clears the cached server names once a transaction that changed servers has committed"""
+    if session.info.pop(SERVERS_CHANGED, False):
+        server_choices.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_server_changes(session):
+    """Forgets the server changes of a transaction that was rolled back"""
+    session.info.pop(SERVERS_CHANGED, None)
@@ -0,0 +1,36 @@
+import click
+
+from app.models.application import Application
+from app.server import server
+from app.server.exporter import server_export
+from app.server.importer import ServerImporter
+from app.shared.bulk_export import export_to_file
+from app.shared.bulk_import import CSV_FORMAT, NDJSON_FORMAT, import_from_file
+
+
+@server.cli.command('import')
+@click.argument('source', type=click.File('rb'))
+@click.option('--format', 'import_format', type=click.Choice([CSV_FORMAT, NDJSON_FORMAT]),
+              help='Format of SOURCE. Defaults to the one implied by its extension')
+def import_servers_command(source, import_format):
+    """Imports servers from SOURCE, a CSV file with a header row or an NDJSON file with one server per line"""
+    import_from_file(ServerImporter(), source, import_format)
+
+
+@server.cli.command('export')
+@click.argument('output', type=click.File('wb'), default='-')
+@click.option('--format', 'export_format', type=click.Choice([CSV_FORMAT, NDJSON_FORMAT]),
+              help='Format of OUTPUT. Defaults to the one implied by its extension, or CSV')
+@click.option('--gzip/--no-gzip', 'compress', default=None,
+              help='Gzip OUTPUT. Defaults to compressing when its name ends with .gz')
+def export_servers_command(output, export_format, compress):
+    """Writes every server to OUTPUT, or to standard output if it is not given"""
+    export_to_file(*server_export(), output, export_format, compress)
+
+
+@server.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recounts the applications and production pods of every server from the application table"""
+    if not Application.rebuild_server_rollups():
+        raise click.ClickException('Unable to rebuild the server rollups')
+    click.echo('Rebuilt the application counts of every server')
@@ -0,0 +1,9 @@
+from app.models.server import Server
+
+# Columns of a server export, in the order they are written
+EXPORT_COLUMNS = [column.key for column in Server.__table__.columns]
+
+
+def server_export():
+    """Returns the columns of a server export and a stream of every server"""
+    return EXPORT_COLUMNS, Server.stream_all_servers()
@@ -8,9 +8,10 @@ from app.models.server import Server
 from app.server.form_errors import ServerFormError
 from app.shared.form_type_enum import FormType
 from app.shared.general_form_error_enum import GeneralFormError
+from app.shared.uniqueness import UniqueFieldsForm
 
 
-class ServerForm(FlaskForm):
+class ServerForm(UniqueFieldsForm, FlaskForm):
     """
     A class that represents the input fields for adding a new server
 
@@ -31,6 +32,12 @@ class ServerForm(FlaskForm):
     memory = IntegerField('Memory (GiB)', [NumberRange(min=1)])
     location = StringField('Location', [DataRequired(), validators.Regexp('^[a-zA-Z\s]+$', message=ServerFormError.INVALID_LOCATION_FORMAT.value), validators.Length(max=50, message=ServerFormError.INVALID_LOCATION_LENGTH.value)])
 
+    model = Server
+    unique_fields = {'name': ServerFormError.NAME_EXISTS.value}
+
+    def excluded_id(self):
+        return g.server_id if g.form_type == FormType.UPDATE.value else None
+
     def validate_cpu(self, field):
         """Checks if CPU is valid"""
         check_if_valid_integer_and_greater_then_zero(field.data)
@@ -41,13 +48,15 @@ class ServerForm(FlaskForm):
         check_if_valid_integer_and_greater_then_zero(field.data)
 
 
-    def validate_name(self, field):
-        """Checks if there is a server with the same name already in the Server table"""
-        retrieved_server = Server.find_server_by_name(field.data)
+class ServerImportForm(ServerForm):
+    """
+    A class that validates a row of a bulk server import with the same rules as the server form. Names are checked
+    against existing servers for a whole chunk of rows at once by the importer, rather than with a query per row
+    """
 
-        if ((g.form_type == FormType.UPDATE.value and retrieved_server and retrieved_server.id != g.server_id) or
-                (g.form_type == FormType.CREATE.value and retrieved_server)):
-            raise ValidationError(ServerFormError.NAME_EXISTS.value)
+    def validate_unique(self):
+        """Unique fields are checked by the importer for the whole chunk"""
+        return True
 
 
 def check_if_valid_integer_and_greater_then_zero(number):
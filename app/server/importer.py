@@ -0,0 +1,18 @@
+from app.models.server import Server
+from app.server.forms import ServerImportForm
+from app.shared.bulk_import import BulkImporter
+
+
+class ServerImporter(BulkImporter):
+    """Imports servers in chunks, validating each row with the server form"""
+
+    form_class = ServerImportForm
+    model = Server
+    unique_fields = ServerImportForm.unique_fields
+
+    def to_row(self, form):
+        return {'name': form.name.data, 'cpu': form.cpu.data, 'memory': form.memory.data,
+                'location': form.location.data}
+
+    def insert(self, rows):
+        return Server.insert_servers(rows)
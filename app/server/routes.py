@@ -1,11 +1,31 @@
-from flask import render_template, flash, request, url_for, redirect, g
+from flask import render_template, flash, request, url_for, redirect, g, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy import select
 
+from app.models.application import Application
 from app.models.server import Server
 from app.server import server
+from app.server.choices import server_choices
 from app.server.form_errors import ServerFormError
 from app.server.forms import ServerForm
+from app.server.exporter import server_export
+from app.server.importer import ServerImporter
+from app.shared.bulk_export import export_response
+from app.shared.bulk_import import import_from_request
+from app.shared.datatables import DataTableColumn, datatables_response
 from app.shared.form_type_enum import FormType
+from app.shared.pagination import parse_page_size
+from app.shared.streaming import stream_template_response
+
+# Columns of the server grid in DataTables server-side mode. Only indexed columns are searchable
+DATATABLE_COLUMNS = [
+    DataTableColumn('name', Server.name),
+    DataTableColumn('location', Server.location),
+    DataTableColumn('cpu', Server.cpu, searchable=False),
+    DataTableColumn('memory', Server.memory, searchable=False),
+    DataTableColumn('application_count', Server.application_count, searchable=False),
+    DataTableColumn('total_production_pods', Server.total_production_pods, searchable=False),
+]
 
 
 @server.route('/create', methods=['GET', 'POST'])
@@ -19,7 +39,9 @@ def create():
 
     # If the create form is valid add server to database
     if request.method == 'POST' and form.validate_on_submit():
-            Server.create_server(form.name.data, form.cpu.data, form.memory.data, form.location.data)
+            conflict = Server.create_server(form.name.data, form.cpu.data, form.memory.data, form.location.data)
+            if conflict:
+                form.add_unique_error(conflict)
 
     return render_template('server/add-server.html', user=current_user, form=form, server_form_error= ServerFormError)
 
@@ -42,7 +64,9 @@ def update():
         # Remove csrf_token form object
         updated_server.pop('csrf_token', None)
         if retrieved_server:
-            Server.update_server(server_id, updated_server)
+            conflict = Server.update_server(server_id, updated_server)
+            if conflict:
+                form.add_unique_error(conflict)
         else:
             message = f'Server {retrieved_server.name} cannot be updated as they do not exist'
             flash(message, category='error', )
@@ -60,25 +84,72 @@ def delete():
     if request.method == 'GET' and current_user.is_admin:
         server_id = request.args.get('server_id')
         retrieved_server = Server.find_server_by_id(server_id)
-        applications_deployed_on_server = retrieved_server.applications
 
-        # Checks if there are applications deployed on the server proposed to be deleted
-        if applications_deployed_on_server:
-            applications = ', '.join([app.name for app in applications_deployed_on_server])
+        if not retrieved_server:
+            message = f'Server with id {server_id} cannot be deleted as it does not exist'
+            flash(message, category='error')
+        # Checks the server's application count rather than loading the applications deployed on it
+        elif retrieved_server.application_count:
+            applications = ', '.join(Application.find_application_names_by_server(retrieved_server.id))
             message = f'Server {retrieved_server.name} cannot be deleted as application(s) {applications} are running on it'
             flash(message, category='error')
         # Delete server
-        elif retrieved_server:
-            Server.delete_server(retrieved_server)
         else:
-            message = f'Server {retrieved_server.name} cannot be deleted as it does not exist'
-            flash(message, category='error')
+            Server.delete_server(retrieved_server)
 
     return redirect(url_for('server.all_servers'))
 
 @server.route('/all-servers')
 @login_required
 def all_servers():
-    """Renders the html for the grid to view all servers"""
-    servers = Server.fetch_all_servers()
-    return render_template('server/grid.html', user=current_user, list=servers)
\ No newline at end of file
+    """Renders the grid to view all servers. By default DataTables loads the rows page by page from the data endpoint,
+    passing view=all streams every server into the html instead, reading them from the database in chunks"""
+    if request.args.get('view') == 'all':
+        servers = Server.stream_all_servers()
+        return stream_template_response('server/grid.html', user=current_user, list=servers, view='all')
+
+    return render_template('server/grid.html', user=current_user, list=[], view='live')
+
+
+@server.route('/data')
+@login_required
+def data():
+    """Returns a page of servers as JSON using the DataTables server-side processing protocol"""
+    statement = select(Server.id, *(column.column for column in DATATABLE_COLUMNS))
+
+    def serialize(row):
+        serialized = {column.name: getattr(row, column.name) for column in DATATABLE_COLUMNS}
+        serialized['edit_url'] = url_for('server.update', server_id=row.id)
+        if current_user.is_admin:
+            serialized['delete_url'] = url_for('server.delete', server_id=row.id)
+        return serialized
+
+    return datatables_response(request.args, statement, DATATABLE_COLUMNS, Server.id, serialize)
+
+
+@server.route('/choices')
+@login_required
+def choices():
+    """Returns a page of the servers whose names start with the q query parameter as JSON, for a typeahead on fleets
+    too large for one dropdown. Each result has the id the application forms submit and the name. Pass the returned
+    next_cursor as cursor to fetch the following page"""
+    page = server_choices.search(request.args.get('q', '').strip(), request.args.get('cursor'),
+                                 parse_page_size(request.args.get('page_size')))
+    return jsonify({'results': [{'id': server_id, 'name': name} for server_id, name in page.items],
+                    'next_cursor': page.next_cursor})
+
+
+@server.route('/import', methods=['POST'])
+@login_required
+def bulk_import():
+    """Imports servers from an uploaded CSV or NDJSON file, or a request body in either format. Returns a JSON report of
+    how many rows were created and the errors of every row that was not"""
+    return import_from_request(ServerImporter())
+
+
+@server.route('/export')
+@login_required
+def export():
+    """Downloads every server as a gzipped CSV file, or NDJSON with format=ndjson. Rows are streamed from the database
+    to the client as they are read"""
+    return export_response('servers', *server_export())
@@ -0,0 +1,164 @@
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from bisect import bisect_left
+
+# The index file starts with a magic number and a table of where each two byte digest prefix starts, followed by the
+# sorted 20 byte SHA-1 digests of every breached password
+MAGIC = b'BPWIDX01'
+DIGEST_SIZE = 20
+BUCKETS = 1 << 16
+HEADER = struct.Struct(f'<8s{BUCKETS + 1}Q')
+# Digests sorted in memory at a time when building an index from an unsorted hash list
+SORT_CHUNK_SIZE = 1_000_000
+
+
+class BreachedPasswordIndex:
+    """
+    A class that looks up passwords in a memory-mapped file of breached password SHA-1 digests.
+
+    The prefix table narrows a lookup to the digests that share the first two bytes of the password's digest, which are
+    then binary searched, so a lookup touches a handful of pages of the file however many passwords it holds.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size or self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f'{path} is not a breached password index')
+        _, *offsets = HEADER.unpack_from(self._map)
+        if HEADER.size + offsets[-1] * DIGEST_SIZE > len(self._map):
+            self._map.close()
+            raise ValueError(f'{path} is truncated')
+        self._offsets = offsets
+
+    def __len__(self):
+        return self._offsets[-1]
+
+    def _digest_at(self, position):
+        """Returns the digest stored at a position in the sorted digests"""
+        start = HEADER.size + position * DIGEST_SIZE
+        return self._map[start:start + DIGEST_SIZE]
+
+    def contains_digest(self, digest):
+        """Checks if a SHA-1 digest is in the index"""
+        bucket = int.from_bytes(digest[:2], 'big')
+        low, high = self._offsets[bucket], self._offsets[bucket + 1]
+        position = bisect_left(range(low, high), digest, key=self._digest_at) + low
+        return position < high and self._digest_at(position) == digest
+
+    def contains_password(self, password):
+        """Checks if a password is in the index"""
+        return self.contains_digest(hashlib.sha1(password.encode('utf-8')).digest())
+
+    def close(self):
+        self._map.close()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def open_index(path):
+    """Returns the index at a path, opening it the first time it is used in this process"""
+    index = _indexes.get(path)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(path)
+            if index is None:
+                index = _indexes[path] = BreachedPasswordIndex(path)
+    return index
+
+
+def parse_hash_line(line):
+    """Reads the SHA-1 digest from a line of a hash list. Lines are a hex digest optionally followed by a colon and a
+    count, as in the Have I Been Pwned downloads. Returns None for blank lines"""
+    line = line.strip()
+    if not line:
+        return None
+    digest = bytes.fromhex(line.split(':', 1)[0])
+    if len(digest) != DIGEST_SIZE:
+        raise ValueError(f'Invalid SHA-1 digest: {line}')
+    return digest
+
+
+def _sorted_runs(digests, directory):
+    """Sorts the digests in chunks that fit in memory, writing each chunk to a temporary file. Returns the paths of
+    the files. If reading or writing fails, the files already written are removed"""
+    paths = []
+    try:
+        chunk = []
+        for digest in digests:
+            chunk.append(digest)
+            if len(chunk) == SORT_CHUNK_SIZE:
+                paths.append(_write_run(sorted(chunk), directory))
+                chunk = []
+        if chunk:
+            paths.append(_write_run(sorted(chunk), directory))
+    except BaseException:
+        for path in paths:
+            os.remove(path)
+        raise
+    return paths
+
+
+def _write_run(chunk, directory):
+    """Writes a sorted chunk of digests to a temporary file and returns its path"""
+    handle, path = tempfile.mkstemp(dir=directory, suffix='.run')
+    with os.fdopen(handle, 'wb') as file:
+        file.write(b''.join(chunk))
+    return path
+
+
+def _read_run(path):
+    """Yields the digests in a temporary file"""
+    with open(path, 'rb') as file:
+        while digest := file.read(DIGEST_SIZE):
+            yield digest
+
+
+def build_index(lines, output_path):
+    """Builds an index file from the lines of a hash list, which does not need to be sorted. Duplicate digests are
+    stored once. Returns the number of digests in the index"""
+    directory = os.path.dirname(os.path.abspath(output_path))
+    runs = []
+    counts = [0] * BUCKETS
+    total = 0
+    temporary_path = f'{output_path}.tmp'
+    try:
+        runs = _sorted_runs(filter(None, map(parse_hash_line, lines)), directory)
+        with open(temporary_path, 'wb') as output:
+            output.write(b'\0' * HEADER.size)
+            previous = None
+            for digest in heapq.merge(*(_read_run(path) for path in runs)):
+                if digest == previous:
+                    continue
+                output.write(digest)
+                counts[int.from_bytes(digest[:2], 'big')] += 1
+                previous = digest
+                total += 1
+
+            offsets = [0]
+            for count in counts:
+                offsets.append(offsets[-1] + count)
+            output.seek(0)
+            output.write(HEADER.pack(MAGIC, *offsets))
+        os.replace(temporary_path, output_path)
+    finally:
+        for path in runs:
+            os.remove(path)
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+    # A rebuilt index replaces the file, so drop any mapping of the old one held by this process
+    with _indexes_lock:
+        stale = _indexes.pop(output_path, None)
+    if stale:
+        stale.close()
+    return total
@@ -0,0 +1,109 @@
+import csv
+import io
+import json
+import zlib
+
+import click
+from flask import Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.shared.bulk_import import CSV_FORMAT, NDJSON_FORMAT, detect_format
+from app.shared.streaming import stream_chunk_size
+
+# zlib level used to gzip exports. Level 6 is gzip's default and within a few percent of the smallest output
+DEFAULT_EXPORT_COMPRESSION_LEVEL = 6
+# Window bits that make zlib write a gzip header and trailer rather than a zlib one
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+GZIP_SUFFIX = '.gz'
+EXPORT_CONTENT_TYPES = {CSV_FORMAT: 'text/csv', NDJSON_FORMAT: 'application/x-ndjson'}
+UNSUPPORTED_EXPORT_FORMAT = 'Pass format=csv or format=ndjson'
+
+
+def encode_rows(columns, rows, export_format):
+    """Yields rows as UTF-8 CSV with a header row or as NDJSON. Rows are encoded in batches of GRID_STREAM_CHUNK_SIZE
+    so there is one write per batch rather than per row"""
+    batch_size = stream_chunk_size()
+    buffer = io.StringIO()
+    if export_format == CSV_FORMAT:
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        # The header is written on its own so the download starts before the query has returned any rows
+        yield buffer.getvalue().encode()
+        write = writer.writerow
+    else:
+        def write(row):
+            buffer.write(json.dumps(dict(zip(columns, row)), separators=(',', ':')))
+            buffer.write('\n')
+
+    pending = 0
+    buffer.seek(0)
+    buffer.truncate()
+    for row in rows:
+        write(row)
+        pending += 1
+        if pending == batch_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks, level=DEFAULT_EXPORT_COMPRESSION_LEVEL):
+    """Compresses a stream of bytes into a gzip stream as it is produced. The first chunk is flushed straight away so
+    the client receives data immediately, after which output is written whenever zlib fills a block"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    flushed = False
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if not flushed:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            flushed = True
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_response(name, columns, rows):
+    """Streams rows to the client as a gzipped CSV or NDJSON download named after the export. The format comes from
+    the format query parameter and defaults to CSV. Memory use does not grow with the number of rows"""
+    export_format = detect_format(request.args.get('format', CSV_FORMAT))
+    if export_format is None:
+        return jsonify({'error': UNSUPPORTED_EXPORT_FORMAT}), 400
+    level = current_app.config.get('EXPORT_COMPRESSION_LEVEL', DEFAULT_EXPORT_COMPRESSION_LEVEL)
+    body = gzip_chunks(encode_rows(columns, rows, export_format), level)
+    return Response(stream_with_context(body), mimetype='application/gzip', headers={
+        'Content-Disposition': f'attachment; filename={name}.{export_format}{GZIP_SUFFIX}',
+    })
+
+
+def export_to_file(columns, rows, output, export_format=None, compress=None):
+    """Writes rows to a file opened in binary mode from the command line and prints how many were written. The format
+    and compression default to the ones implied by the file's name, such as servers.csv.gz"""
+    name = output.name if isinstance(output.name, str) else ''
+    if compress is None:
+        compress = name.endswith(GZIP_SUFFIX)
+    export_format = detect_format(export_format, name.removesuffix(GZIP_SUFFIX)) or CSV_FORMAT
+
+    written = 0
+
+    def counted():
+        nonlocal written
+        for row in rows:
+            written += 1
+            yield row
+
+    chunks = encode_rows(columns, counted(), export_format)
+    if compress:
+        chunks = gzip_chunks(chunks, current_app.config.get('EXPORT_COMPRESSION_LEVEL',
+                                                            DEFAULT_EXPORT_COMPRESSION_LEVEL))
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    except SQLAlchemyError:
+        raise click.ClickException(f'Export failed after {written} rows, the output is incomplete')
+    finally:
+        output.flush()
+    click.echo(f'Exported {written} rows', err=True)
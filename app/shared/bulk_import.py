@@ -0,0 +1,267 @@
+import codecs
+import csv
+import json
+import os
+
+import click
+from flask import current_app, jsonify, request
+from flask_wtf.csrf import validate_csrf
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.datastructures import MultiDict
+from wtforms.validators import ValidationError
+
+from app.extensions import db
+from app.shared.uniqueness import existing_values
+
+# Rows validated and inserted per transaction. Each chunk's uniqueness checks are a single query
+DEFAULT_BULK_IMPORT_CHUNK_SIZE = 500
+
+CSV_FORMAT = 'csv'
+NDJSON_FORMAT = 'ndjson'
+# File extensions and content types of the formats an import can read
+FORMAT_EXTENSIONS = {'.csv': CSV_FORMAT, '.ndjson': NDJSON_FORMAT, '.jsonl': NDJSON_FORMAT}
+FORMAT_CONTENT_TYPES = {'text/csv': CSV_FORMAT, 'application/x-ndjson': NDJSON_FORMAT,
+                        'application/jsonl': NDJSON_FORMAT}
+
+# Header carrying the CSRF token of an import sent from a script rather than an upload form
+CSRF_TOKEN_HEADER = 'X-CSRFToken'
+
+INVALID_JSON = 'Line is not a JSON object'
+UNSUPPORTED_FORMAT = 'Upload a .csv or .ndjson file, or pass format=csv or format=ndjson'
+ROW_NOT_SAVED = 'Row could not be saved'
+UNSUPPORTED_CONTENT_TYPE = 'Upload the file as "file", or send the body as text/csv or application/x-ndjson'
+INVALID_CSRF_TOKEN = 'The CSRF token is missing or invalid'
+
+
+def detect_format(requested=None, filename=None, content_type=None):
+    """Returns the import format named by the caller, or implied by the file extension or content type. Returns None
+    if the format is not one an import can read"""
+    if requested:
+        requested = requested.lower()
+        return requested if requested in (CSV_FORMAT, NDJSON_FORMAT) else None
+    if filename:
+        import_format = FORMAT_EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+        if import_format:
+            return import_format
+    return FORMAT_CONTENT_TYPES.get(content_type)
+
+
+def _text_lines(stream):
+    """Decodes a binary stream as UTF-8 a line at a time, dropping a byte order mark"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    for line in stream:
+        yield decoder.decode(line)
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def read_rows(stream, import_format):
+    """Yields the line number, fields and parse error of every row in a binary stream of CSV with a header row or of
+    NDJSON. The stream is read incrementally, so a file of any size is never held in memory"""
+    if import_format == CSV_FORMAT:
+        reader = csv.DictReader(_text_lines(stream))
+        for fields in reader:
+            # Values past the end of the header are collected under None and ignored
+            fields.pop(None, None)
+            yield reader.line_num, fields, None
+        return
+
+    for line_number, line in enumerate(_text_lines(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            fields = json.loads(line)
+        except ValueError:
+            fields = None
+        if isinstance(fields, dict):
+            yield line_number, fields, None
+        else:
+            yield line_number, None, INVALID_JSON
+
+
+class ImportReport:
+    """The outcome of a bulk import: how many rows were created and the errors of every row that was not"""
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    @property
+    def failed(self):
+        return len(self.errors)
+
+    def add_error(self, line, errors):
+        """Records why the row on a line was not imported. errors maps field names to lists of messages"""
+        self.errors.append({'line': line, 'errors': errors})
+
+    def to_dict(self):
+        # Rows fail at different stages of a chunk, so errors are reported in the order of the file
+        return {'created': self.created, 'failed': self.failed,
+                'errors': sorted(self.errors, key=lambda error: error['line'])}
+
+
+class BulkImporter:
+    """
+    A base class for importing rows into a table in chunks.
+
+    Each chunk is validated with the entity's form, checked against the rows already in the table and earlier in the
+    import with one query per chunk, and inserted with a single executemany in its own transaction. Subclasses name the
+    form, the model and the unique columns with their error messages, and build the row to insert from a valid form.
+    """
+
+    form_class = None
+    model = None
+    # Maps each unique column to the error reported when a row repeats an existing value
+    unique_fields = {}
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or current_app.config.get('BULK_IMPORT_CHUNK_SIZE',
+                                                               DEFAULT_BULK_IMPORT_CHUNK_SIZE)
+        self.report = ImportReport()
+        # Unique values already taken by rows earlier in this import
+        self._seen = {name: set() for name in self.unique_fields}
+
+    def run(self, rows):
+        """Imports the rows yielded by read_rows and returns the report"""
+        chunk = []
+        for line, fields, error in rows:
+            if error:
+                self.report.add_error(line, {'row': [error]})
+                continue
+            chunk.append((line, fields))
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk)
+        current_app.logger.info(f'bulk_import table={self.model.__tablename__} created={self.report.created} '
+                                f'failed={self.report.failed}')
+        return self.report
+
+    def build_form(self, fields):
+        """Loads a row's fields into the entity's form"""
+        formdata = MultiDict({name: '' if value is None else str(value) for name, value in fields.items() if name})
+        return self.form_class(formdata=formdata, meta={'csrf': False})
+
+    def to_row(self, form):
+        """Returns the values to insert for a valid form"""
+        raise NotImplementedError
+
+    def lookup(self, forms):
+        """Returns the values of the chunk's unique columns that are already in the table. Subclasses extend it with
+        other lookups their checks need"""
+        values = {name: {getattr(form, name).data for form in forms} - {None, ''} for name in self.unique_fields}
+        return existing_values(self.model, values)
+
+    def check(self, form, existing):
+        """Returns the errors of a row that passed form validation, checked against the lookups for its chunk"""
+        errors = {}
+        for name, message in self.unique_fields.items():
+            value = getattr(form, name).data
+            if value and (value in existing[name] or value in self._seen[name]):
+                errors[name] = [message]
+        return errors
+
+    def insert(self, rows):
+        """Inserts rows in one transaction. Returns True if they were saved"""
+        raise NotImplementedError
+
+    def _import_chunk(self, chunk):
+        """Validates, checks and inserts one chunk of rows"""
+        valid = []
+        for line, fields in chunk:
+            form = self.build_form(fields)
+            if form.validate():
+                valid.append((line, form))
+            else:
+                self.report.add_error(line, form.errors)
+        if not valid:
+            return
+
+        try:
+            existing = self.lookup([form for line, form in valid])
+        except SQLAlchemyError as err:
+            db.session.rollback()
+            current_app.logger.error(
+                f'An error occurred whilst checking a chunk of {len(valid)} rows to import into '
+                f'{self.model.__tablename__}',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+            for line, form in valid:
+                self.report.add_error(line, {'row': [ROW_NOT_SAVED]})
+            return
+
+        lines, rows = [], []
+        for line, form in valid:
+            errors = self.check(form, existing)
+            if errors:
+                self.report.add_error(line, errors)
+                continue
+            for name in self.unique_fields:
+                if getattr(form, name).data:
+                    self._seen[name].add(getattr(form, name).data)
+            lines.append(line)
+            rows.append(self.to_row(form))
+
+        if not rows:
+            return
+        if self.insert(rows):
+            self.report.created += len(rows)
+            return
+        # A row was taken by someone else since the lookup, so the chunk is retried a row at a time to find it
+        for line, row in zip(lines, rows):
+            if self.insert([row]):
+                self.report.created += 1
+            else:
+                self.report.add_error(line, {'row': [ROW_NOT_SAVED]})
+
+
+def has_valid_csrf_token():
+    """Checks the CSRF token of a request sent in the X-CSRFToken header or the csrf_token form field, unless CSRF
+    protection is turned off"""
+    if not current_app.config.get('WTF_CSRF_ENABLED', True):
+        return True
+    try:
+        validate_csrf(request.headers.get(CSRF_TOKEN_HEADER) or request.form.get('csrf_token'))
+    except ValidationError:
+        return False
+    return True
+
+
+def import_from_request(importer):
+    """Runs an import of the file uploaded as "file", or of the request body, and returns the report as JSON. The format
+    comes from the format query parameter, the file's extension or the content type.
+
+    Imports write to the database like the add forms, so they need the same CSRF token. Bodies must also have one of
+    the import content types, which browsers cannot send cross-site without a preflight"""
+    if not has_valid_csrf_token():
+        return jsonify({'error': INVALID_CSRF_TOKEN}), 400
+    upload = request.files.get('file')
+    if upload:
+        stream, filename, content_type = upload.stream, upload.filename, upload.mimetype
+    elif request.mimetype in FORMAT_CONTENT_TYPES:
+        stream, filename, content_type = request.stream, None, request.mimetype
+    else:
+        return jsonify({'error': UNSUPPORTED_CONTENT_TYPE}), 415
+    import_format = detect_format(request.args.get('format'), filename, content_type)
+    if import_format is None:
+        return jsonify({'error': UNSUPPORTED_FORMAT}), 400
+    return jsonify(importer.run(read_rows(stream, import_format)).to_dict())
+
+
+def import_from_file(importer, source, import_format=None):
+    """Runs an import of a file opened in binary mode from the command line and prints the report. Exits with status 1
+    if any row was not imported"""
+    import_format = detect_format(import_format, source.name)
+    if import_format is None:
+        raise click.UsageError(UNSUPPORTED_FORMAT.replace('pass format=', 'pass --format '))
+    report = importer.run(read_rows(source, import_format)).to_dict()
+    for error in report['errors']:
+        for field, messages in error['errors'].items():
+            click.echo(f'Line {error["line"]}: {field}: {" ".join(messages)}', err=True)
+    click.echo(f'Created {report["created"]} rows, {report["failed"]} rows failed')
+    if report['failed']:
+        raise click.exceptions.Exit(1)
@@ -0,0 +1,116 @@
+from typing import NamedTuple
+
+from flask import current_app, jsonify
+from sqlalchemy import func, or_, select, String
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import db
+from app.shared.pagination import MAX_PAGE_SIZE
+
+
+class DataTableColumn(NamedTuple):
+    """
+    A class to represent a column of a DataTables grid that is backed by the database
+
+    Fields
+    -------------------
+    name: str
+        Value of ``columns.data`` for this column on the client
+    column: ColumnElement
+        The database column the grid column is read, searched and ordered by
+    searchable: bool
+        Whether the global search and the column search apply to this column
+    orderable: bool
+        Whether the grid can be ordered by this column
+    """
+    name: str
+    column: object
+    searchable: bool = True
+    orderable: bool = True
+
+
+def _to_int(value, default):
+    """Converts a request parameter to an integer, returning the default if it is missing or invalid"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _search_clause(column, value):
+    """Builds a prefix match for a searchable column so the search can use the index on that column"""
+    if isinstance(column.type, String):
+        return column.startswith(value, autoescape=True)
+    return column == value
+
+
+def parse_datatables_request(args, columns):
+    """Parses the parameters sent by DataTables in server-side processing mode"""
+    by_name = {column.name: column for column in columns}
+
+    column_searches = []
+    orders = []
+    index = 0
+    while f'columns[{index}][data]' in args:
+        column = by_name.get(args.get(f'columns[{index}][data]'))
+        value = args.get(f'columns[{index}][search][value]', '').strip()
+        if column and column.searchable and value:
+            column_searches.append((column, value))
+        index += 1
+
+    index = 0
+    while f'order[{index}][column]' in args:
+        position = _to_int(args.get(f'order[{index}][column]'), -1)
+        column = by_name.get(args.get(f'order[{index}][name]') or args.get(f'columns[{position}][data]'))
+        if column and column.orderable:
+            orders.append((column, args.get(f'order[{index}][dir]') == 'desc'))
+        index += 1
+
+    length = _to_int(args.get('length'), 10)
+    return {
+        'draw': _to_int(args.get('draw'), 0),
+        'start': max(_to_int(args.get('start'), 0), 0),
+        'length': MAX_PAGE_SIZE if length < 0 else max(1, min(length, MAX_PAGE_SIZE)),
+        'search': args.get('search[value]', '').strip(),
+        'column_searches': column_searches,
+        'orders': orders,
+    }
+
+
+def datatables_response(args, statement, columns, key_column, serialize):
+    """
+    Answers a DataTables server-side processing request.
+
+    Only the requested page is read from the database. Searches are prefix matches on the searchable columns and
+    ordering always ends with the key column so pages are stable. The total count is only recomputed for the filtered
+    set when a search is applied.
+    """
+    params = parse_datatables_request(args, columns)
+
+    filtered = statement
+    if params['search']:
+        filtered = filtered.where(or_(*(_search_clause(column.column, params['search'])
+                                        for column in columns if column.searchable)))
+    for column, value in params['column_searches']:
+        filtered = filtered.where(_search_clause(column.column, value))
+
+    order_by = [column.column.desc() if descending else column.column.asc() for column, descending in params['orders']]
+    order_by.append(key_column.asc())
+
+    try:
+        total = db.session.scalar(select(func.count()).select_from(statement.subquery()))
+        records_filtered = total if filtered is statement else db.session.scalar(
+            select(func.count()).select_from(filtered.subquery()))
+        rows = db.session.execute(filtered.order_by(*order_by).offset(params['start']).limit(params['length']))
+        data = [serialize(row) for row in rows]
+    except SQLAlchemyError as err:
+        current_app.logger.error(
+            'An error occurred whilst answering a DataTables request',
+            extra={
+                "error": str(err),
+                "error_type": type(err).__name__,
+            })
+        return jsonify({'draw': params['draw'], 'recordsTotal': 0, 'recordsFiltered': 0, 'data': [],
+                        'error': 'Unable to load data'})
+
+    return jsonify({'draw': params['draw'], 'recordsTotal': total, 'recordsFiltered': records_filtered, 'data': data})
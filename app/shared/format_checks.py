@@ -0,0 +1,10 @@
+def is_valid_email(value):
+    """Checks if a value is a valid email address using the validators package, which is imported on first use"""
+    import validators
+    return bool(validators.email(value))
+
+
+def is_valid_url(value):
+    """Checks if a value is a valid url using the validators package, which is imported on first use"""
+    import validators
+    return bool(validators.url(value))
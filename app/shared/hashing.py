@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Method passed to werkzeug when hashing passwords, for example scrypt or scrypt:65536:8:1
+DEFAULT_PASSWORD_HASH_METHOD = 'scrypt'
+
+PASSWORD_HASH_METHOD_CONFIG = 'PASSWORD_HASH_METHOD'
+# Number of processes each web worker hashes passwords in. Every web worker has its own pool, so this stays small
+DEFAULT_PASSWORD_HASH_WORKERS = 2
+# Number of processes passwords are hashed in. 0 hashes on the calling thread
+PASSWORD_HASH_WORKERS_CONFIG = 'PASSWORD_HASH_WORKERS'
+
+
+class PasswordHasher:
+    """
+    A class that hashes and verifies passwords in a pool of worker processes, so the expensive key derivation does not
+    hold the interpreter of the process serving requests.
+
+    The hash method and its cost parameters come from PASSWORD_HASH_METHOD. Hashes created with other parameters still
+    verify, and needs_rehash tells the caller when a hash should be replaced after a successful login. The pool is
+    created on first use in each process, so workers forked after the application was created get their own.
+    """
+
+    def __init__(self):
+        self._app = None
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+        self._method_prefix = None
+
+    def init_app(self, app):
+        """Binds the hasher to an application"""
+        app.config.setdefault(PASSWORD_HASH_METHOD_CONFIG, DEFAULT_PASSWORD_HASH_METHOD)
+        app.config.setdefault(PASSWORD_HASH_WORKERS_CONFIG, DEFAULT_PASSWORD_HASH_WORKERS)
+        self._app = app
+        self._method_prefix = None
+
+    @property
+    def method(self):
+        return self._app.config[PASSWORD_HASH_METHOD_CONFIG]
+
+    def _executor(self):
+        """Returns the process pool for this process, or None if hashing runs on the calling thread"""
+        workers = self._app.config[PASSWORD_HASH_WORKERS_CONFIG]
+        if not workers:
+            return None
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    # Forking a threaded web worker can copy locks held by other threads into the child, so the
+                    # pool starts its processes from a clean server process instead
+                    self._pool = ProcessPoolExecutor(max_workers=workers,
+                                                     mp_context=multiprocessing.get_context('forkserver'))
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    def _run(self, function, *args):
+        """Runs a function in the process pool and waits for its result"""
+        executor = self._executor()
+        if executor is None:
+            return function(*args)
+        return executor.submit(function, *args).result()
+
+    def hash(self, password):
+        """Hashes a password with the configured method"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Checks a password against a stored hash"""
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Checks if a stored hash was created with a different method or cost parameters than are configured"""
+        if self._method_prefix is None:
+            # werkzeug fills in default cost parameters, so hash once to learn the full method string it stores
+            self._method_prefix = self.hash('').split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._method_prefix
+
+    def shutdown(self):
+        """Stops the worker processes of this process"""
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown()
+            self._pool = None
+
+
+password_hasher = PasswordHasher()
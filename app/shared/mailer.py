@@ -0,0 +1,190 @@
+import atexit
+import os
+import smtplib
+import threading
+import time
+from datetime import datetime, timezone
+
+from app.extensions import get_mail
+
+# Seconds alerts with the same type and key are collected for before they are sent as one digest
+DEFAULT_ALERT_COALESCE_INTERVAL = 60
+# Seconds an idle SMTP connection is kept open for reuse before a fresh one is opened
+DEFAULT_ALERT_IDLE_TIMEOUT = 30
+
+ALERT_COALESCE_INTERVAL_CONFIG = 'ALERT_COALESCE_INTERVAL'
+ALERT_IDLE_TIMEOUT_CONFIG = 'ALERT_IDLE_TIMEOUT'
+
+
+class _PendingAlert:
+    """Alerts with the same type and key waiting to be sent as one digest"""
+
+    __slots__ = ('subject', 'recipients', 'first_body', 'last_body', 'count', 'first_seen', 'last_seen', 'due')
+
+    def __init__(self, subject, recipients, body, now, due):
+        self.subject = subject
+        self.recipients = list(recipients)
+        self.first_body = body
+        self.last_body = body
+        self.count = 1
+        self.first_seen = now
+        self.last_seen = now
+        self.due = due
+
+    def add(self, recipients, body, now):
+        """Merges another alert into the digest"""
+        self.recipients.extend(r for r in recipients if r not in self.recipients)
+        self.last_body = body
+        self.last_seen = now
+        self.count += 1
+
+    def to_message(self, sender):
+        """Builds the email for this digest"""
+        from flask_mail import Message
+
+        if self.count == 1:
+            return Message(subject=self.subject, recipients=self.recipients, body=self.first_body, sender=sender)
+
+        first_seen = datetime.fromtimestamp(self.first_seen, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        last_seen = datetime.fromtimestamp(self.last_seen, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        body = (f'This alert was raised {self.count} times between {first_seen} and {last_seen} UTC.\n\n'
+                f'First alert:\n{self.first_body}\n\nLatest alert:\n{self.last_body}')
+        return Message(subject=f'{self.subject} ({self.count} alerts)', recipients=self.recipients, body=body,
+                       sender=sender)
+
+
+class AlertMailer:
+    """
+    A class that sends alert emails from a background thread so the request that raised the alert does not wait on
+    SMTP.
+
+    Alerts with the same type and key, for example a credential stuffing alert for one ip address, are coalesced over
+    the interval set by ALERT_COALESCE_INTERVAL and sent as a single digest. Digests are sent over one SMTP connection
+    that is kept open between sends. The thread is started on first use in each process, so it also runs in workers
+    forked after the application was created.
+    """
+
+    def __init__(self):
+        self._app = None
+        self._reset()
+
+    def _reset(self):
+        """Creates the state owned by the current process"""
+        self._pid = os.getpid()
+        self._condition = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._thread = None
+        self._connection = None
+        self._last_used = 0
+
+    def _check_process(self):
+        """Starts from fresh state in a forked process, as the thread and connection belong to the parent"""
+        if self._pid != os.getpid():
+            self._reset()
+
+    def init_app(self, app):
+        """Binds the mailer to an application and drops alerts queued for any previous application"""
+        app.config.setdefault(ALERT_COALESCE_INTERVAL_CONFIG, DEFAULT_ALERT_COALESCE_INTERVAL)
+        app.config.setdefault(ALERT_IDLE_TIMEOUT_CONFIG, DEFAULT_ALERT_IDLE_TIMEOUT)
+        with self._condition, self._send_lock:
+            self._app = app
+            self._pending.clear()
+            self._close_connection()
+
+    def alert(self, alert_type, key, subject, recipients, body):
+        """Queues an alert. Alerts with the same type and key that arrive before the queued one is sent are merged
+        into it"""
+        self._check_process()
+        now = time.time()
+        with self._condition:
+            pending = self._pending.get((alert_type, key))
+            if pending:
+                pending.add(recipients, body, now)
+                return
+            interval = self._app.config[ALERT_COALESCE_INTERVAL_CONFIG]
+            self._pending[(alert_type, key)] = _PendingAlert(subject, recipients, body, now, now + interval)
+            self._start_worker()
+            self._condition.notify()
+
+    def flush(self):
+        """Sends every queued alert now, whether or not its coalescing interval has passed"""
+        self._check_process()
+        with self._condition:
+            due = list(self._pending.values())
+            self._pending.clear()
+        self._send(due)
+
+    def _start_worker(self):
+        """Starts the background thread if it is not running in this process"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='alert-mailer', daemon=True)
+            self._thread.start()
+
+    def _take_due(self):
+        """Waits until at least one alert is due and removes the due alerts from the queue"""
+        with self._condition:
+            while True:
+                now = time.time()
+                due = [key for key, pending in self._pending.items() if pending.due <= now]
+                if due:
+                    return [self._pending.pop(key) for key in due]
+                next_due = min((pending.due for pending in self._pending.values()), default=None)
+                self._condition.wait(None if next_due is None else next_due - now)
+
+    def _run(self):
+        """Sends alerts as they become due"""
+        while True:
+            self._send(self._take_due())
+
+    def _open_connection(self):
+        """Returns the shared SMTP connection, opening a new one if there is none or it has been idle too long"""
+        idle_timeout = self._app.config[ALERT_IDLE_TIMEOUT_CONFIG]
+        if self._connection is not None and time.time() - self._last_used > idle_timeout:
+            self._close_connection()
+        if self._connection is None:
+            self._connection = get_mail(self._app).connect().__enter__()
+        return self._connection
+
+    def _close_connection(self):
+        """Closes the shared SMTP connection, ignoring errors from a connection the server has already dropped"""
+        if self._connection is not None:
+            try:
+                self._connection.__exit__(None, None, None)
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._connection = None
+
+    def _send(self, alerts):
+        """Sends alert digests over the shared connection, reconnecting once if the connection has gone away"""
+        if not alerts:
+            return
+        app = self._app
+        with self._send_lock, app.app_context():
+            sender = app.config.get('MAIL_DEFAULT_SENDER')
+            for pending in alerts:
+                message = pending.to_message(sender)
+                for attempt in range(2):
+                    try:
+                        self._open_connection().send(message)
+                        self._last_used = time.time()
+                        break
+                    except (smtplib.SMTPException, OSError) as err:
+                        self._close_connection()
+                        if attempt:
+                            app.logger.error(
+                                f'Unable to send alert email: {pending.subject}',
+                                extra={
+                                    "error": str(err),
+                                    "error_type": type(err).__name__,
+                                })
+
+
+def _flush_at_exit():
+    """Sends alerts still waiting to be coalesced when the process exits"""
+    if alert_mailer._app is not None:
+        alert_mailer.flush()
+
+
+alert_mailer = AlertMailer()
+atexit.register(_flush_at_exit)
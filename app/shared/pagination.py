@@ -0,0 +1,109 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy import DateTime, and_, or_, tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class Page(NamedTuple):
+    """
+    A class to represent one page of a keyset paginated query
+
+    Fields
+    -------------------
+    items: list
+        The rows on this page
+    next_cursor: str
+        Opaque cursor pointing after the last row on this page. None if this is the last page
+    """
+    items: list
+    next_cursor: str | None
+
+
+def parse_page_size(value):
+    """Parses the page size query parameter, falling back to the default and capping it at the maximum"""
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(*values):
+    """Encodes the sort key of the last row on a page into an url safe cursor"""
+    serialisable = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(serialisable).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, columns):
+    """Decodes a cursor back into a list of values typed to match the columns it was built from.
+    Returns None for a missing or malformed cursor so the caller starts from the first page"""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(columns):
+            return None
+        return [datetime.fromisoformat(value) if isinstance(column.type, DateTime) and value is not None else value
+                for column, value in zip(columns, values)]
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+
+def sort_order(sort_columns, descending=False, nullable=False):
+    """Returns the ORDER BY clauses for the sort columns. If nullable, the first column's NULLs sort after every value,
+    or before them when descending, whatever the database's default is"""
+    order_by = [column.desc() if descending else column.asc() for column in sort_columns]
+    if nullable:
+        order_by[0] = order_by[0].nulls_first() if descending else order_by[0].nulls_last()
+    return order_by
+
+
+def _after_cursor(sort_columns, after, descending, nullable):
+    """Returns the predicate selecting the rows that sort after the cursor"""
+    key = tuple_(*sort_columns) if len(sort_columns) > 1 else sort_columns[0]
+    value = tuple_(*after) if len(sort_columns) > 1 else after[0]
+    if not nullable:
+        return key < value if descending else key > value
+
+    # NULL never compares equal, greater or less, so rows with a NULL first column are selected explicitly
+    first, rest, rest_value = sort_columns[0], sort_columns[1:], after[1:]
+    rest_key = tuple_(*rest) if len(rest) > 1 else rest[0]
+    rest_value = tuple_(*rest_value) if len(rest) > 1 else rest_value[0]
+    after_rest = rest_key < rest_value if descending else rest_key > rest_value
+    if after[0] is None:
+        if descending:
+            return or_(first.is_not(None), and_(first.is_(None), after_rest))
+        return and_(first.is_(None), after_rest)
+    if descending:
+        return or_(first < after[0], and_(first == after[0], after_rest))
+    return or_(first > after[0], and_(first == after[0], after_rest), first.is_(None))
+
+
+def keyset_page(query, sort_columns, cursor=None, descending=False, page_size=DEFAULT_PAGE_SIZE, nullable=False):
+    """
+    Applies keyset (seek) pagination to a query and returns a single Page.
+
+    The sort columns must end with a unique column (normally the primary key) so that every row has a distinct
+    position. Rows are fetched with a ``WHERE (sort columns) > (cursor)`` predicate instead of an OFFSET, so the cost
+    of fetching a page does not depend on how deep into the table it is. Pass nullable when the first sort column can
+    be NULL, as a column of an outer joined table can. Its NULLs then sort last, or first when descending.
+    """
+    after = decode_cursor(cursor, sort_columns)
+    if after is not None:
+        query = query.filter(_after_cursor(sort_columns, after, descending, nullable))
+
+    rows = query.order_by(*sort_order(sort_columns, descending, nullable)).limit(page_size + 1).all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(*(getattr(last, column.key) for column in sort_columns))
+
+    return Page(rows, next_cursor)
@@ -0,0 +1,38 @@
+from sqlalchemy.engine import make_url
+
+# Connections kept open per process, and how many more may be opened under load. With several gunicorn workers on
+# several nodes the total is workers x (pool size + overflow), which must stay under the server's max_connections
+DEFAULT_DATABASE_POOL_SIZE = 5
+DEFAULT_DATABASE_MAX_OVERFLOW = 10
+# Seconds a request waits for a free connection before failing
+DEFAULT_DATABASE_POOL_TIMEOUT = 30
+# Seconds after which a connection is replaced, so connections dropped by a proxy or failover are not reused
+DEFAULT_DATABASE_POOL_RECYCLE = 1800
+
+
+def normalise_database_url(uri):
+    """Rewrites the postgres:// scheme used by hosting providers to the postgresql:// scheme SQLAlchemy expects"""
+    if uri and uri.startswith('postgres://'):
+        return 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def is_postgres(uri):
+    """Checks if a database uri points at a PostgreSQL database"""
+    return make_url(uri).get_backend_name() == 'postgresql'
+
+
+def postgres_engine_options(app):
+    """Normalises the database uri and adds the pool settings for a PostgreSQL database to SQLALCHEMY_ENGINE_OPTIONS.
+    Options that are already set are kept"""
+    uri = normalise_database_url(app.config.get('SQLALCHEMY_DATABASE_URI'))
+    if not uri or not is_postgres(uri):
+        return
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    options.setdefault('pool_size', app.config.get('DATABASE_POOL_SIZE', DEFAULT_DATABASE_POOL_SIZE))
+    options.setdefault('max_overflow', app.config.get('DATABASE_MAX_OVERFLOW', DEFAULT_DATABASE_MAX_OVERFLOW))
+    options.setdefault('pool_timeout', app.config.get('DATABASE_POOL_TIMEOUT', DEFAULT_DATABASE_POOL_TIMEOUT))
+    options.setdefault('pool_recycle', app.config.get('DATABASE_POOL_RECYCLE', DEFAULT_DATABASE_POOL_RECYCLE))
+    # Checks a connection is alive before handing it out, at the cost of a round trip on checkout
+    options.setdefault('pool_pre_ping', app.config.get('DATABASE_POOL_PRE_PING', True))
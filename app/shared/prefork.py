@@ -0,0 +1,50 @@
+import gc
+import importlib
+
+from sqlalchemy.orm import configure_mappers
+
+from app.extensions import db, get_mail
+from app.shared.breached_passwords import open_index
+
+
+def warm_up(app):
+    """Does the work that would otherwise be done lazily by the first requests of every worker, so it is done once in
+    the master process before forking and the results are shared with the workers"""
+    # Compiles every template into the environment's template cache
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+    # Builds the url matcher and resolves the relationships between models
+    app.url_map.update()
+    configure_mappers()
+
+    # Maps the breached password index, so the workers share the page cache of one mapping
+    index_path = app.config.get('BREACHED_PASSWORD_INDEX')
+    if index_path:
+        open_index(index_path)
+
+    # Imports the modules the app otherwise imports on first use. requests is only used without a local index
+    modules = ['validators'] if index_path else ['validators', 'requests']
+    for module in modules:
+        importlib.import_module(module)
+
+    with app.app_context():
+        get_mail(app)
+
+        # Builds the failed login counters from the current detection window
+        from app.auth.counters import failure_counters
+        failure_counters.rebuild()
+
+
+def before_fork():
+    """Moves every object created so far out of the garbage collector's reach, so collections in the workers do not
+    write to the pages shared with the master process and copy them"""
+    gc.freeze()
+
+
+def after_fork(app):
+    """Drops the database connections inherited from the master process without closing them, as closing them would
+    end the master's sessions with the database. Each worker then opens its own connections"""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -0,0 +1,215 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import Optional
+
+from flask_session.base import ServerSideSession, ServerSideSessionInterface
+from flask_session.defaults import Defaults
+
+# Value of SESSION_TYPE that selects this session store
+CACHED_SQLITE_SESSION_TYPE = 'cached_sqlite'
+
+DEFAULT_SESSION_SQLITE_PATH = 'sessions.db'
+# Number of sessions kept in memory in each process
+DEFAULT_SESSION_CACHE_SIZE = 4096
+# Seconds an anonymous session read from memory is trusted before it is read from the store again. Sessions of logged
+# in users are trusted until the store changes, so a logout or revocation in one worker process is seen by the others
+# at once
+DEFAULT_SESSION_CACHE_TTL = 10
+# Session key Flask-Login stores the logged in user under
+USER_ID_SESSION_KEY = '_user_id'
+# Seconds between sweeps of expired sessions, and how many are deleted per transaction
+DEFAULT_SESSION_SWEEP_INTERVAL = 300
+DEFAULT_SESSION_SWEEP_BATCH_SIZE = 500
+
+
+class CachedSQLiteSessionInterface(ServerSideSessionInterface):
+    """
+    A Flask-Session interface that keeps server-side sessions in their own SQLite file with an in-memory LRU cache in
+    front of it, so sessions do not compete with writes to the application database.
+
+    The store uses WAL mode so reads never wait on writes. A session is only written when its contents change or when
+    more than half of its lifetime has passed, so a request that reads the session normally makes no write at all.
+    Anonymous sessions are served from memory for SESSION_CACHE_TTL seconds. A logged in user's session is served from
+    memory until another connection commits to the store, which SQLite's data_version reports without reading a table,
+    so ending the session in any process takes effect at once. Expired sessions are deleted in batches by a background
+    thread.
+    """
+
+    session_class = ServerSideSession
+    # Expiry is handled by the background sweep rather than Flask-Session's cleanup hooks
+    ttl = True
+
+    def __init__(self, app, path=DEFAULT_SESSION_SQLITE_PATH, cache_size=DEFAULT_SESSION_CACHE_SIZE,
+                 cache_ttl=DEFAULT_SESSION_CACHE_TTL, sweep_interval=DEFAULT_SESSION_SWEEP_INTERVAL,
+                 sweep_batch_size=DEFAULT_SESSION_SWEEP_BATCH_SIZE, key_prefix=Defaults.SESSION_KEY_PREFIX,
+                 permanent=Defaults.SESSION_PERMANENT, sid_length=Defaults.SESSION_ID_LENGTH,
+                 serialization_format=Defaults.SESSION_SERIALIZATION_FORMAT):
+        super().__init__(app, key_prefix=key_prefix, permanent=permanent, sid_length=sid_length,
+                         serialization_format=serialization_format)
+        self.path = path if os.path.isabs(path) else os.path.join(app.instance_path, path)
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.sweep_interval = sweep_interval
+        self.sweep_batch_size = sweep_batch_size
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._reset()
+        with closing(self._connect()) as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS sessions '
+                               '(id TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions (expires_at)')
+
+    @classmethod
+    def from_app(cls, app):
+        """Creates the interface from the application config"""
+        config = app.config
+        return cls(app,
+                   path=config.get('SESSION_SQLITE_PATH', DEFAULT_SESSION_SQLITE_PATH),
+                   cache_size=config.get('SESSION_CACHE_SIZE', DEFAULT_SESSION_CACHE_SIZE),
+                   cache_ttl=config.get('SESSION_CACHE_TTL', DEFAULT_SESSION_CACHE_TTL),
+                   sweep_interval=config.get('SESSION_SWEEP_INTERVAL', DEFAULT_SESSION_SWEEP_INTERVAL),
+                   sweep_batch_size=config.get('SESSION_SWEEP_BATCH_SIZE', DEFAULT_SESSION_SWEEP_BATCH_SIZE),
+                   key_prefix=config.get('SESSION_KEY_PREFIX', Defaults.SESSION_KEY_PREFIX),
+                   permanent=config.get('SESSION_PERMANENT', Defaults.SESSION_PERMANENT),
+                   sid_length=config.get('SESSION_ID_LENGTH', Defaults.SESSION_ID_LENGTH),
+                   serialization_format=config.get('SESSION_SERIALIZATION_FORMAT',
+                                                   Defaults.SESSION_SERIALIZATION_FORMAT))
+
+    def _reset(self):
+        """Creates the state owned by the current process"""
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Maps a store id to the serialized session, when it expires, until when the cached copy is trusted and, for a
+        # logged in user's session, the store generation it was read in
+        self._cache = OrderedDict()
+        # Moves on whenever a connection of this process sees a commit to the store made by another connection
+        self._generation = 0
+        self._sweeper = None
+
+    def _check_process(self):
+        """Starts from an empty cache in a forked process, as connections and the sweeper belong to the parent"""
+        if self._pid != os.getpid():
+            self._reset()
+        if self._sweeper is None and self.sweep_interval:
+            with self._lock:
+                if self._sweeper is None:
+                    self._sweeper = threading.Thread(target=self._sweep_forever, name='session-sweeper', daemon=True)
+                    self._sweeper.start()
+
+    def _connect(self):
+        """Opens a connection to the session store in WAL mode"""
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _connection(self):
+        """Returns this thread's connection to the session store"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _check_store_changes(self):
+        """Starts a new store generation if another connection has committed to the store since this thread's
+        connection last looked. The first look from a connection always starts one, as it has nothing to compare with"""
+        data_version = self._connection().execute('PRAGMA data_version').fetchone()[0]
+        if getattr(self._local, 'data_version', None) != data_version:
+            self._local.data_version = data_version
+            with self._lock:
+                self._generation += 1
+
+    def _cache_get(self, store_id, now):
+        """Returns the cached session entry, or None if it is not cached or no longer trusted"""
+        with self._lock:
+            entry = self._cache.get(store_id)
+            if entry is None:
+                return None
+            if entry[2] <= now or entry[1] <= now:
+                del self._cache[store_id]
+                return None
+            self._cache.move_to_end(store_id)
+            return entry
+
+    def _cache_put(self, store_id, data, expires_at, now, generation=None):
+        """Caches a serialized session, evicting the least recently used sessions past the cache size. A session
+        cached with a store generation is trusted until it expires or the generation moves on"""
+        with self._lock:
+            trusted_until = now + self.cache_ttl if generation is None else expires_at
+            self._cache[store_id] = (data, expires_at, trusted_until, generation)
+            self._cache.move_to_end(store_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _retrieve_session_data(self, store_id: str) -> Optional[dict]:
+        self._check_process()
+        self._check_store_changes()
+        now = time.time()
+        generation = self._generation
+        entry = self._cache_get(store_id, now)
+        # A logged in user's session read before the store last changed may have been ended by another process
+        if entry is not None and entry[3] in (None, generation):
+            return self.serializer.decode(entry[0])
+
+        row = self._connection().execute('SELECT data, expires_at FROM sessions WHERE id = ?', (store_id,)).fetchone()
+        if row is None or row[1] <= now:
+            with self._lock:
+                self._cache.pop(store_id, None)
+            return None
+        data = self.serializer.decode(row[0])
+        self._cache_put(store_id, row[0], row[1], now, generation if USER_ID_SESSION_KEY in data else None)
+        return data
+
+    def _delete_session(self, store_id: str) -> None:
+        self._check_process()
+        with self._lock:
+            self._cache.pop(store_id, None)
+        self._connection().execute('DELETE FROM sessions WHERE id = ?', (store_id,))
+
+    def _upsert_session(self, session_lifetime, session: ServerSideSession, store_id: str) -> None:
+        self._check_process()
+        now = time.time()
+        lifetime = session_lifetime.total_seconds()
+        data = self.serializer.encode(session)
+
+        # Skips the write when nothing has changed and the stored expiry is still more than half a lifetime away
+        entry = self._cache_get(store_id, now)
+        if entry is not None and entry[0] == data and entry[1] - now > lifetime / 2:
+            return
+
+        expires_at = now + lifetime
+        self._connection().execute('INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)',
+                                   (store_id, data, expires_at))
+        self._cache_put(store_id, data, expires_at, now, self._generation if USER_ID_SESSION_KEY in session else None)
+
+    def _delete_expired_sessions(self) -> None:
+        """Deletes expired sessions from the store in batches, each in its own short transaction"""
+        now = time.time()
+        connection = self._connection()
+        while True:
+            deleted = connection.execute(
+                'DELETE FROM sessions WHERE id IN (SELECT id FROM sessions WHERE expires_at <= ? LIMIT ?)',
+                (now, self.sweep_batch_size)).rowcount
+            if deleted < self.sweep_batch_size:
+                break
+        with self._lock:
+            for store_id in [store_id for store_id, entry in self._cache.items() if entry[1] <= now]:
+                del self._cache[store_id]
+
+    def _sweep_forever(self):
+        """Deletes expired sessions every sweep interval"""
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self._delete_expired_sessions()
+            except sqlite3.Error as err:
+                self.app.logger.error(
+                    'An error occurred whilst deleting expired sessions',
+                    extra={
+                        "error": str(err),
+                        "error_type": type(err).__name__,
+                    })
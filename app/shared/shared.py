@@ -1,16 +1,35 @@
 import hashlib
 
-import requests
 from flask import current_app
-from flask_mail import Message
 from wtforms.validators import ValidationError
 
 from app.auth.form_errors import RegistrationFormError
-from app.extensions import mail
+from app.extensions import get_mail
+from app.shared.breached_passwords import open_index
 
 def breached_password_validator(self, field):
-    """Checks if password is part of the 10,000 breached passwords"""
+    """Checks if password is part of the 10,000 breached passwords. When BREACHED_PASSWORD_INDEX is set the password is
+    looked up in the local breached password index, otherwise the Have I Been Pwned range API is called"""
     password = field.data
+    index_path = current_app.config.get('BREACHED_PASSWORD_INDEX')
+    if index_path:
+        try:
+            breached = open_index(index_path).contains_password(password)
+        except (OSError, ValueError) as err:
+            current_app.logger.error(
+                f'Unable to read the breached password index: {index_path}',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+            raise ValidationError(RegistrationFormError.PASSWORD_SAFETY.value)
+        if breached:
+            raise ValidationError(RegistrationFormError.WEAK_PASSWORD.value)
+        return
+
+    # Only needed when there is no local index, and slow to import
+    import requests
+
     hashed_pass = hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
     prefix, suffix = hashed_pass[:5], hashed_pass[5:]
     url = f'https://api.pwnedpasswords.com/range/{prefix}'
@@ -27,6 +46,8 @@ def breached_password_validator(self, field):
 
 def send_email(subject, recipients, body, html=None):
     """ Generic email sending function."""
+    from flask_mail import Message
+
     msg = Message(
         subject=subject,
         recipients=recipients,
@@ -34,4 +55,4 @@ def send_email(subject, recipients, body, html=None):
         html=html,
         sender=current_app.config.get('MAIL_DEFAULT_SENDER')
     )
-    mail.send(msg)
+    get_mail(current_app).send(msg)
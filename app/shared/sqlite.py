@@ -0,0 +1,61 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Pragmas applied to every new connection to a SQLite database file. WAL lets readers run alongside the single writer,
+# busy_timeout makes a writer wait for the lock instead of failing with "database is locked", synchronous=NORMAL only
+# syncs the WAL at checkpoints, and the cache and memory map keep hot pages out of the filesystem
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',
+}
+# Connections kept open per process. SQLite allows one writer at a time, so a small pool is enough
+DEFAULT_SQLITE_POOL_SIZE = 5
+DEFAULT_SQLITE_MAX_OVERFLOW = 10
+
+
+def is_sqlite_file(uri):
+    """Checks if a database uri points at a SQLite database file rather than an in-memory database"""
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def sqlite_engine_options(app):
+    """Adds the pool settings of the SQLite engine profile to SQLALCHEMY_ENGINE_OPTIONS. Options that are already set
+    are kept"""
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI')
+    if not uri or not is_sqlite_file(uri):
+        return
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    options.setdefault('pool_size', app.config.get('SQLITE_POOL_SIZE', DEFAULT_SQLITE_POOL_SIZE))
+    options.setdefault('max_overflow', app.config.get('SQLITE_MAX_OVERFLOW', DEFAULT_SQLITE_MAX_OVERFLOW))
+    # pysqlite's own lock timeout, which covers the time before the busy_timeout pragma has been applied
+    busy_timeout = app.config.get('SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS).get('busy_timeout', 5000)
+    options.setdefault('connect_args', {}).setdefault('timeout', busy_timeout / 1000)
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Runs the pragmas on every new connection the engine opens"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+def configure_sqlite_engine(app, engine):
+    """Applies the SQLite engine profile to the application's engine when it uses a SQLite database file. The pragmas
+    come from SQLITE_PRAGMAS, and an empty dict leaves SQLite's connection defaults in place"""
+    if not is_sqlite_file(engine.url):
+        return
+    apply_sqlite_pragmas(engine, app.config.get('SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS))
@@ -0,0 +1,44 @@
+from flask import current_app, stream_with_context, Response
+from flask.signals import before_render_template, template_rendered
+
+# Number of rows fetched from the database per round trip when streaming a grid
+DEFAULT_STREAM_CHUNK_SIZE = 500
+# Number of template events Jinja buffers before a chunk is written to the client
+DEFAULT_STREAM_BUFFER_SIZE = 50
+
+
+def stream_chunk_size():
+    """Returns the number of rows to fetch per round trip when streaming query results"""
+    return current_app.config.get('GRID_STREAM_CHUNK_SIZE', DEFAULT_STREAM_CHUNK_SIZE)
+
+
+def stream_rows(session, statement):
+    """Executes a select statement and yields its rows in chunks of GRID_STREAM_CHUNK_SIZE, so only one chunk is held
+    in memory at a time"""
+    result = session.execute(statement.execution_options(yield_per=stream_chunk_size()))
+    try:
+        yield from result
+    finally:
+        result.close()
+
+
+def stream_template_response(template_name, **context):
+    """
+    Renders a template as a streamed response.
+
+    Rows are written to the client while the template is still iterating over the query, so the browser can start
+    painting before the query has finished and peak memory does not grow with the size of the table. Output is
+    buffered into small chunks to avoid a write per template event.
+    """
+    app = current_app._get_current_object()
+    template = app.jinja_env.get_or_select_template(template_name)
+    app.update_template_context(context)
+    before_render_template.send(app, _async_wrapper=app.ensure_sync, template=template, context=context)
+
+    def generate():
+        stream = template.stream(context)
+        stream.enable_buffering(app.config.get('GRID_STREAM_BUFFER_SIZE', DEFAULT_STREAM_BUFFER_SIZE))
+        yield from stream
+        template_rendered.send(app, _async_wrapper=app.ensure_sync, template=template, context=context)
+
+    return Response(stream_with_context(generate()), mimetype='text/html')
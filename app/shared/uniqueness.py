@@ -0,0 +1,90 @@
+from flask import current_app
+from sqlalchemy import String, and_, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import db
+
+
+def existing_values(model, values, exclude_id=None):
+    """Returns which of the given values of each unique column are already in a model's table, found with a single
+    query. values maps column names to the values to look for. The row with exclude_id, such as the one being
+    updated, is ignored. Empty strings are never looked up"""
+    values = {name: set(column_values) - {''} for name, column_values in values.items()}
+    values = {name: column_values for name, column_values in values.items() if column_values}
+    found = {name: set() for name in values}
+    if not values:
+        return found
+    columns = [getattr(model, name) for name in values]
+    # Excluding empty strings lets the lookup use partial unique indexes that leave them out
+    statement = select(*columns).where(or_(*(
+        and_(column.in_(values[column.key]), column != '') if isinstance(column.type, String)
+        else column.in_(values[column.key]) for column in columns)))
+    if exclude_id is not None:
+        statement = statement.where(model.id != exclude_id)
+    for row in db.session.execute(statement):
+        for name, value in zip(values, row):
+            if value in values[name]:
+                found[name].add(value)
+    return found
+
+
+def violated_unique_column(err, model):
+    """Returns the unique column of a model whose constraint or unique index an IntegrityError violated, or None if it
+    was some other constraint. SQLite names the column as "table.column" and PostgreSQL as "Key (column)=" in the
+    error"""
+    message = str(err.orig)
+    table = model.__tablename__
+    unique = [column.key for column in model.__table__.columns if column.unique]
+    unique += [index.columns[0].key for index in model.__table__.indexes if index.unique and len(index.columns) == 1]
+    for key in unique:
+        if f'{table}.{key}' in message or f'Key ({key})=' in message:
+            return key
+    return None
+
+
+class UniqueFieldsForm:
+    """
+    A mixin for forms whose fields are saved to unique columns. After the fields are validated, the values of every
+    unique field are checked against the table with a single query rather than a query per field.
+
+    The check can race with a concurrent save, so the table's unique constraints have the final say. When a save fails
+    on one, the route reports it on the form with add_unique_error, with the same message as the check.
+    """
+
+    model = None
+    # Maps each unique field to the error shown when another row already has its value
+    unique_fields = {}
+
+    def excluded_id(self):
+        """Returns the id of the row being updated, which may keep its own values"""
+        return None
+
+    def validate(self, extra_validators=None):
+        valid = super().validate(extra_validators)
+        return self.validate_unique() and valid
+
+    def validate_unique(self):
+        """Checks the unique fields that passed validation against the other rows in the table"""
+        fields = [getattr(self, name) for name in self.unique_fields]
+        values = {field.name: {field.data} for field in fields if field.data and not field.errors}
+        try:
+            taken = existing_values(self.model, values, self.excluded_id())
+        except SQLAlchemyError as err:
+            db.session.rollback()
+            # The unique constraints still stop a duplicate when the form is saved
+            current_app.logger.error(
+                f'An error occurred whilst checking the unique fields of the {self.model.__tablename__} form',
+                extra={
+                    "error": str(err),
+                    "error_type": type(err).__name__,
+                })
+            return True
+        for name, found in taken.items():
+            if found:
+                self.add_unique_error(name)
+        return not any(taken.values())
+
+    def add_unique_error(self, name):
+        """Shows the unique field's error on the form"""
+        field = getattr(self, name)
+        field.errors = list(field.errors) + [self.unique_fields[name]]
@@ -5,52 +5,96 @@ DataTable.defaults.layout = {
     bottomEnd: null
 };
 
-function format ( d ) {
+function escapeHtml ( value ) {
+// This function escapes text loaded from a data endpoint before it is inserted into the grid as html
+    return String(value ?? '')
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#39;');
+}
+
+function format ( d, escape ) {
 //This function return the data to be presented in the child row of the grid for a parent row
   return '<table cellpadding="5" cellspacing="0" border="0" style="padding-left:50px;">'+
         '<tr>'+
             '<td>Development team email:</td>'+
-            `<td><a href="mailto:${d[6]}">${d[6]}</a></td>` +
+            `<td><a href="mailto:${escape(d.team_email)}">${escape(d.team_email)}</a></td>` +
         '</tr>'+
         '<tr>'+
             '<td>Application URL:</td>'+
-            `<td><a href="${d[7]}" target="_blank">${d[7]}</a></td>` +
+            `<td><a href="${escape(d.url)}" target="_blank">${escape(d.url)}</a></td>` +
         '</tr>'+
-        ( d[8] !== '' ?
+        ( d.swagger ?
         '<tr>'+
             '<td>Swagger URL:</td>'+
-            `<td><a href="${d[8]}" target="_blank">${d[8]}</a></td>` +
+            `<td><a href="${escape(d.swagger)}" target="_blank">${escape(d.swagger)}</a></td>` +
         '</tr>' : '')
         + '<tr>'+
             '<td>Bitbucket URL:</td>'+
-            `<td><a href="${d[9]}" target="_blank">${d[9]}</a></td>` +
+            `<td><a href="${escape(d.bitbucket)}" target="_blank">${escape(d.bitbucket)}</a></td>` +
         '</tr>'+
-        ( d[10] !== '' ?
+        ( d.extra_info ?
         '<tr>'+
             '<td>Extra Info:</td>'+
-            `<td>${d[10]}</td>` +
+            `<td>${escape(d.extra_info)}</td>` +
         '</tr>' : '')
 
     + '</table>';
 }
 
-  var table = $('#applicationTable').DataTable({
-    columnDefs: [
-      {
-        targets: 0,
-        className:      'dt-control',
-        orderable:      false,
-        data:           null,
-        defaultContent: ''
-      },
-      {
-            targets: 5,
-            className: 'dt-body-right'
-      },
-      {
-        targets: [6,7,8,9,10],
-        visible: false
-      },
+function isServerSide ( selector ) {
+// Tables rendered with a data-source attribute are paged, searched and ordered on the server
+    return Boolean($(selector).data('source'));
+}
+
+function gridOptions ( selector, options ) {
+// This function switches a grid to DataTables server-side processing when the table has a data-source attribute
+    if (isServerSide(selector)) {
+        options.serverSide = true;
+        options.processing = true;
+        options.searchDelay = 400;
+        options.ajax = $(selector).data('source');
+        options.columnDefs = [{ targets: '_all', render: DataTable.render.text() }];
+    }
+    return options;
+}
+
+function renderActions ( deleteModal ) {
+// This function builds the edit and delete buttons for rows loaded from a data endpoint
+    return function ( data, type, row ) {
+        if (!row.edit_url) {
+            return data;
+        }
+        var actions = `<a href="${row.edit_url}" role="button" class="btn btn-outline-primary"><i class="bi bi-pencil"></i>Edit</a>`;
+        if (row.delete_url) {
+            actions += ` <a href="#" data-bs-toggle="modal" data-bs-target="${deleteModal}" data-name="${escapeHtml(row.name)}" data-delete-url="${row.delete_url}" role="button" class="btn btn-outline-danger"><i class="bi bi-trash"></i>Delete</a>`;
+        }
+        return actions;
+    };
+}
+
+  var applicationsServerSide = isServerSide('#applicationTable');
+  var table = $('#applicationTable').DataTable(gridOptions('#applicationTable', {
+    // Paged and keyset views are paged, filtered and sorted by the server so DataTables only displays the rows
+    paging: applicationsServerSide,
+    searching: applicationsServerSide,
+    ordering: applicationsServerSide,
+    info: applicationsServerSide,
+    order: [[1, 'asc']],
+    columns: [
+      { data: null, className: 'dt-control', orderable: false, defaultContent: '' },
+      { data: 'name' },
+      { data: 'team_name' },
+      { data: 'server' },
+      { data: 'production_pods' },
+      { data: 'actions', className: 'dt-body-right', orderable: false, defaultContent: '', render: renderActions('#modeldeleteapplication') },
+      { data: 'team_email', visible: false },
+      { data: 'url', visible: false },
+      { data: 'swagger', visible: false },
+      { data: 'bitbucket', visible: false },
+      { data: 'extra_info', visible: false }
     ],
   layout: {
         topStart: {
@@ -66,10 +110,10 @@ function format ( d ) {
             ]
 
         },
-        topEnd: 'search',
-        bottom: ['info', 'pageLength', 'paging']
+        topEnd: applicationsServerSide ? 'search' : null,
+        bottom: applicationsServerSide ? ['info', 'pageLength', 'paging'] : null
   }
-  });
+  }));
 
     // Add event listener for opening and closing details
     $('#applicationTable').on('click', 'td.dt-control', function () {
@@ -82,18 +126,28 @@ function format ( d ) {
             tr.removeClass('shown');
         }
         else {
-            // Open this row
-            row.child( format(row.data()) ).show();
+            // Open this row. Cells read from the page are already escaped, rows loaded from the server are not
+            row.child( format(row.data(), applicationsServerSide ? escapeHtml : function (value) { return value ?? ''; }) ).show();
             tr.addClass('shown');
         }
     } );
 
-var table2 = $('#serverTable').DataTable({
-    columnDefs: [
-        {
-            targets: 4,
-            className: 'dt-body-right'
-        }
+// Populate the shared delete confirmation modals with the application or server that was clicked
+$('#modeldeleteapplication, #modeldeleteserver').on('show.bs.modal', function (event) {
+    var trigger = $(event.relatedTarget);
+    $(this).find('.delete-name').text(trigger.data('name'));
+    $(this).find('.delete-confirm').attr('href', trigger.data('delete-url'));
+});
+
+var table2 = $('#serverTable').DataTable(gridOptions('#serverTable', {
+    columns: [
+        { data: 'name' },
+        { data: 'location' },
+        { data: 'cpu' },
+        { data: 'memory' },
+        { data: 'application_count' },
+        { data: 'total_production_pods' },
+        { data: 'actions', className: 'dt-body-right', orderable: false, defaultContent: '', render: renderActions('#modeldeleteserver') }
       ],
     layout: {
             topStart: {
@@ -101,7 +155,7 @@ var table2 = $('#serverTable').DataTable({
                     {
                         extend: 'excelHtml5',
                         exportOptions: {
-                            columns: [0,1,2,3]
+                            columns: [0,1,2,3,4,5]
                         },
                         title:'Asset Management System - Servers',
                         text: 'Export to Excel'
@@ -111,9 +165,23 @@ var table2 = $('#serverTable').DataTable({
             topEnd: 'search',
             bottom: ['info', 'pageLength', 'paging']
       }
-})
+}))
 
-var table3 = $('#failedLoginsTable').DataTable({
+// The failed login explorer pages by time on the server, so DataTables only displays the rows of that page
+var failedLoginsPagedByServer = Boolean($('#failedLoginsTable').data('paged-by-server'));
+var table3 = $('#failedLoginsTable').DataTable(gridOptions('#failedLoginsTable', {
+    paging: !failedLoginsPagedByServer,
+    searching: !failedLoginsPagedByServer,
+    ordering: !failedLoginsPagedByServer,
+    info: !failedLoginsPagedByServer,
+    order: [[4, 'desc']],
+    columns: [
+        { data: null, orderable: false, defaultContent: '' },
+        { data: 'email' },
+        { data: 'ip' },
+        { data: 'user_agent' },
+        { data: 'created_at' }
+    ],
     layout: {
             topStart: {
                 buttons: [
@@ -130,7 +198,7 @@ var table3 = $('#failedLoginsTable').DataTable({
             topEnd: 'search',
             bottom: ['info', 'pageLength', 'paging']
       }
-})
+}))
 
 const textarea = document.getElementById('extra_info');
 const charCount = document.getElementById('charCount');
@@ -1,15 +1,29 @@
+import hashlib
+
 import pytest
+from sqlalchemy import select
 from werkzeug.security import generate_password_hash
 
 from app import create_app, db
 from app.models.application import Application
 from app.models.server import Server
 from app.models.user import User
+from app.shared.breached_passwords import build_index
 from config.test_config import TestConfig
 
+BREACHED_PASSWORDS = ['password', '123456', 'Password1!', 'Qwerty123#']
+
+
+@pytest.fixture(scope='session')
+def breached_password_index(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('breached') / 'breached-passwords.idx')
+    build_index((hashlib.sha1(password.encode()).hexdigest() for password in BREACHED_PASSWORDS), path)
+    return path
+
 @pytest.fixture
-def app():
+def app(breached_password_index):
     app = create_app(TestConfig)
+    app.config['BREACHED_PASSWORD_INDEX'] = breached_password_index
     with app.app_context():
         db.drop_all()
         db.create_all()
@@ -78,21 +92,22 @@ def init_user_table(app):
 @pytest.fixture
 def init_application_table(app):
     with app.app_context():
+        server_ids = dict(db.session.execute(select(Server.name, Server.id)).all())
         application1 = Application(name='App One', team_name='Team One',
                                team_email='team.one@gmail.com', url='https://appone.com',
                                swagger='https://appone.com/swagger/ui',
                                bitbucket='https://bitbucket.org/repos/appone', extra_info='',
-                               production_pods=1, server='ab-0001')
+                               production_pods=1, server_id=server_ids['ab-0001'])
         application2 = Application(name='App Two', team_name='Team Two',
                                team_email='team.two@gmail.com', url='https://apptwo.com',
                                swagger='',
                                bitbucket='https://bitbucket.org/repos/apptwo', extra_info='This is an angular application',
-                               production_pods=1, server='ab-0002')
+                               production_pods=1, server_id=server_ids['ab-0002'])
         application3 = Application(name='App Three', team_name='Team Three',
                                team_email='team.three@gmail.com', url='https://appthree.com',
                                swagger='https://appthree.com/swagger/ui',
                                bitbucket='https://bitbucket.org/appthree', extra_info='',
-                               production_pods=1, server='ab-0003')
+                               production_pods=1, server_id=server_ids['ab-0003'])
         db.session.add(application1)
         db.session.add(application2)
         db.session.add(application3)
@@ -1,3 +1,4 @@
+from app import db
 from app.models.application import Application
 
 
@@ -39,4 +40,57 @@ def test_find_app_by_bitbucket_found(init_application_table):
 
 def test_find_app_by_bitbucket_not_found(init_application_table):
     application = Application.find_application_by_bitbucket('https:/bitbucketnotfound.com')
-    assert application is None
\ No newline at end of file
+    assert application is None
+
+
+def test_fetch_applications_page_walks_every_row_once(init_application_table):
+    seen = []
+    cursor = None
+    while True:
+        page = Application.fetch_applications_page(cursor=cursor, page_size=5)
+        assert len(page.items) <= 5
+        seen.extend(application.id for application in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == sorted(seen)
+    assert len(seen) == len(set(seen)) == Application.query.count()
+
+
+def test_fetch_applications_page_sorted_by_server_orders_by_server_name(init_application_table):
+    for application in Application.query.limit(3):
+        application.server_id = None
+    db.session.commit()
+    expected = sorted(Application.query, key=lambda application: (application.server is None,
+                                                                  application.server and application.server.name,
+                                                                  application.id))
+    expected = [application.id for application in expected]
+
+    for descending in (False, True):
+        seen = []
+        cursor = None
+        while True:
+            page = Application.fetch_applications_page(sort='server', descending=descending, cursor=cursor,
+                                                       page_size=2)
+            seen.extend(application.id for application in page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        assert seen == (expected[::-1] if descending else expected)
+
+
+def test_fetch_applications_page_filters_by_name_prefix(init_application_table):
+    page = Application.fetch_applications_page(name='App T', sort='name')
+    assert [application.name for application in page.items] == ['App Three', 'App Two']
+    assert page.next_cursor is None
+
+def test_fetch_applications_page_sorts_descending_across_pages(init_application_table):
+    first = Application.fetch_applications_page(sort='team_name', descending=True, page_size=2)
+    second = Application.fetch_applications_page(sort='team_name', descending=True, page_size=2, cursor=first.next_cursor)
+    team_names = [application.team_name for application in first.items + second.items]
+    assert team_names == sorted(team_names, reverse=True)
+    assert not {a.id for a in first.items} & {a.id for a in second.items}
+
+def test_fetch_applications_page_ignores_malformed_cursor(init_application_table):
+    page = Application.fetch_applications_page(cursor='not-a-cursor', page_size=3)
+    assert [application.id for application in page.items] == [1, 2, 3]
@@ -11,16 +11,16 @@ def test_application_form_passes(app, init_server_table):
     with app.app_context():
         with app.test_request_context():
             g.form_type = 'Create'
-            form = ApplicationForm(data = {'name': 'Example App', 'team_name': 'Team One', 'team_email': 'teamone@gmail.com', 'url': 'https://exampleapp.com', 'swagger': 'https://exampleapp.com/swagger/ui', 'bitbucket': 'https://bitbucket.org/repos/exampleapp', 'extra_info': '', 'production_pods': 2, 'server': 'aa-1234'})
-            form.server.choices = [(s.name, s.name) for s in Server.query.with_entities(Server.name)]
+            form = ApplicationForm(data = {'name': 'Example App', 'team_name': 'Team One', 'team_email': 'teamone@gmail.com', 'url': 'https://exampleapp.com', 'swagger': 'https://exampleapp.com/swagger/ui', 'bitbucket': 'https://bitbucket.org/repos/exampleapp', 'extra_info': '', 'production_pods': 2, 'server_id': Server.find_server_by_name('aa-1234').id})
+            form.server_id.choices = [(s.id, s.name) for s in Server.query.with_entities(Server.id, Server.name)]
             assert form.validate() == True
 
 def test_application_form_missing_required_data_validation_fails(app):
     with app.app_context():
         with app.test_request_context():
             g.form_type = 'Create'
-            form = ApplicationForm(data = {'name': None, 'team_name': None , 'team_email': None , 'url': 'https://exampleapp.com', 'swagger_link': 'https://exampleapp.com/swagger/ui', 'bitbucket': 'https://bitbucket.org/repos/exampleapp', 'extra_info': '', 'production_pods': 2, 'server': 'aa-1234'})
-            form.server.choices = [(s.name, s.name) for s in Server.query.with_entities(Server.name)]
+            form = ApplicationForm(data = {'name': None, 'team_name': None , 'team_email': None , 'url': 'https://exampleapp.com', 'swagger_link': 'https://exampleapp.com/swagger/ui', 'bitbucket': 'https://bitbucket.org/repos/exampleapp', 'extra_info': '', 'production_pods': 2, 'server_id': 1})
+            form.server_id.choices = [(s.id, s.name) for s in Server.query.with_entities(Server.id, Server.name)]
             assert form.validate() == False
 
 
@@ -28,8 +28,8 @@ def test_server_form_invalid_input_validation_fails(app):
     with app.app_context():
         with app.test_request_context():
             g.form_type = 'Create'
-            form = ApplicationForm(data = {'name': '1234567', 'team_name': '431689708', 'team_email': 'teamone@gmail.com', 'url': 'https://exampleappone.com', 'swagger': 'https://exampleappone.com/swagger/ui', 'bitbucket': 'https://bitbucket.org/repos/exampleappone', 'extra_info': '', 'production_pods': 2, 'server': 'aa-1234'})
-            form.server.choices = [(s.name, s.name) for s in Server.query.with_entities(Server.name)]
+            form = ApplicationForm(data = {'name': '1234567', 'team_name': '431689708', 'team_email': 'teamone@gmail.com', 'url': 'https://exampleappone.com', 'swagger': 'https://exampleappone.com/swagger/ui', 'bitbucket': 'https://bitbucket.org/repos/exampleappone', 'extra_info': '', 'production_pods': 2, 'server_id': 1})
+            form.server_id.choices = [(s.id, s.name) for s in Server.query.with_entities(Server.id, Server.name)]
             assert form.validate() == False
             assert form.errors.get('name')[0] == ApplicationFormError.INVALID_NAME_FORMAT.value
             assert form.errors.get('team_name')[0] == ApplicationFormError.INVALID_TEAM_NAME_FORMAT.value
@@ -54,17 +54,17 @@ def test_validate_server_passes(app, init_server_table):
     with app.app_context():
         with app.test_request_context():
             form = ApplicationForm()
-            form.server.data = 'aa-1234'
-            form.validate_server(form.server)
-            assert len(form.server.errors) == 0
+            form.server_id.data = Server.find_server_by_name('aa-1234').id
+            form.validate_server_id(form.server_id)
+            assert len(form.server_id.errors) == 0
 
 def test_validate_server_fails(app, init_server_table):
     with app.app_context():
         with app.test_request_context():
             form = ApplicationForm()
-            form.server.data = 'Please Select'
+            form.server_id.data = 0
             with pytest.raises(ValidationError):
-                form.validate_server(form.server)
+                form.validate_server_id(form.server_id)
 
 def test_validate_bitbucket_passes(app):
     with app.app_context():
@@ -1,6 +1,12 @@
 from flask_login import current_user
 
 from app.models.application import Application
+from app.models.server import Server
+
+
+def server_id(app, name):
+    with app.app_context():
+        return Server.find_server_by_name(name).id
 
 def test_create(client, app, auth, init_server_table):
     auth.register('Test', 'Smith', 'test@gmail.com', '54321drwsP#', '54321drwsP#', 'regular')
@@ -12,7 +18,7 @@ def test_create(client, app, auth, init_server_table):
                                    data={'name': 'Example App', 'team_name': 'Team', 'team_email': 'team@gmail.com',
                                          'url': 'https://exampleapp.com', 'swagger': 'https://exampleapp.com/swagger',
                                          'bitbucket': 'https://bitbucket.org/repo/exampleapp', 'extra_info': '',
-                                         'production_pods': 3, 'server': 'aa-1234'})
+                                         'production_pods': 3, 'server_id': server_id(app, 'aa-1234')})
             assert response.status_code == 200
             application = Application.query.filter_by(name='Example App').first()
             assert application is not None
@@ -26,7 +32,7 @@ def test_update(client, app, auth, init_server_table):
                     data={'name': 'Example App', 'team_name': 'Team', 'team_email': 'team@gmail.com',
                           'url': 'https://exampleapp.com', 'swagger': 'https://exampleapp.com/swagger',
                           'bitbucket': 'https://bitbucket.org/repo/exampleapp', 'extra_info': '',
-                          'production_pods': 3, 'server': 'aa-1234'})
+                          'production_pods': 3, 'server_id': server_id(app, 'aa-1234')})
 
     with app.app_context():
         application = Application.query.filter_by(name='Example App').first()
@@ -38,7 +44,7 @@ def test_update(client, app, auth, init_server_table):
                             data={'name': 'Example App', 'team_name': 'Team', 'team_email': 'newteamemail@gmail.com',
                                   'url': 'https://exampleapp.com', 'swagger': 'https://exampleapp.com/swagger',
                                   'bitbucket': 'https://bitbucket.org/repo/exampleapp', 'extra_info': '',
-                                  'production_pods': 3, 'server': 'aa-1234'})
+                                  'production_pods': 3, 'server_id': server_id(app, 'aa-1234')})
         assert response.status_code == 200
         application = Application.query.filter_by(id=application.id).first()
         assert application.team_email == 'newteamemail@gmail.com'
@@ -53,7 +59,7 @@ def test_delete_admin_passes(client, app, auth, init_server_table):
                 data={'name': 'Example App', 'team_name': 'Team', 'team_email': 'team@gmail.com',
                           'url': 'https://exampleapp.com', 'swagger': 'https://exampleapp.com/swagger',
                           'bitbucket': 'https://bitbucket.org/repo/exampleapp', 'extra_info': '',
-                          'production_pods': 3, 'server': 'aa-1234'})
+                          'production_pods': 3, 'server_id': server_id(app, 'aa-1234')})
 
 
     with app.app_context():
@@ -74,7 +80,7 @@ def test_delete_regular_fails(client, app, auth, init_server_table):
                 data={'name': 'Example App', 'team_name': 'Team', 'team_email': 'team@gmail.com',
                           'url': 'https://exampleapp.com', 'swagger': 'https://exampleapp.com/swagger',
                           'bitbucket': 'https://bitbucket.org/repo/exampleapp', 'extra_info': '',
-                          'production_pods': 3, 'server': 'aa-1234'})
+                          'production_pods': 3, 'server_id': server_id(app, 'aa-1234')})
 
 
     with app.app_context():
@@ -125,4 +131,43 @@ def test_find_app_by_bitbucket_found(init_application_table):
 
 def test_find_app_by_bitbucket_not_found(init_application_table):
     application = Application.find_application_by_bitbucket('https:/bitbucketnotfound.com')
-    assert application is None
\ No newline at end of file
+    assert application is None
+
+
+def test_all_applications_renders_one_page(client, auth, init_user_table, init_application_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.get('/application/all-applications?page_size=2&sort=name')
+    assert response.status_code == 200
+    assert response.data.count(b'data-delete-url=') == 2
+    assert b'Next page' in response.data
+
+def test_all_applications_filters_by_server(client, auth, init_user_table, init_application_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.get('/application/all-applications?server=ab-0002')
+    assert response.status_code == 200
+    assert b'App Two' in response.data
+    assert b'App One' not in response.data
+    assert b'Next page' not in response.data
+
+def test_all_applications_view_all_streams_every_application(client, auth, init_user_table, init_application_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.get('/application/all-applications?view=all&page_size=2')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.get_data().count(b'data-delete-url=') == Application.query.count()
+
+
+def test_data_pages_applications_for_datatables(client, auth, init_user_table, init_application_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.get('/application/data', query_string={
+        'draw': '5', 'start': '1', 'length': '1', 'search[value]': 'App T',
+        'columns[0][data]': 'name', 'order[0][column]': '0', 'order[0][dir]': 'asc'})
+    body = response.get_json()
+    assert body['draw'] == 5
+    assert body['recordsTotal'] == Application.query.count()
+    assert body['recordsFiltered'] == 2
+    assert [row['name'] for row in body['data']] == ['App Two']
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.auth.counters import SlidingWindowCounter, failure_counters
+from app.auth.helpers import check_and_alert_stuffing
+from app.models.failed_login import FailedLogin
+
+
+def test_sliding_window_counter_counts_events_in_window():
+    counter = SlidingWindowCounter(window=300, buckets=10)
+    counter.add(1000)
+    counter.add(1100, amount=2)
+    assert counter.count(1100) == 3
+    assert counter.count(1310) == 2
+    assert counter.count(1500) == 0
+
+
+def test_sliding_window_counter_ignores_events_older_than_window():
+    counter = SlidingWindowCounter(window=300, buckets=10)
+    counter.add(2000)
+    counter.add(1000)
+    assert counter.count(2000) == 1
+
+
+def test_failure_counters_rebuild_from_failed_login_table(app):
+    failure_counters.rebuild()
+    assert failure_counters.global_failures() == FailedLogin.query.count()
+    assert failure_counters.failures_for_ip('192.84.17.203') == 1
+    assert failure_counters.failures_for_email('failed_logintwo@gmail.com') == 1
+    assert failure_counters.failures_for_ip('10.10.10.10') == 0
+
+
+def test_failure_counters_rebuild_again_after_a_failed_load(app):
+    def locked(*args, **kwargs):
+        raise OperationalError('SELECT', {}, Exception('database is locked'))
+
+    failure_counters.init_app(app)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(db.session, 'execute', locked)
+        failure_counters.record('victim@gmail.com', '10.10.10.10')
+        assert failure_counters.failures_for_email('victim@gmail.com') == 1
+
+    assert failure_counters.global_failures() == FailedLogin.query.count()
+
+
+def test_check_and_alert_stuffing_does_not_query_database(app):
+    for _ in range(FailedLogin.IP_FAIL_THRESHOLD):
+        failure_counters.record('victim@gmail.com', '10.10.10.10')
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        with app.test_request_context():
+            check_and_alert_stuffing('10.10.10.10', 'victim@gmail.com')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert failure_counters.failures_for_ip('10.10.10.10') == FailedLogin.IP_FAIL_THRESHOLD
+    assert statements == []
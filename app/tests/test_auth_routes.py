@@ -1,6 +1,11 @@
 from flask import session
 from flask_login import current_user
+from sqlalchemy import event
 
+from app import db
+from app.auth.counters import failure_counters
+
+from app.models.failed_login import utc_now
 from app.models.user import User
 
 
@@ -24,4 +29,61 @@ def test_logout(auth):
     auth.register('Test', 'Smith', 'test@gmail.com', '54321drwsP#', '54321drwsP#', 'regular')
     auth.login('test@gmail.com', '54321drwsP#')
     response = auth.logout()
-    assert response.headers['Location'] == '/auth/login'
\ No newline at end of file
+    assert response.headers['Location'] == '/auth/login'
+
+
+def test_failed_login_refuses_next_attempt_with_retry_after(app, client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', 'WrongPassword1!')
+    with app.app_context():
+        user = User.find_user_by_email('test.user1@gmail.com')
+        assert user.failed_attempts == 1
+        assert user.login_not_before > utc_now()
+
+    response = auth.login('test.user1@gmail.com', '54321drwsP#')
+    assert response.status_code == 429
+    assert 1 <= int(response.headers['Retry-After']) <= 2
+    with app.app_context():
+        assert User.find_user_by_email('test.user1@gmail.com').failed_attempts == 1
+
+
+def test_login_succeeds_once_friction_has_passed(app, client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', 'WrongPassword1!')
+    with app.app_context():
+        user = User.find_user_by_email('test.user1@gmail.com')
+        user.login_not_before = utc_now()
+        db.session.commit()
+
+    response = auth.login('test.user1@gmail.com', '54321drwsP#')
+    assert response.status_code == 200
+    with app.app_context():
+        user = User.find_user_by_email('test.user1@gmail.com')
+        assert user.failed_attempts == 0
+        assert user.login_not_before is None
+
+
+def count_statements(engine, request):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = request()
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    return response, statements
+
+
+def test_successful_login_is_a_single_read(app, client, init_user_table):
+    response, statements = count_statements(db.engine, lambda: client.post(
+        '/auth/login', data={'login_email': 'test.user1@gmail.com', 'login_password': '54321drwsP#'}))
+    assert response.status_code == 302
+    assert len(statements) == 1
+    assert statements[0].startswith('SELECT')
+
+
+def test_failed_login_statements_are_bounded(app, client, init_user_table):
+    # The counters are built from the failed login table on first use, which is not part of a steady state login
+    failure_counters.rebuild()
+    response, statements = count_statements(db.engine, lambda: client.post(
+        '/auth/login', data={'login_email': 'test.user1@gmail.com', 'login_password': 'WrongPassword1!'}))
+    assert response.status_code == 200
+    assert [statement.split()[0] for statement in statements] == ['SELECT', 'INSERT', 'UPDATE']
@@ -0,0 +1,84 @@
+import hashlib
+
+import pytest
+
+from app.models.user import User
+from app.shared import breached_passwords
+from app.shared.breached_passwords import DIGEST_SIZE, HEADER, BreachedPasswordIndex, build_index
+
+
+def sha1(password):
+    return hashlib.sha1(password.encode()).hexdigest().upper()
+
+
+def test_build_index_sorts_and_deduplicates_hash_list(tmp_path, monkeypatch):
+    monkeypatch.setattr(breached_passwords, 'SORT_CHUNK_SIZE', 2)
+    passwords = [f'password{number}' for number in range(25)]
+    lines = [f'{sha1(password)}:{number}' for number, password in enumerate(reversed(passwords))]
+    path = str(tmp_path / 'index')
+
+    assert build_index(lines + lines[:5] + [''], path) == 25
+
+    index = BreachedPasswordIndex(path)
+    assert len(index) == 25
+    assert all(index.contains_password(password) for password in passwords)
+    assert not index.contains_password('not-breached')
+    index.close()
+
+
+def test_build_index_rejects_invalid_hashes(tmp_path):
+    with pytest.raises(ValueError):
+        build_index(['not-a-hash'], str(tmp_path / 'index'))
+
+
+def test_build_index_removes_sorted_runs_after_invalid_hash(tmp_path, monkeypatch):
+    monkeypatch.setattr(breached_passwords, 'SORT_CHUNK_SIZE', 2)
+    lines = [sha1(f'password{number}') for number in range(5)] + ['not-a-hash']
+
+    with pytest.raises(ValueError):
+        build_index(lines, str(tmp_path / 'index'))
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize('contents', [b'garbage', b'\0' * HEADER.size])
+def test_index_rejects_short_or_garbage_file(tmp_path, contents):
+    path = tmp_path / 'index'
+    path.write_bytes(contents)
+
+    with pytest.raises(ValueError):
+        BreachedPasswordIndex(str(path))
+
+
+def test_index_rejects_truncated_file(tmp_path):
+    path = tmp_path / 'index'
+    build_index([sha1(f'password{number}') for number in range(5)], str(path))
+    path.write_bytes(path.read_bytes()[:-DIGEST_SIZE])
+
+    with pytest.raises(ValueError):
+        BreachedPasswordIndex(str(path))
+
+
+def test_registration_with_damaged_index_fails_validation(app, auth, tmp_path):
+    path = tmp_path / 'index'
+    path.write_bytes(b'garbage')
+    app.config['BREACHED_PASSWORD_INDEX'] = str(path)
+
+    response = auth.register('Test', 'Smith', 'test@gmail.com', '54321drwsP#', '54321drwsP#', 'regular')
+    assert response.status_code == 200
+    assert User.query.count() == 0
+
+
+def test_build_breached_password_index_command(tmp_path, runner):
+    source = tmp_path / 'hashes.txt'
+    source.write_text(f'{sha1("hunter2")}:10\n')
+    output = tmp_path / 'index'
+
+    result = runner.invoke(args=['auth', 'build-breached-password-index', str(source), str(output)])
+    assert 'Wrote 1 breached password hashes' in result.output
+    assert BreachedPasswordIndex(str(output)).contains_password('hunter2')
+
+
+def test_registration_rejects_breached_password(app, auth):
+    response = auth.register('Test', 'Smith', 'test@gmail.com', 'Qwerty123#', 'Qwerty123#', 'regular')
+    assert b'This password is weak' in response.data
+    assert User.query.count() == 0
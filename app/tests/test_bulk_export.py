@@ -0,0 +1,82 @@
+import csv
+import gzip
+import io
+import json
+import zlib
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.shared.bulk_export import gzip_chunks
+
+
+def test_server_export_streams_gzipped_csv(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.get('/server/export')
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'application/gzip'
+    assert 'filename=servers.csv.gz' in response.headers['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.data).decode())))
+    assert len(rows) == 10
+    assert rows[0] == {'id': '1', 'name': 'ab-0001', 'cpu': '123', 'memory': '123', 'location': 'Walthamstow',
+                       'application_count': '3', 'total_production_pods': '4'}
+
+
+def test_application_export_joins_server_specs(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.get('/application/export?format=ndjson')
+
+    rows = [json.loads(line) for line in gzip.decompress(response.data).decode().splitlines()]
+    assert len(rows) == 10
+    assert rows[0]['name'] == 'Example App One'
+    assert (rows[0]['server'], rows[0]['server_cpu'], rows[0]['server_location']) == ('ab-0001', 123, 'Walthamstow')
+
+
+def test_export_rejects_unknown_formats(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    assert client.get('/server/export?format=xlsx').status_code == 400
+
+
+def test_gzip_chunks_sends_the_first_chunk_straight_away():
+    chunks = gzip_chunks(iter([b'name,cpu\n', b'ab-0001,1\n' * 1000]))
+
+    first = next(chunks)
+    assert zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(first) == b'name,cpu\n'
+    assert gzip.decompress(first + b''.join(chunks)) == b'name,cpu\n' + b'ab-0001,1\n' * 1000
+
+
+def test_export_command_writes_gzip_when_the_name_ends_with_gz(app, runner, tmp_path):
+    output = tmp_path / 'servers.ndjson.gz'
+
+    result = runner.invoke(args=['server', 'export', str(output)])
+
+    assert result.exit_code == 0
+    assert 'Exported 10 rows' in result.output
+    assert json.loads(gzip.decompress(output.read_bytes()).splitlines()[0])['name'] == 'ab-0001'
+
+
+def failing_stream(session, statement):
+    yield from session.execute(statement.limit(3))
+    raise OperationalError('SELECT', {}, Exception('connection lost'))
+
+
+def test_export_fails_when_the_stream_is_cut_off(app, client, auth, runner, init_user_table, tmp_path,
+                                                  monkeypatch):
+    monkeypatch.setattr('app.models.server.stream_rows', failing_stream)
+    output = tmp_path / 'servers.csv.gz'
+
+    result = runner.invoke(args=['server', 'export', str(output)])
+
+    assert result.exit_code == 1
+    assert 'Export failed after 3 rows' in result.output
+    assert 'Exported' not in result.output
+
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+    response = client.get('/server/export')
+    with pytest.raises(OperationalError):
+        response.get_data()
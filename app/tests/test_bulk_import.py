@@ -0,0 +1,116 @@
+import io
+import json
+import re
+
+from sqlalchemy import event
+
+from app import db
+from app.application.form_errors import ApplicationFormError
+from app.models.application import Application
+from app.models.server import Server
+from app.server.form_errors import ServerFormError
+from app.server.importer import ServerImporter
+from app.shared.bulk_import import CSV_FORMAT, INVALID_CSRF_TOKEN, read_rows
+
+SERVERS_CSV = (b'name,cpu,memory,location\n'
+               b'ab-1001,4,8,Walthamstow\n'
+               b'ab-0001,4,8,Harrow\n'
+               b'ab-1001,2,4,Surrey\n'
+               b'ab-1002,zero,8,Surrey\n'
+               b'ab-1003,16,32,Harrow\n')
+
+
+def application_row(name, server='ab-0001'):
+    slug = name.lower().replace(' ', '')
+    return {'name': name, 'team_name': 'Team Import', 'team_email': 'team.import@gmail.com',
+            'url': f'https://{slug}.com', 'swagger': '', 'bitbucket': f'https://bitbucket.org/repos/{slug}',
+            'extra_info': '', 'production_pods': 2, 'server': server}
+
+
+def test_server_import_reports_errors_per_row(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.post('/server/import', data={'file': (io.BytesIO(SERVERS_CSV), 'servers.csv')})
+
+    assert response.status_code == 200
+    assert response.json['created'] == 2
+    assert response.json['failed'] == 3
+    errors = {error['line']: error['errors'] for error in response.json['errors']}
+    assert errors[3] == {'name': [ServerFormError.NAME_EXISTS.value]}
+    assert errors[4] == {'name': [ServerFormError.NAME_EXISTS.value]}
+    assert list(errors[5]) == ['cpu']
+    assert Server.find_server_by_name('ab-1001').location == 'Walthamstow'
+    assert Server.find_server_by_name('ab-1003').memory == 32
+
+
+def test_application_import_reads_ndjson_bodies(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+    body = '\n'.join([json.dumps(application_row('Imported App One')),
+                      json.dumps(application_row('Imported App Two', server='zz-9999')),
+                      '{"name": "Broken',
+                      json.dumps(application_row('Imported App Three', server='ab-0002'))])
+
+    response = client.post('/application/import', data=body, content_type='application/x-ndjson')
+
+    assert response.json['created'] == 2
+    assert response.json['errors'] == [
+        {'line': 2, 'errors': {'server': [ApplicationFormError.SERVER_DOES_NOT_EXIST.value]}},
+        {'line': 3, 'errors': {'row': ['Line is not a JSON object']}},
+    ]
+    assert Application.find_application_by_name('Imported App Three').server.name == 'ab-0002'
+
+
+def test_import_rejects_unknown_formats(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.post('/server/import', data={'file': (io.BytesIO(SERVERS_CSV), 'servers.xlsx')})
+
+    assert response.status_code == 400
+
+
+def test_import_requires_a_csrf_token_and_an_import_content_type(app, client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+    app.config['WTF_CSRF_ENABLED'] = True
+    token = re.search(r'name="csrf_token" type="hidden" value="([^"]+)"',
+                      client.get('/server/create').text).group(1)
+    body = b'name,cpu,memory,location\nab-1001,4,8,Harrow\n'
+
+    response = client.post('/server/import?format=csv', data=body, content_type='text/csv')
+    assert (response.status_code, response.json['error']) == (400, INVALID_CSRF_TOKEN)
+
+    response = client.post('/server/import?format=csv', data=body, content_type='text/plain',
+                           headers={'X-CSRFToken': token})
+    assert response.status_code == 415
+
+    response = client.post('/server/import?format=csv', data=body, content_type='text/csv',
+                           headers={'X-CSRFToken': token})
+    assert response.json['created'] == 1
+
+
+def test_import_inserts_each_chunk_with_one_statement(app):
+    rows = b'name,cpu,memory,location\n' + b''.join(f'cd-{number:04},1,1,Harrow\n'.encode() for number in range(5))
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        report = ServerImporter(chunk_size=2).run(read_rows(io.BytesIO(rows), CSV_FORMAT))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert report.created == 5
+    assert len([statement for statement in statements if statement.startswith('INSERT')]) == 3
+    assert len([statement for statement in statements if statement.startswith('SELECT')]) == 3
+
+
+def test_import_command_exits_with_an_error_when_rows_fail(app, runner, tmp_path):
+    source = tmp_path / 'servers.csv'
+    source.write_bytes(SERVERS_CSV)
+
+    result = runner.invoke(args=['server', 'import', str(source)])
+
+    assert result.exit_code == 1
+    assert 'Created 2 rows, 3 rows failed' in result.output
+    assert f'Line 3: name: {ServerFormError.NAME_EXISTS.value}' in result.output
@@ -0,0 +1,107 @@
+import pytest
+from sqlalchemy import inspect, text
+
+from app import create_app, db
+from app.models.application import Application
+from app.models.failed_login import FailedLogin
+from app.models.server import Server
+from app.models.user import User
+from config.test_config import TestConfig
+
+# Schema created by the first release, before any of the columns, tables and indexes added since
+BASELINE_SCHEMA = [
+    'CREATE TABLE user (id INTEGER NOT NULL, email VARCHAR(150) NOT NULL, password VARCHAR(20) NOT NULL, '
+    'first_name VARCHAR(150) NOT NULL, last_name VARCHAR(150) NOT NULL, is_admin BOOLEAN NOT NULL, '
+    'failed_attempts INTEGER NOT NULL, PRIMARY KEY (id), UNIQUE (email))',
+    'CREATE TABLE failed_login (id INTEGER NOT NULL, email VARCHAR(150), ip VARCHAR(45), user_agent VARCHAR(255), '
+    'created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL, PRIMARY KEY (id))',
+    'CREATE INDEX ix_failed_login_created_at ON failed_login (created_at)',
+    'CREATE INDEX ix_failed_login_email ON failed_login (email)',
+    'CREATE INDEX ix_failed_login_ip ON failed_login (ip)',
+    'CREATE TABLE server (id INTEGER NOT NULL, name VARCHAR(50) NOT NULL, cpu INTEGER NOT NULL, '
+    'memory INTEGER NOT NULL, location VARCHAR(50) NOT NULL, PRIMARY KEY (id), UNIQUE (name))',
+    'CREATE TABLE application (id INTEGER NOT NULL, name VARCHAR(150) NOT NULL, team_name VARCHAR(150) NOT NULL, '
+    'team_email VARCHAR(150) NOT NULL, url VARCHAR(200) NOT NULL, swagger VARCHAR(200), '
+    'bitbucket VARCHAR(200) NOT NULL, extra_info TEXT(1000), production_pods INTEGER NOT NULL, server VARCHAR(50), '
+    'PRIMARY KEY (id), UNIQUE (name), UNIQUE (url), UNIQUE (bitbucket), FOREIGN KEY(server) REFERENCES server (name))',
+]
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "commands.db"}'
+
+    app = create_app(FileConfig)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_app_start_does_not_create_the_schema(file_app):
+    assert inspect(db.engine).get_table_names() == []
+
+
+def test_db_create_makes_missing_tables_with_demo_data(file_app):
+    runner = file_app.test_cli_runner()
+
+    result = runner.invoke(args=['db', 'create'])
+    assert 'Created 5 tables' in result.output
+    assert Server.query.count() == 10
+    assert FailedLogin.query.count() == 10
+
+    db.session.remove()
+    result = runner.invoke(args=['db', 'create'])
+    assert 'Created 0 tables' in result.output
+    assert Server.query.count() == 10
+
+
+def test_db_create_without_demo_data(file_app):
+    result = file_app.test_cli_runner().invoke(args=['db', 'create', '--no-demo-data'])
+
+    assert 'Created 5 tables' in result.output
+    assert Server.query.count() == 0
+
+
+def test_db_seed_users_adds_users_from_the_environment(file_app, monkeypatch):
+    monkeypatch.setenv('ADMIN_EMAIL', 'admin@example.com')
+    monkeypatch.setenv('ADMIN_PASSWORD', 'Admin123#')
+    monkeypatch.delenv('REGULAR_EMAIL', raising=False)
+    runner = file_app.test_cli_runner()
+    runner.invoke(args=['db', 'create', '--no-demo-data'])
+
+    assert 'Added 1 users' in runner.invoke(args=['db', 'seed-users']).output
+    assert 'Added 0 users' in runner.invoke(args=['db', 'seed-users']).output
+    assert User.find_user_by_email('admin@example.com').is_admin
+
+
+def test_db_upgrade_brings_a_baseline_database_up_to_date(file_app):
+    with db.engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO user VALUES (1, 'test@gmail.com', 'hash', 'Test', 'User', 0, 0)"))
+        connection.execute(text("INSERT INTO server VALUES (1, 'aa-1234', 1, 1, 'Harrow'), (2, 'aa-2345', 1, 1, 'Surrey')"))
+        connection.execute(text("INSERT INTO application VALUES (7, 'App One', 'Team One', 'one@gmail.com', "
+                                "'https://appone.com', NULL, 'https://bitbucket.org/appone', '', 3, 'aa-2345')"))
+    runner = file_app.test_cli_runner()
+
+    result = runner.invoke(args=['db', 'upgrade'])
+
+    for change in ('failed_login_rollup', 'user.login_not_before', 'server.application_count',
+                   'application.server_id', 'ix_failed_login_email dropped'):
+        assert change in result.output
+    user = User.query.first()
+    assert (user.email, user.login_not_before) == ('test@gmail.com', None)
+    application = db.session.get(Application, 7)
+    assert (application.name, application.server.name) == ('App One', 'aa-2345')
+    assert (application.server.application_count, application.server.total_production_pods) == (1, 3)
+    inspector = inspect(db.engine)
+    assert 'server' not in {column['name'] for column in inspector.get_columns('application')}
+    application_indexes = {index['name'] for index in inspector.get_indexes('application')}
+    assert {'ix_application_server_id', 'uq_application_swagger'} <= application_indexes
+    assert 'ix_application_swagger' not in application_indexes
+    assert Application.query.count() == 1
+
+    db.session.remove()
+    assert 'Applied 0 changes' in runner.invoke(args=['db', 'upgrade']).output
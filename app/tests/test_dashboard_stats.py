@@ -0,0 +1,62 @@
+from sqlalchemy import event
+
+from app import db
+from app.models.application import Application
+from app.views.stats import dashboard_stats
+
+
+def dashboard_statements(client):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get('/views/dashboard')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return response, statements
+
+
+def test_dashboard_is_served_from_the_snapshot(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+    client.get('/views/dashboard')
+
+    response, statements = dashboard_statements(client)
+
+    assert statements == []
+    stats = dashboard_stats.snapshot()
+    assert (stats.applications, stats.servers) == (10, 10)
+    assert stats.production_pods == sum(application.production_pods for application in Application.query)
+    assert sum(count for location, count in stats.servers_by_location) == 10
+    assert stats.pods_by_team[0][1] >= stats.pods_by_team[-1][1]
+    assert 'Servers by location' in response.text
+
+
+def test_inventory_changes_refresh_the_snapshot_in_the_background(app):
+    assert dashboard_stats.snapshot().applications == 10
+
+    with app.test_request_context():
+        Application.delete_application(Application.find_application_by_name('Example App One'))
+
+    assert dashboard_stats.snapshot().applications == 10
+    refresher = dashboard_stats._refresher
+    if refresher:
+        refresher.join()
+    assert dashboard_stats.snapshot().applications == 9
+
+
+def test_snapshot_read_while_the_inventory_changed_is_kept_stale(app, monkeypatch):
+    compute = dashboard_stats.compute
+
+    def compute_during_change():
+        snapshot = compute()
+        dashboard_stats.invalidate()
+        return snapshot
+
+    monkeypatch.setattr(dashboard_stats, 'compute', compute_during_change)
+    snapshot = dashboard_stats.refresh()
+
+    assert dashboard_stats._snapshot is snapshot
+    assert dashboard_stats._expires_at == 0
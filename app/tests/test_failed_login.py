@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+from app import db
+from app.failed_logins.retention import apply_retention, start_of_hour
+from app.models.failed_login import FailedLogin, utc_now
+from app.models.failed_login_rollup import FailedLoginRollup
+
+
+def add_failed_logins(count, created_at, email='attacker@gmail.com', ip='10.0.0.1'):
+    db.session.add_all([FailedLogin(email=email, ip=ip, user_agent='curl/7.68.0', created_at=created_at)
+                        for _ in range(count)])
+    db.session.commit()
+
+
+def test_fetch_failed_logins_page_only_returns_rows_in_range(app):
+    now = utc_now()
+    add_failed_logins(3, now - timedelta(days=2))
+
+    page = FailedLogin.fetch_failed_logins_page(since=now - timedelta(hours=1))
+    assert len(page.items) == 10
+    assert all(login.created_at >= now - timedelta(hours=1) for login in page.items)
+
+    page = FailedLogin.fetch_failed_logins_page(since=now - timedelta(days=3), until=now - timedelta(days=1))
+    assert len(page.items) == 3
+
+
+def test_fetch_failed_logins_page_filters_by_email_and_ip(app):
+    now = utc_now()
+    add_failed_logins(2, now, email='victim@gmail.com', ip='10.0.0.2')
+    add_failed_logins(2, now, email='victim@gmail.com', ip='10.0.0.3')
+
+    page = FailedLogin.fetch_failed_logins_page(since=now - timedelta(minutes=1), email='victim@gmail.com', ip='10.0.0.3')
+    assert len(page.items) == 2
+    assert {login.ip for login in page.items} == {'10.0.0.3'}
+
+
+def test_fetch_failed_logins_page_walks_equal_timestamps_newest_first(app):
+    now = utc_now()
+    add_failed_logins(5, now - timedelta(minutes=30))
+
+    seen = []
+    cursor = None
+    while True:
+        page = FailedLogin.fetch_failed_logins_page(since=now - timedelta(hours=1), cursor=cursor, page_size=4)
+        seen.extend((login.created_at, login.id) for login in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen)) == 15
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_apply_retention_rolls_up_hours_before_pruning(app):
+    old_hour = start_of_hour(utc_now() - timedelta(days=40))
+    add_failed_logins(3, old_hour + timedelta(minutes=10))
+    add_failed_logins(2, old_hour + timedelta(minutes=50), ip='10.0.0.9')
+    add_failed_logins(1, utc_now() - timedelta(days=2))
+
+    rolled_up_until, deleted = apply_retention(timedelta(days=30), batch_size=2)
+
+    assert deleted == 5
+    assert rolled_up_until > utc_now() - timedelta(days=3)
+    assert FailedLogin.query.filter(FailedLogin.created_at < utc_now() - timedelta(days=30)).count() == 0
+    assert FailedLogin.query.count() == 11
+    assert [(row.value, row.failures) for row in FailedLoginRollup.top_values('ip', old_hour)][:2] == [
+        ('10.0.0.1', 4), ('10.0.0.9', 2)]
+    assert FailedLoginRollup.hourly_totals(old_hour, old_hour + timedelta(hours=1))[0].failures == 5
+
+
+def test_apply_retention_does_not_count_rows_twice(app):
+    add_failed_logins(3, utc_now() - timedelta(days=40))
+    apply_retention(timedelta(days=30))
+    apply_retention(timedelta(days=30))
+
+    hour = start_of_hour(utc_now() - timedelta(days=41))
+    assert sum(row.failures for row in FailedLoginRollup.top_values('email', hour)) == 3
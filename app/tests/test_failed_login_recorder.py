@@ -0,0 +1,46 @@
+import time
+
+from sqlalchemy import event
+
+from app import db
+from app.auth.recorder import failed_login_recorder
+from app.models.failed_login import FailedLogin, utc_now
+
+
+def test_recorder_buffers_until_batch_is_full(app):
+    app.config['FAILED_LOGIN_BATCH_SIZE'] = 3
+    app.config['FAILED_LOGIN_FLUSH_INTERVAL'] = 60
+    existing = FailedLogin.query.count()
+
+    executions = []
+    listener = lambda conn, cursor, statement, parameters, context, executemany: executions.append(executemany)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        failed_login_recorder.record('batch@gmail.com', '10.1.1.1', 'agent')
+        failed_login_recorder.record('batch@gmail.com', '10.1.1.2', 'agent')
+        assert failed_login_recorder.pending == 2
+        assert executions == []
+
+        failed_login_recorder.record('batch@gmail.com', '10.1.1.3', 'agent')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert failed_login_recorder.pending == 0
+    assert executions == [True]
+    assert FailedLogin.query.count() == existing + 3
+
+
+def test_recorder_flushes_after_interval(app):
+    app.config['FAILED_LOGIN_BATCH_SIZE'] = 100
+    app.config['FAILED_LOGIN_FLUSH_INTERVAL'] = 0.1
+    before = utc_now()
+
+    failed_login_recorder.record('interval@gmail.com', '10.2.2.2', 'agent')
+    deadline = time.time() + 5
+    while failed_login_recorder.pending and time.time() < deadline:
+        time.sleep(0.02)
+
+    db.session.expire_all()
+    saved = FailedLogin.query.filter_by(email='interval@gmail.com').one()
+    assert saved.ip == '10.2.2.2'
+    assert before <= saved.created_at <= utc_now()
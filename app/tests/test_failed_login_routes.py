@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from app import db
+from app.models.failed_login import FailedLogin, utc_now
+
+
+def test_all_failed_logins_streams_grid(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.get('/failed-logins/all-failed-logins?view=all')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert b'failed_loginone@gmail.com' in response.get_data()
+    assert FailedLogin.query.count() == 10
+
+
+def test_data_filters_failed_logins_by_column(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.get('/failed-logins/data', query_string={
+        'draw': '1', 'start': '0', 'length': '10',
+        'columns[0][data]': 'email', 'columns[1][data]': 'ip', 'columns[1][search][value]': '203.45'})
+    body = response.get_json()
+    assert body['recordsTotal'] == 10
+    assert body['recordsFiltered'] == 1
+    assert body['data'][0]['email'] == 'failed_logintwo@gmail.com'
+
+
+def test_all_failed_logins_defaults_to_last_hour(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.get('/failed-logins/all-failed-logins?page_size=4')
+    assert response.status_code == 200
+    assert response.data.count(b'<td>failed_login') == 4
+    assert b'Older' in response.data
+
+
+def test_all_failed_logins_rejects_invalid_time_range(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.get('/failed-logins/all-failed-logins?since=yesterday')
+    assert response.status_code == 200
+    assert b'Please enter a valid time range' in response.data
+
+
+def test_all_failed_logins_history_reads_rollups(client, auth, init_user_table, runner):
+    db.session.add(FailedLogin(email='old@gmail.com', ip='10.9.9.9', user_agent='curl/7.68.0',
+                               created_at=utc_now() - timedelta(days=40)))
+    db.session.commit()
+    result = runner.invoke(args=['failed-logins', 'retain'])
+    assert 'pruned 1 rows' in result.output
+
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+    response = client.get('/failed-logins/all-failed-logins', query_string={
+        'view': 'history', 'since': (utc_now() - timedelta(days=41)).strftime('%Y-%m-%dT%H:%M:%S')})
+    assert response.status_code == 200
+    assert b'10.9.9.9' in response.data
+    assert FailedLogin.query.filter_by(email='old@gmail.com').count() == 0
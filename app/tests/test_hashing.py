@@ -0,0 +1,39 @@
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models.user import User
+from app.shared.hashing import password_hasher
+
+
+def test_password_hasher_hashes_in_process_pool(app):
+    app.config['PASSWORD_HASH_WORKERS'] = 1
+    try:
+        password_hash = password_hasher.hash('54321drwsP#')
+        assert password_hash.startswith('scrypt:')
+        assert password_hasher.verify(password_hash, '54321drwsP#')
+        assert not password_hasher.verify(password_hash, 'wrong')
+        assert password_hasher._executor()._mp_context.get_start_method() == 'forkserver'
+    finally:
+        password_hasher.shutdown()
+
+
+def test_failed_login_verifies_password_once(app, auth, init_user_table, monkeypatch):
+    calls = []
+    verify = password_hasher.verify
+    monkeypatch.setattr(password_hasher, 'verify', lambda *args: calls.append(args) or verify(*args))
+
+    auth.login('test.user1@gmail.com', 'WrongPassword1!')
+    assert len(calls) == 1
+
+
+def test_login_rehashes_password_created_with_old_parameters(app, auth):
+    db.session.add(User(first_name='Old', last_name='Hash', email='old.hash@gmail.com', is_admin=False,
+                        password=generate_password_hash('54321drwsP#', method='pbkdf2:sha256:1000')))
+    db.session.commit()
+
+    auth.login('old.hash@gmail.com', '54321drwsP#')
+
+    user = User.find_user_by_email('old.hash@gmail.com')
+    db.session.refresh(user)
+    assert user.password.startswith('scrypt:')
+    assert not password_hasher.needs_rehash(user.password)
@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOADED_MODULES = '''
+import sys
+from app import create_app
+from config.test_config import TestConfig
+create_app(TestConfig)
+print(' '.join(module for module in ('requests', 'validators', 'flask_mail') if module in sys.modules))
+'''
+
+
+def run_python(code):
+    environment = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=environment, capture_output=True, text=True,
+                          check=True).stdout.strip()
+
+
+def test_optional_subsystems_are_not_imported_on_start():
+    assert run_python(LOADED_MODULES) == ''
@@ -0,0 +1,110 @@
+import socketserver
+import threading
+import time
+
+import pytest
+
+from app import create_app
+from app.auth.counters import failure_counters
+from app.auth.helpers import check_and_alert_stuffing
+from app.models.failed_login import FailedLogin
+from app.shared.mailer import alert_mailer
+from config.test_config import TestConfig
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP to accept messages and record them on the server"""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost SMTP stand-in')
+        while line := self.rfile.readline():
+            command = line.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 localhost')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while (line := self.rfile.readline()) not in (b'.\r\n', b''):
+                    data.append(line.decode())
+                self.server.messages.append(''.join(data))
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.messages = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def mail_app(smtp_server):
+    class MailConfig(TestConfig):
+        MAIL_SUPPRESS_SEND = False
+        MAIL_SERVER = '127.0.0.1'
+        MAIL_PORT = smtp_server.server_address[1]
+        ALERT_COALESCE_INTERVAL = 0.2
+
+    app = create_app(MailConfig)
+    with app.app_context():
+        yield app
+
+
+def wait_for_messages(server, count, timeout=5):
+    deadline = time.time() + timeout
+    while len(server.messages) < count and time.time() < deadline:
+        time.sleep(0.02)
+    return server.messages
+
+
+def test_alerts_for_same_key_are_coalesced_into_one_digest(mail_app, smtp_server):
+    for attempt in range(3):
+        alert_mailer.alert('brute_force', 'victim@gmail.com', subject='Brute Force Alert',
+                           recipients=['security@example.com'], body=f'Failure {attempt}')
+
+    messages = wait_for_messages(smtp_server, 1)
+    time.sleep(0.3)
+    assert len(messages) == 1
+    assert 'Brute Force Alert (3 alerts)' in messages[0]
+    assert 'Failure 0' in messages[0] and 'Failure 2' in messages[0]
+
+
+def test_digests_share_one_smtp_connection(mail_app, smtp_server):
+    alert_mailer.alert('brute_force', 'one@gmail.com', subject='Brute Force Alert',
+                       recipients=['security@example.com'], body='one')
+    alert_mailer.alert('brute_force', 'two@gmail.com', subject='Brute Force Alert',
+                       recipients=['security@example.com'], body='two')
+    wait_for_messages(smtp_server, 2)
+    alert_mailer.alert('credential_stuffing', '10.0.0.1', subject='Credential Stuffing Alert',
+                       recipients=['security@example.com'], body='three')
+
+    assert len(wait_for_messages(smtp_server, 3)) == 3
+    assert smtp_server.connections == 1
+
+
+def test_check_and_alert_stuffing_does_not_wait_for_smtp(mail_app, smtp_server):
+    for _ in range(FailedLogin.ACCOUNT_FAIL_THRESHOLD):
+        failure_counters.record('victim@gmail.com', '10.0.0.2')
+
+    with mail_app.test_request_context():
+        check_and_alert_stuffing('10.0.0.2', 'victim@gmail.com')
+    assert smtp_server.messages == []
+
+    messages = wait_for_messages(smtp_server, 1)
+    assert len(messages) == 1
+    assert 'Account victim@gmail.com had 5 failed logins' in messages[0]
@@ -0,0 +1,73 @@
+import os
+from datetime import timedelta
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from app import db
+from app.models.application import Application
+from app.models.failed_login import FailedLogin, utc_now
+from app.shared.postgres import normalise_database_url, postgres_engine_options
+
+requires_postgres = pytest.mark.skipif(not os.environ.get('TEST_DATABASE_URL', '').startswith('postgres'),
+                                       reason='TEST_DATABASE_URL is not a PostgreSQL database')
+
+
+def index_ddl(table, name):
+    index = next(index for index in table.indexes if index.name == name)
+    return str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+
+
+def test_database_url_scheme_is_normalised():
+    assert normalise_database_url('postgres://user:secret@db/assets') == 'postgresql://user:secret@db/assets'
+    assert normalise_database_url('postgresql://user@db/assets') == 'postgresql://user@db/assets'
+    assert normalise_database_url('sqlite:///database.db') == 'sqlite:///database.db'
+
+
+def test_postgres_engine_options_are_added_to_the_config():
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI='postgres://user@db/assets', DATABASE_POOL_SIZE=20,
+                      SQLALCHEMY_ENGINE_OPTIONS={'pool_recycle': 60})
+
+    postgres_engine_options(app)
+
+    assert app.config['SQLALCHEMY_DATABASE_URI'] == 'postgresql://user@db/assets'
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS'] == {'pool_size': 20, 'max_overflow': 10, 'pool_timeout': 30,
+                                                       'pool_recycle': 60, 'pool_pre_ping': True}
+
+
+def test_postgres_indexes_use_postgres_index_types():
+    assert 'USING brin (created_at)' in index_ddl(FailedLogin.__table__, 'ix_failed_login_created_at_brin')
+    assert 'name varchar_pattern_ops' in index_ddl(Application.__table__, 'ix_application_name_pattern')
+    assert "UNIQUE INDEX uq_application_swagger ON application (swagger) WHERE swagger IS NOT NULL AND swagger <> ''" in \
+        index_ddl(Application.__table__, 'uq_application_swagger')
+
+
+def test_postgres_only_indexes_are_skipped_on_other_databases(app):
+    if db.engine.dialect.name != 'sqlite':
+        pytest.skip('Checks the SQLite schema')
+    names = set(db.session.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+    assert 'ix_failed_login_email_created_at' in names
+    assert 'ix_failed_login_created_at_brin' not in names
+    assert 'ix_application_name_pattern' not in names
+
+
+@requires_postgres
+def test_schema_and_window_counts_on_postgres(app):
+    assert db.engine.dialect.name == 'postgresql'
+    assert db.engine.pool.size() == 5
+    names = set(db.session.execute(text("SELECT indexname FROM pg_indexes WHERE tablename IN "
+                                         "('failed_login', 'application')")).scalars())
+    assert {'ix_failed_login_created_at_brin', 'ix_failed_login_email_created_at',
+            'ix_application_name_pattern', 'uq_application_swagger'} <= names
+
+    FailedLogin.insert_failed_logins(
+        [{'email': 'victim@example.com', 'ip': '10.0.0.1', 'user_agent': 'curl', 'created_at': utc_now()}] * 3 +
+        [{'email': 'victim@example.com', 'ip': '10.0.0.1', 'user_agent': 'curl',
+          'created_at': utc_now() - timedelta(hours=1)}])
+
+    assert FailedLogin.recent_failures_for_email('victim@example.com') == 3
+    assert FailedLogin.recent_failures_for_ip('10.0.0.1') == 3
@@ -0,0 +1,28 @@
+from app import create_app, db
+from app.shared.prefork import after_fork, warm_up
+from config.test_config import TestConfig
+
+
+def test_warm_up_compiles_every_template(app):
+    app.jinja_env.cache.clear()
+
+    warm_up(app)
+
+    assert len(app.jinja_env.cache) == len(app.jinja_env.list_templates())
+
+
+def test_after_fork_replaces_inherited_connections_without_closing_them(tmp_path):
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "prefork.db"}'
+
+    app = create_app(FileConfig)
+    with app.app_context():
+        with db.engine.connect() as connection:
+            inherited = connection.connection.dbapi_connection
+
+        after_fork(app)
+
+        with db.engine.connect() as connection:
+            assert connection.connection.dbapi_connection is not inherited
+        assert inherited.execute('SELECT 1').fetchone() == (1,)
+        db.engine.dispose()
@@ -0,0 +1,85 @@
+import io
+
+from sqlalchemy import event
+
+from app import db
+from app.models.server import Server
+from app.server.choices import server_choices
+from app.server.importer import ServerImporter
+from app.shared.bulk_import import CSV_FORMAT, read_rows
+from app.shared.pagination import encode_cursor
+
+
+def server_selects(request):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('SELECT') and 'FROM server' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        request()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return statements
+
+
+def test_application_forms_reuse_the_cached_server_names(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    assert len(server_selects(lambda: client.get('/application/create'))) == 1
+    assert server_selects(lambda: client.get('/application/create')) == []
+    assert 'ab-0010' in client.get('/application/create').text
+
+
+def test_committed_server_changes_clear_the_cache(app, init_server_table):
+    with app.test_request_context():
+        assert 'aa-1234' in server_choices.names()
+
+        Server.create_server('zz-0001', 1, 1, 'Harrow')
+        assert 'zz-0001' in server_choices.names()
+
+        server = Server.find_server_by_name('zz-0001')
+        Server.update_server(server.id, {'name': 'zz-0002'})
+        assert 'zz-0002' in server_choices.names()
+
+        Server.delete_server(Server.find_server_by_name('zz-0002'))
+        assert 'zz-0002' not in server_choices.names()
+
+        ServerImporter().run(read_rows(io.BytesIO(b'name,cpu,memory,location\nzz-0003,1,1,Harrow\n'), CSV_FORMAT))
+        assert 'zz-0003' in server_choices.names()
+
+
+def test_rolled_back_server_changes_keep_the_cache(app):
+    names = server_choices.names()
+    db.session.add(Server(name='zz-0004', cpu=1, memory=1, location='Harrow'))
+    db.session.flush()
+    db.session.rollback()
+
+    assert server_selects(server_choices.names) == []
+    assert server_choices.names() == names
+
+
+def test_choices_endpoint_pages_through_matching_names(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    first = client.get('/server/choices?q=ab-000&page_size=4').json
+    assert first['results'][0] == {'id': Server.find_server_by_name('ab-0001').id, 'name': 'ab-0001'}
+    assert [server['name'] for server in first['results']] == ['ab-0001', 'ab-0002', 'ab-0003', 'ab-0004']
+
+    second = client.get(f'/server/choices?q=ab-000&page_size=4&cursor={first["next_cursor"]}').json
+    assert [server['name'] for server in second['results']] == ['ab-0005', 'ab-0006', 'ab-0007', 'ab-0008']
+
+    last = client.get(f'/server/choices?q=ab-000&page_size=4&cursor={second["next_cursor"]}').json
+    assert [server['name'] for server in last['results']] == ['ab-0009']
+    assert last['next_cursor'] is None
+
+
+def test_choices_endpoint_ignores_cursor_without_a_name(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.get(f'/server/choices?q=ab-000&page_size=4&cursor={encode_cursor(1)}')
+
+    assert response.status_code == 200
+    assert [server['name'] for server in response.json['results']] == ['ab-0001', 'ab-0002', 'ab-0003', 'ab-0004']
@@ -0,0 +1,154 @@
+import io
+import json
+import threading
+import time
+
+import pytest
+from sqlalchemy import event, select
+
+from app import create_app, db
+from app.application.importer import ApplicationImporter
+from app.models.application import Application
+from app.models.server import Server
+from app.server.choices import server_choices
+from app.shared.bulk_import import NDJSON_FORMAT, read_rows
+from config.test_config import TestConfig
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "rollups.db"}'
+
+    app = create_app(FileConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def rollups():
+    return {row.name: (row.application_count, row.total_production_pods) for row in
+            db.session.execute(select(Server.name, Server.application_count, Server.total_production_pods))}
+
+
+def assert_rollups_match_a_recount():
+    db.session.rollback()
+    maintained = rollups()
+    assert Application.rebuild_server_rollups()
+    assert rollups() == maintained
+    return maintained
+
+
+def create_application(name, production_pods, server):
+    slug = name.lower().replace(' ', '')
+    Application.create_application(name, 'Team Rollup', 'team.rollup@gmail.com', f'https://{slug}.com', '',
+                                   f'https://bitbucket.org/repos/{slug}', production_pods, '',
+                                   Server.find_server_by_name(server).id)
+
+
+def test_demo_data_is_counted(app):
+    assert assert_rollups_match_a_recount()['ab-0001'] == (3, 4)
+
+
+def test_rollups_follow_application_changes(app):
+    before = rollups()
+    with app.test_request_context():
+        create_application('Rollup App', 5, 'ab-0010')
+        assert rollups()['ab-0010'] == (before['ab-0010'][0] + 1, before['ab-0010'][1] + 5)
+
+        application = Application.find_application_by_name('Rollup App')
+        Application.update_application(application.id, {'name': 'Rollup App', 'server_id': Server.find_server_by_name('ab-0009').id,
+                                                        'production_pods': 7})
+        assert rollups()['ab-0010'] == before['ab-0010']
+
+        Application.delete_application(Application.find_application_by_name('Example App One'))
+
+        rows = [{'name': f'Imported App {word}', 'team_name': 'Team Rollup', 'team_email': 'team.rollup@gmail.com',
+                 'url': f'https://imported{word}.com', 'bitbucket': f'https://bitbucket.org/repos/imported{word}',
+                 'production_pods': pods, 'server': 'ab-0009'} for word, pods in [('One', 2), ('Two', 3)]]
+        body = '\n'.join(json.dumps(row) for row in rows).encode()
+        ApplicationImporter().run(read_rows(io.BytesIO(body), NDJSON_FORMAT))
+
+    maintained = assert_rollups_match_a_recount()
+    assert maintained['ab-0009'] == (before['ab-0009'][0] + 3, before['ab-0009'][1] + 12)
+
+
+def test_rollup_updates_keep_the_cached_server_choices(app):
+    server_choices.names()
+    with app.test_request_context():
+        create_application('Rollup App', 5, 'ab-0010')
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        server_choices.names()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert statements == []
+
+
+def test_delete_checks_the_application_count(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+    server = Server.find_server_by_name('ab-0001')
+
+    response = client.get(f'/server/delete?server_id={server.id}', follow_redirects=True)
+
+    assert 'Example App Five, Example App One, Example App Two are running on it' in response.text
+    assert Server.find_server_by_name('ab-0001') is not None
+
+
+def test_renaming_a_server_keeps_its_applications(app):
+    server = Server.find_server_by_name('ab-0001')
+    with app.test_request_context():
+        Server.update_server(server.id, {'name': 'ab-1001'})
+
+    db.session.expire_all()
+    assert Application.find_application_by_name('Example App One').server.name == 'ab-1001'
+    assert Application.find_application_names_by_server(server.id) == ['Example App Five', 'Example App One',
+                                                                      'Example App Two']
+
+
+def test_interleaved_updates_move_an_application_once(file_app):
+    application_id = Application.find_application_by_name('Example App One').id
+    server_ids = {'first': Server.find_server_by_name('ab-0009').id, 'second': Server.find_server_by_name('ab-0010').id}
+    production_pods = {'first': 4, 'second': 6}
+    db.session.remove()
+    first_started, second_started = threading.Event(), threading.Event()
+
+    def pause_first_update(conn, cursor, statement, parameters, context, executemany):
+        # Holds the first update after its first statement until the second update has started
+        if threading.current_thread().name == 'first' and not first_started.is_set():
+            first_started.set()
+            second_started.wait(5)
+            time.sleep(0.2)
+
+    def update(name):
+        with file_app.test_request_context():
+            if name == 'second':
+                second_started.set()
+            Application.update_application(application_id, {'name': 'Example App One', 'server_id': server_ids[name],
+                                                             'production_pods': production_pods[name]})
+            db.session.remove()
+
+    event.listen(db.engine, 'after_cursor_execute', pause_first_update)
+    try:
+        first = threading.Thread(target=update, args=('first',), name='first')
+        first.start()
+        first_started.wait(5)
+        second = threading.Thread(target=update, args=('second',), name='second')
+        second.start()
+        first.join()
+        second.join()
+    finally:
+        event.remove(db.engine, 'after_cursor_execute', pause_first_update)
+
+    application = db.session.get(Application, application_id)
+    assert (application.server_id, application.production_pods) == (server_ids['second'], 6)
+    maintained = assert_rollups_match_a_recount()
+    assert maintained['ab-0001'] == (2, 3)
@@ -69,4 +69,37 @@ def test_delete_regular_fails(client, app, auth):
         client.get(f'/server/delete?server_id={server.id}')
         assert current_user.is_admin == False
         server = Server.query.filter_by(name='io-9877').first()
-        assert server is not None
\ No newline at end of file
+        assert server is not None
+
+def test_all_servers_streams_grid(client, auth, init_user_table, init_server_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.get('/server/all-servers?view=all')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.get_data().count(b'data-delete-url=') == Server.query.count()
+
+
+def test_all_servers_defaults_to_server_side_grid(client, auth, init_user_table, init_server_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.get('/server/all-servers')
+    assert response.status_code == 200
+    assert b'data-source="/server/data"' in response.data
+    assert b'aa-1234' not in response.data
+
+
+def test_data_searches_and_orders_servers(client, auth, init_user_table, init_server_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.get('/server/data', query_string={
+        'draw': '2', 'start': '0', 'length': '2', 'search[value]': 'aa-',
+        'columns[0][data]': 'name', 'columns[1][data]': 'location',
+        'order[0][column]': '0', 'order[0][dir]': 'desc'})
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['draw'] == 2
+    assert body['recordsTotal'] == Server.query.count()
+    assert body['recordsFiltered'] == 3
+    assert [row['name'] for row in body['data']] == ['aa-3456', 'aa-2345']
+    assert body['data'][0]['delete_url'] == f'/server/delete?server_id={Server.find_server_by_name("aa-3456").id}'
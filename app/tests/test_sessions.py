@@ -0,0 +1,110 @@
+import time
+from contextlib import closing
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.models.user import User
+from app.shared.sessions import CachedSQLiteSessionInterface
+from config.test_config import TestConfig
+
+
+@pytest.fixture
+def session_app(tmp_path, breached_password_index):
+    class SessionConfig(TestConfig):
+        SESSION_TYPE = 'cached_sqlite'
+        SESSION_SQLITE_PATH = str(tmp_path / 'sessions.db')
+        SESSION_SWEEP_INTERVAL = 0
+
+    app = create_app(SessionConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(first_name='Testuser1', last_name='Smith', email='test.user1@gmail.com', is_admin=True,
+                            password=generate_password_hash('54321drwsP#', method='scrypt')))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def store_statements(interface, request):
+    statements = []
+    interface._connection().set_trace_callback(statements.append)
+    try:
+        request()
+    finally:
+        interface._connection().set_trace_callback(None)
+    return statements
+
+
+def store_reads(statements):
+    return [statement for statement in statements if statement.startswith('SELECT')]
+
+
+def test_sessions_are_served_from_memory_until_they_change(session_app):
+    interface = session_app.session_interface
+    assert isinstance(interface, CachedSQLiteSessionInterface)
+    client = session_app.test_client()
+
+    statements = store_statements(interface, lambda: client.post(
+        '/auth/login', data={'login_email': 'test.user1@gmail.com', 'login_password': '54321drwsP#'}))
+    assert any(statement.startswith('INSERT OR REPLACE') for statement in statements)
+    assert interface._connection().execute('SELECT COUNT(*) FROM sessions').fetchone()[0] == 1
+
+    client.get('/views/dashboard')
+    statements = store_statements(interface, lambda: client.get('/views/dashboard'))
+    assert not any(statement.startswith(('INSERT', 'DELETE')) for statement in statements)
+
+    client.get('/auth/logout')
+    assert interface._connection().execute('SELECT COUNT(*) FROM sessions').fetchone()[0] == 0
+
+
+def test_anonymous_sessions_are_served_from_memory(session_app):
+    interface = session_app.session_interface
+    client = session_app.test_client()
+    with client.session_transaction() as session:
+        session['next'] = '/views/dashboard'
+    client.get('/auth/login')
+
+    assert interface._connection().execute('SELECT COUNT(*) FROM sessions').fetchone()[0] == 1
+    assert store_reads(store_statements(interface, lambda: client.get('/auth/login'))) == []
+
+
+def test_logged_in_sessions_are_served_from_memory(session_app):
+    interface = session_app.session_interface
+    client = session_app.test_client()
+    client.post('/auth/login', data={'login_email': 'test.user1@gmail.com', 'login_password': '54321drwsP#'})
+    client.get('/views/dashboard')
+
+    statements = store_statements(interface, lambda: [client.get('/views/dashboard') for _ in range(3)])
+
+    assert store_reads(statements) == []
+
+
+def test_logged_in_session_ended_in_another_process_is_not_served_from_memory(session_app):
+    interface = session_app.session_interface
+    client = session_app.test_client()
+    client.post('/auth/login', data={'login_email': 'test.user1@gmail.com', 'login_password': '54321drwsP#'})
+    store_id, = interface._cache
+    assert interface._retrieve_session_data(store_id)['_user_id'] == '1'
+
+    # Another worker process ends the session, leaving this process's cached copy in place
+    with closing(interface._connect()) as connection:
+        connection.execute('DELETE FROM sessions')
+
+    assert interface._retrieve_session_data(store_id) is None
+
+
+def test_expired_sessions_are_swept_in_batches(session_app):
+    interface = session_app.session_interface
+    interface.sweep_batch_size = 2
+    now = time.time()
+    interface._connection().executemany('INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?)',
+                                        [(f'session:{number}', b'', now - 1) for number in range(5)] +
+                                        [('session:live', b'', now + 60)])
+
+    statements = store_statements(interface, interface._delete_expired_sessions)
+
+    assert len([statement for statement in statements if statement.startswith('DELETE')]) == 3
+    assert interface._connection().execute('SELECT id FROM sessions').fetchall() == [('session:live',)]
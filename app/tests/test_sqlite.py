@@ -0,0 +1,32 @@
+from sqlalchemy import text
+
+from app import create_app, db
+from config.test_config import TestConfig
+
+
+def make_app(path, **settings):
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    for name, value in settings.items():
+        setattr(FileConfig, name, value)
+    return create_app(FileConfig)
+
+
+def test_sqlite_profile_sets_pragmas_on_every_connection(tmp_path):
+    app = make_app(tmp_path / 'profile.db')
+    with app.app_context():
+        assert db.engine.pool.size() == 5
+        with db.engine.connect() as connection:
+            assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert connection.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+            assert connection.execute(text('PRAGMA synchronous')).scalar() == 1
+        db.engine.dispose()
+
+
+def test_sqlite_profile_can_be_turned_off(tmp_path):
+    app = make_app(tmp_path / 'defaults.db', SQLITE_PRAGMAS={})
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'delete'
+        db.engine.dispose()
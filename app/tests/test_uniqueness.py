@@ -0,0 +1,78 @@
+from sqlalchemy import event
+
+from app import db
+from app.application.form_errors import ApplicationFormError
+from app.models.application import Application
+from app.server.form_errors import ServerFormError
+from app.shared.uniqueness import UniqueFieldsForm
+
+APPLICATION = {'name': 'Example App One', 'team_name': 'Team One', 'team_email': 'team.one@gmail.com',
+               'url': 'https://exampleappone.com', 'swagger': 'https://newapp.com/swagger/ui',
+               'bitbucket': 'https://bitbucket.org/repos/newapp', 'extra_info': '', 'production_pods': 1,
+               'server_id': 1}
+
+
+def application_selects(client, data):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('SELECT') and 'FROM application' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.post('/application/create', data=data)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return response, statements
+
+
+def test_unique_fields_are_checked_with_one_query(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response, statements = application_selects(client, APPLICATION)
+
+    assert len(statements) == 1
+    assert ApplicationFormError.NAME_EXISTS.value in response.text
+    assert ApplicationFormError.URL_EXISTS.value in response.text
+    assert ApplicationFormError.BITBUCKET_EXISTS.value not in response.text
+    assert Application.query.filter_by(name='Example App One').count() == 1
+
+
+def test_update_keeps_its_own_unique_values(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+    application = Application.find_application_by_name('Example App One')
+    data = {**APPLICATION, 'swagger': application.swagger, 'bitbucket': application.bitbucket, 'production_pods': 5}
+
+    client.post(f'/application/update?application_id={application.id}', data=data)
+
+    db.session.expire_all()
+    assert Application.find_application_by_name('Example App One').production_pods == 5
+
+
+def test_unique_constraint_errors_are_shown_on_the_form(client, auth, init_user_table, monkeypatch):
+    # Skipping the check stands in for another request saving the same value between the check and the insert
+    monkeypatch.setattr(UniqueFieldsForm, 'validate_unique', lambda form: True)
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+
+    response = client.post('/application/create', data={**APPLICATION, 'url': 'https://newapp.com'})
+    assert ApplicationFormError.NAME_EXISTS.value in response.text
+    assert 'Unable to create application' not in response.text
+
+    response = client.post('/server/create', data={'name': 'ab-0001', 'cpu': 1, 'memory': 1, 'location': 'Harrow'})
+    assert ServerFormError.NAME_EXISTS.value in response.text
+
+
+def test_swagger_is_unique_unless_empty(client, auth, init_user_table, monkeypatch):
+    monkeypatch.setattr(UniqueFieldsForm, 'validate_unique', lambda form: True)
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+    new_application = {**APPLICATION, 'name': 'New App', 'url': 'https://newapp.com'}
+
+    response = client.post('/application/create', data={**new_application,
+                                                         'swagger': 'https://exampleappone.com/swagger/ui'})
+    assert ApplicationFormError.SWAGGER_EXISTS.value in response.text
+
+    client.post('/application/create', data={**new_application, 'swagger': ''})
+    client.post('/application/create', data={**new_application, 'name': 'Other App', 'url': 'https://otherapp.com',
+                                              'bitbucket': 'https://bitbucket.org/repos/otherapp', 'swagger': ''})
+    assert Application.query.filter_by(swagger='').count() == 4
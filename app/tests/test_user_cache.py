@@ -0,0 +1,67 @@
+import re
+
+from sqlalchemy import event
+
+from app import db
+from app.auth.user_cache import user_cache
+from app.models.user import User
+
+
+def user_queries(request):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        request()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    # PostgreSQL quotes the table name as user is a reserved word there
+    return [statement for statement in statements if re.search(r'FROM "?user\b', statement)]
+
+
+def test_authenticated_requests_reuse_cached_user(client, auth, init_user_table):
+    auth.login('test.user1@gmail.com', '54321drwsP#')
+    client.get('/views/dashboard')
+
+    assert user_queries(lambda: client.get('/views/dashboard')) == []
+
+
+def test_user_cache_is_invalidated_when_user_changes(app, init_user_table):
+    user = User.find_user_by_email('test.user1@gmail.com')
+    user_id = user.id
+    assert user_cache.load(user_id).is_admin
+
+    user.is_admin = False
+    db.session.commit()
+    db.session.remove()
+
+    assert len(user_queries(lambda: user_cache.load(user_id))) == 1
+    assert not user_cache.load(user_id).is_admin
+
+
+def test_user_cache_evicts_least_recently_used(app, init_user_table):
+    app.config['USER_CACHE_SIZE'] = 2
+    users = User.query.order_by(User.id).all()
+    db.session.remove()
+
+    for user in users:
+        user_cache.load(user.id)
+
+    assert len(user_queries(lambda: user_cache.load(users[0].id))) == 1
+    assert user_queries(lambda: user_cache.load(users[2].id)) == []
+
+
+def test_user_loaded_between_flush_and_commit_is_not_cached(app, init_user_table):
+    user = User.find_user_by_email('test.user1@gmail.com')
+    user_id = user.id
+    committed = User(**{attribute.key: getattr(user, attribute.key) for attribute in User.__mapper__.column_attrs})
+
+    user.is_admin = False
+    db.session.flush()
+    # Another request loads the user after the flush and reads the row as last committed
+    cached, version = user_cache._get(user_id)
+    user_cache._put(user_id, committed, version)
+    db.session.commit()
+    db.session.remove()
+
+    assert not user_cache.load(user_id).is_admin
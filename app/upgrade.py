@@ -0,0 +1,141 @@
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+
+from app import db
+from app.models.application import Application, server_rollups_statement
+
+# Columns added to existing tables after they were first released. Each one is added as the model defines it, so new
+# columns must be nullable or have a server default
+ADDED_COLUMNS = [
+    ('user', 'login_not_before'),
+    ('server', 'application_count'),
+    ('server', 'total_production_pods'),
+]
+# Columns whose length has grown since they were first released. SQLite does not enforce lengths, so they are only
+# altered on other databases
+WIDENED_COLUMNS = [
+    ('user', 'password'),
+]
+# Indexes of existing tables that later indexes have replaced
+OBSOLETE_INDEXES = {
+    'failed_login': ['ix_failed_login_email', 'ix_failed_login_ip'],
+    'application': ['ix_application_swagger'],
+}
+# Finds the id of the server an application names in the server column it had before server_id
+SERVER_ID_BY_NAME = '(SELECT server.id FROM server WHERE server.name = {table}.server)'
+
+
+def _add_column(connection, column):
+    """Adds a model's column to its existing table"""
+    table = connection.dialect.identifier_preparer.format_table(column.table)
+    definition = CreateColumn(column).compile(dialect=connection.dialect)
+    connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {definition}'))
+
+
+def _widen_column(connection, column):
+    """Changes the type of an existing column to the model's"""
+    table = connection.dialect.identifier_preparer.format_table(column.table)
+    connection.execute(text(f'ALTER TABLE {table} ALTER COLUMN {column.name} '
+                            f'TYPE {column.type.compile(dialect=connection.dialect)}'))
+
+
+@contextmanager
+def _without_demo_data():
+    """Stops tables created for an existing database from being filled with demo rows"""
+    seed_demo_data = current_app.config.get('SEED_DEMO_DATA')
+    current_app.config['SEED_DEMO_DATA'] = False
+    try:
+        yield
+    finally:
+        current_app.config['SEED_DEMO_DATA'] = seed_demo_data
+
+
+def _reference_servers_by_id_in_place(connection):
+    """Replaces the application table's server name column with server_id using ALTER TABLE. Dropping the old
+    column also drops its index and foreign key"""
+    connection.execute(text('ALTER TABLE application ADD COLUMN server_id INTEGER REFERENCES server (id)'))
+    connection.execute(text(f'UPDATE application SET server_id = {SERVER_ID_BY_NAME.format(table="application")}'))
+    connection.execute(text('ALTER TABLE application DROP COLUMN server'))
+
+
+def _reference_servers_by_id_by_copy(connection, columns):
+    """Replaces the application table's server name column with server_id by copying the rows into a new table,
+    as SQLite cannot drop a column that is part of a foreign key"""
+    connection.execute(text('ALTER TABLE application RENAME TO application_old'))
+    # Index names are unique across the database, so the old table's indexes go before the new table makes its own
+    for index in inspect(connection).get_indexes('application_old'):
+        connection.execute(text(f'DROP INDEX {index["name"]}'))
+
+    with _without_demo_data():
+        Application.__table__.create(connection)
+
+    copied = ', '.join(column.name for column in Application.__table__.columns
+                       if column.name in columns and column.name != 'server_id')
+    connection.execute(text(f'INSERT INTO application ({copied}, server_id) '
+                            f'SELECT {copied}, {SERVER_ID_BY_NAME.format(table="application_old")} '
+                            f'FROM application_old'))
+    connection.execute(text('DROP TABLE application_old'))
+
+
+def upgrade_database():
+    """Brings a database created by an earlier version of the models up to date in one transaction, keeping its data.
+    Creates missing tables, adds and widens columns, moves applications from referencing servers by name to server_id,
+    replaces obsolete indexes and recounts the server rollups. Returns the changes made"""
+    applied = []
+    with db.engine.begin() as connection:
+        inspector = inspect(connection)
+        tables = set(inspector.get_table_names())
+
+        missing = [table for table in db.metadata.sorted_tables if table.name not in tables]
+        if missing:
+            with _without_demo_data():
+                db.metadata.create_all(connection, tables=missing)
+            applied.extend(table.name for table in missing)
+
+        for table_name, name in ADDED_COLUMNS:
+            if table_name in tables and name not in {column['name'] for column in inspector.get_columns(table_name)}:
+                _add_column(connection, db.metadata.tables[table_name].c[name])
+                applied.append(f'{table_name}.{name}')
+
+        if connection.dialect.name != 'sqlite':
+            for table_name, name in WIDENED_COLUMNS:
+                if table_name not in tables:
+                    continue
+                column = db.metadata.tables[table_name].c[name]
+                current = {existing['name']: existing['type'] for existing in inspector.get_columns(table_name)}[name]
+                if current.length < column.type.length:
+                    _widen_column(connection, column)
+                    applied.append(f'{table_name}.{name}')
+
+        if 'application' in tables:
+            application_columns = {column['name'] for column in inspector.get_columns('application')}
+            if 'server_id' not in application_columns:
+                if connection.dialect.name == 'sqlite':
+                    _reference_servers_by_id_by_copy(connection, application_columns)
+                else:
+                    _reference_servers_by_id_in_place(connection)
+                applied.append('application.server_id')
+
+        for table in db.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            existing = {index['name'] for index in inspect(connection).get_indexes(table.name)}
+            for name in OBSOLETE_INDEXES.get(table.name, []):
+                if name in existing:
+                    connection.execute(text(f'DROP INDEX {name}'))
+                    applied.append(f'{name} dropped')
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                # Indexes limited to another dialect are skipped by create, so only those read back are reported
+                if index.name not in existing:
+                    index.create(connection)
+            created = {index['name'] for index in inspect(connection).get_indexes(table.name)} - existing
+            applied.extend(sorted(created))
+
+        if applied and {'server', 'application'} <= tables:
+            connection.execute(server_rollups_statement())
+
+    current_app.logger.info(f'Database upgraded changes={",".join(applied)}')
+    return applied
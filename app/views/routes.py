@@ -2,8 +2,11 @@ from flask import render_template
 from flask_login import login_required, current_user
 
 from app.views import views
+from app.views.stats import dashboard_stats
 
 @views.route('/dashboard')
 @login_required
 def dashboard():
-    return render_template('views/dashboard.html', user=current_user)
\ No newline at end of file
+    """Renders the dashboard with the figures of the latest stats snapshot"""
+    return render_template('views/dashboard.html', user=current_user, stats=dashboard_stats.snapshot(),
+                           failed_login_rate=dashboard_stats.failed_login_rate())
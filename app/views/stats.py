@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from flask import current_app
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.auth.counters import failure_counters
+from app.extensions import db
+from app.models.application import Application
+from app.models.failed_login import FailedLogin, utc_now
+from app.models.server import Server
+
+# Seconds a snapshot is served before it is recomputed, which picks up changes made by other processes and failed
+# logins that have aged out of the last hour
+DEFAULT_DASHBOARD_STATS_TTL = 60
+# Number of teams listed by production pods on the dashboard
+DEFAULT_DASHBOARD_TOP_TEAMS = 10
+
+DASHBOARD_STATS_TTL_CONFIG = 'DASHBOARD_STATS_TTL'
+DASHBOARD_TOP_TEAMS_CONFIG = 'DASHBOARD_TOP_TEAMS'
+# Session info key marking that the current transaction has changed servers or applications
+INVENTORY_CHANGED = 'inventory_changed'
+RECENT_FAILED_LOGINS = timedelta(hours=1)
+
+
+class DashboardSnapshot(NamedTuple):
+    """
+    A class to represent the figures shown on the dashboard at one point in time
+
+    Fields
+    -------------------
+    applications: int
+        Number of applications
+    servers: int
+        Number of servers
+    production_pods: int
+        Total production pods of every application
+    servers_by_location: list
+        Pairs of location and number of servers, most servers first
+    pods_by_team: list
+        Pairs of team name and production pods, most pods first
+    failed_logins_last_hour: int
+        Number of failed logins stored in the last hour
+    computed_at: datetime
+        When the figures were read from the database
+    """
+    applications: int
+    servers: int
+    production_pods: int
+    servers_by_location: list
+    pods_by_team: list
+    failed_logins_last_hour: int
+    computed_at: datetime
+
+
+class DashboardStats:
+    """
+    A class that keeps a snapshot of the dashboard figures in memory so loading the dashboard does not read any table.
+
+    Commits in this process that change servers or applications mark the snapshot stale, and it also goes stale after
+    DASHBOARD_STATS_TTL seconds. A stale snapshot is still served while a background thread recomputes it, so only the
+    first dashboard load after the process starts waits for the database. Application and pod totals are summed from
+    the rollups kept on each server rather than from the application table.
+    """
+
+    def __init__(self):
+        self._app = None
+        self._reset()
+
+    def _reset(self):
+        """Creates the state owned by the current process"""
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._expires_at = 0
+        self._version = 0
+        self._refresher = None
+
+    def _check_process(self):
+        """Starts without a snapshot in a forked process, as a refresh started by the parent does not run in it"""
+        if self._pid != os.getpid():
+            self._reset()
+
+    def init_app(self, app):
+        """Binds the stats to an application and drops the snapshot"""
+        app.config.setdefault(DASHBOARD_STATS_TTL_CONFIG, DEFAULT_DASHBOARD_STATS_TTL)
+        app.config.setdefault(DASHBOARD_TOP_TEAMS_CONFIG, DEFAULT_DASHBOARD_TOP_TEAMS)
+        self._app = app
+        self._reset()
+
+    def invalidate(self):
+        """Marks the snapshot stale so the next read starts a refresh"""
+        with self._lock:
+            self._expires_at = 0
+            self._version += 1
+
+    def compute(self):
+        """Reads the dashboard figures from the database"""
+        by_location = db.session.execute(
+            select(Server.location, func.count(), func.sum(Server.application_count),
+                   func.sum(Server.total_production_pods))
+            .group_by(Server.location)).all()
+        pods_by_team = db.session.execute(
+            select(Application.team_name, func.sum(Application.production_pods).label('production_pods'))
+            .group_by(Application.team_name)
+            .order_by(func.sum(Application.production_pods).desc(), Application.team_name)
+            .limit(self._app.config[DASHBOARD_TOP_TEAMS_CONFIG])).all()
+        failed_logins = db.session.scalar(
+            select(func.count()).select_from(FailedLogin)
+            .where(FailedLogin.created_at >= utc_now() - RECENT_FAILED_LOGINS))
+        return DashboardSnapshot(
+            applications=sum(row[2] or 0 for row in by_location),
+            servers=sum(row[1] for row in by_location),
+            production_pods=sum(row[3] or 0 for row in by_location),
+            servers_by_location=sorted(((row[0], row[1]) for row in by_location),
+                                       key=lambda pair: (-pair[1], pair[0])),
+            pods_by_team=[(row[0], row[1] or 0) for row in pods_by_team],
+            failed_logins_last_hour=failed_logins,
+            computed_at=utc_now())
+
+    def refresh(self):
+        """Recomputes the snapshot, stores it and returns it. A snapshot read while the data changed is kept stale, so
+        the next request refreshes it again, rather than discarded, so a busy inventory still has one to serve"""
+        with self._lock:
+            version = self._version
+        snapshot = self.compute()
+        with self._lock:
+            self._snapshot = snapshot
+            if version == self._version:
+                self._expires_at = time.monotonic() + self._app.config[DASHBOARD_STATS_TTL_CONFIG]
+        return snapshot
+
+    def _refresh_in_background(self):
+        """Recomputes the snapshot with its own application context and database session"""
+        try:
+            with self._app.app_context():
+                try:
+                    self.refresh()
+                except SQLAlchemyError as err:
+                    current_app.logger.error(
+                        'An error occurred whilst refreshing the dashboard stats',
+                        extra={
+                            "error": str(err),
+                            "error_type": type(err).__name__,
+                        })
+                finally:
+                    db.session.remove()
+        finally:
+            with self._lock:
+                self._refresher = None
+
+    def snapshot(self):
+        """Returns the latest snapshot. A stale snapshot is returned straight away while a single background refresh
+        runs, and a snapshot is only computed in the request when there is none yet"""
+        self._check_process()
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and self._expires_at <= time.monotonic() and self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_in_background, name='dashboard-stats',
+                                                   daemon=True)
+                self._refresher.start()
+        if snapshot is None:
+            snapshot = self.refresh()
+        return snapshot
+
+    def failed_login_rate(self):
+        """Returns the failed logins per minute over the detection window, read from the in-memory counters"""
+        return failure_counters.global_failures() / (FailedLogin.WINDOW.total_seconds() / 60)
+
+
+dashboard_stats = DashboardStats()
+
+
+@event.listens_for(Session, 'after_flush')
+def mark_flushed_inventory_changes(session, flush_context):
+    """Marks the transaction when the unit of work has added, changed or deleted a server or application"""
+    changed = (*session.new, *session.dirty, *session.deleted)
+    if any(isinstance(instance, (Server, Application)) for instance in changed):
+        session.info[INVENTORY_CHANGED] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def mark_executed_inventory_changes(orm_execute_state):
+    """Marks the transaction when a bulk insert, update or delete statement targets servers or applications"""
+    if ((orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete)
+            and orm_execute_state.bind_mapper in (Server.__mapper__, Application.__mapper__)):
+        orm_execute_state.session.info[INVENTORY_CHANGED] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_dashboard_stats(session):
+    """Marks the dashboard snapshot stale once a transaction that changed the inventory has committed"""
+    if session.info.pop(INVENTORY_CHANGED, False):
+        dashboard_stats.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_inventory_changes(session):
+    """Forgets the inventory changes of a transaction that was rolled back"""
+    session.info.pop(INVENTORY_CHANGED, None)
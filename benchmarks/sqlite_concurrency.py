@@ -0,0 +1,106 @@
+"""
+Measures read and write throughput of the application database under concurrent worker processes, with and without
+the SQLite engine profile.
+
+Each worker process creates the app against the same SQLite file, like a gunicorn worker would, and runs a mix of grid
+page reads and single row failed login writes for a fixed time. The run reports operations per second and how many
+operations failed with "database is locked".
+
+Usage: python benchmarks/sqlite_concurrency.py [--workers 4] [--seconds 10] [--write-ratio 0.2]
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from app import create_app, db
+from app.models.application import Application
+from app.models.failed_login import FailedLogin, utc_now
+from config.test_config import TestConfig
+
+
+def make_config(path, profile):
+    """Builds a config for the benchmark database, with the engine profile on or off"""
+    class BenchmarkConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        FAILED_LOGIN_BATCH_SIZE = 1
+        PASSWORD_HASH_WORKERS = 0
+
+    if not profile:
+        # The settings the app used before the profile existed: rollback journal, pysqlite's 5 second lock timeout
+        BenchmarkConfig.SQLITE_PRAGMAS = {}
+        BenchmarkConfig.SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 5}}
+    return BenchmarkConfig
+
+
+def worker(path, profile, seconds, write_ratio, results):
+    """Runs reads and writes against the database until the time is up"""
+    app = create_app(make_config(path, profile))
+    reads = writes = locked = 0
+    deadline = time.time() + seconds
+    with app.app_context():
+        while time.time() < deadline:
+            try:
+                if random.random() < write_ratio:
+                    db.session.add(FailedLogin(email='benchmark@example.com', ip='10.0.0.1', user_agent='benchmark'))
+                    db.session.commit()
+                    writes += 1
+                else:
+                    db.session.execute(select(Application).order_by(Application.id).limit(50)).all()
+                    db.session.scalar(select(db.func.count()).select_from(FailedLogin)
+                                      .where(FailedLogin.created_at >= utc_now() - FailedLogin.WINDOW))
+                    db.session.commit()
+                    reads += 1
+            except OperationalError:
+                db.session.rollback()
+                locked += 1
+    results.put((reads, writes, locked))
+
+
+def run(profile, workers, seconds, write_ratio):
+    """Runs the benchmark on a fresh database and returns reads, writes and locked errors per second"""
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'benchmark.db')
+    app = create_app(make_config(path, profile))
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(path, profile, seconds, write_ratio, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    totals = [sum(values) for values in zip(*(results.get() for _ in processes))]
+    for process in processes:
+        process.join()
+    return [total / seconds for total in totals]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f'{args.workers} workers, {args.seconds:g}s, {args.write_ratio:.0%} writes')
+    print(f'{"profile":<10}{"reads/s":>12}{"writes/s":>12}{"locked/s":>12}')
+    for profile in (False, True):
+        reads, writes, locked = run(profile, args.workers, args.seconds, args.write_ratio)
+        print(f'{"on" if profile else "off":<10}{reads:>12.0f}{writes:>12.0f}{locked:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import os
 import secrets
 
 DB_NAME = 'database.db'
@@ -7,10 +8,14 @@ class Config:
     SECRET_KEY = secrets.token_urlsafe(24)
     SQLALCHEMY_DATABASE_URI = f'sqlite:///{DB_NAME}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Adds demo servers, applications and failed logins when flask db create makes their tables
+    SEED_DEMO_DATA = True
     REMEMBER_COOKIE_DURATION = 0
     SESSION_PERMANENT = False
-    SESSION_TYPE = 'sqlalchemy'
+    SESSION_TYPE = 'cached_sqlite'
+    SESSION_SQLITE_PATH = 'sessions.db'
     MAIL_SERVER = 'localhost'
     MAIL_PORT = 25
     MAIL_SUPPRESS_SEND = True
-    MAIL_DEFAULT_SENDER = 'test@example.com'
\ No newline at end of file
+    MAIL_DEFAULT_SENDER = 'test@example.com'
+    BREACHED_PASSWORD_INDEX = os.environ.get('BREACHED_PASSWORD_INDEX')
\ No newline at end of file
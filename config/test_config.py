@@ -1,3 +1,4 @@
+import os
 import secrets
 
 class TestConfig:
@@ -5,8 +6,15 @@ class TestConfig:
     WTF_CSRF_ENABLED = False
     WTF_CSRF_CHECK_DEFAULT = False
     SECRET_KEY = secrets.token_urlsafe(24)
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # Set TEST_DATABASE_URL to run the suite against a PostgreSQL database instead of an in-memory SQLite database
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite:///:memory:')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SEED_DEMO_DATA = True
     SESSION_TYPE = 'filesystem'
     SESSION_SQLALCHEMY = None
-    SESSION_SQLALCHEMY_TABLE = 'test_sessions'
\ No newline at end of file
+    SESSION_SQLALCHEMY_TABLE = 'test_sessions'
+    MAIL_SUPPRESS_SEND = True
+    MAIL_DEFAULT_SENDER = 'test@example.com'
+
+    FAILED_LOGIN_BATCH_SIZE = 1
+    PASSWORD_HASH_WORKERS = 0
\ No newline at end of file
@@ -0,0 +1,34 @@
+import os
+
+from app.shared.prefork import after_fork, before_fork, warm_up
+
+wsgi_app = 'main:app'
+
+# Loads the application once in the master process. Workers are forked from it and share its memory copy-on-write,
+# and the database is created and seeded once rather than by every worker
+preload_app = True
+
+# Requests spend most of their time waiting on the database and SMTP, so each worker serves several at once with
+# threads. WEB_CONCURRENCY is set by Render from the instance's memory
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    """Warms the preloaded application before the first worker is forked"""
+    from main import app
+    warm_up(app)
+
+
+def pre_fork(server, worker):
+    before_fork()
+
+
+def post_fork(server, worker):
+    from main import app
+    after_fork(app)
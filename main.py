@@ -4,8 +4,6 @@ from app import create_app
 from config.config import Config
 from config.prod_config import ProdConfig
 
-app = create_app()
-
 is_production = os.getenv('RENDER') == 'true'
 
 if is_production:
@@ -13,5 +11,7 @@ if is_production:
 else:
     config = Config
 
+app = create_app(config)
+
 if __name__ == '__main__':
     app.run(debug=not is_production)
\ No newline at end of file